@@ -0,0 +1,168 @@
+"""
+Approximate nearest-neighbour index for very large face galleries.
+Embeddings are split into inverted lists around k-means centroids (IVF) and,
+optionally, compressed with product quantization (PQ). A query only scans the
+nprobe lists closest to it. Pure NumPy, built from models/embeddings.pickle and
+saved next to it as models/ann_index.pickle.
+"""
+import os
+import pickle
+import numpy as np
+
+from gallery_matcher import l2_normalize
+
+
+def nearest_centroids(data,centroids,chunk=65536):
+    # argmin of ||x - c||^2 == argmin of ||c||^2 - 2 x.c, computed in chunks to bound memory
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assign = np.empty(len(data),dtype='int32')
+    for start in range(0,len(data),chunk):
+        distances = centroid_norms - 2 * (data[start:start+chunk] @ centroids.T)
+        assign[start:start+chunk] = np.argmin(distances,axis=1)
+    return assign
+
+
+def kmeans(data,k,iterations=10,seed=0):
+    rng = np.random.RandomState(seed)
+    k = min(k,len(data))
+    centroids = data[rng.choice(len(data),k,replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroids(data,centroids)
+        order = np.argsort(assign,kind='stable')
+        (clusters,starts) = np.unique(assign[order],return_index=True)
+        sums = np.add.reduceat(data[order],starts,axis=0)
+        counts = np.diff(np.append(starts,len(data)))
+        centroids[clusters] = sums / counts[:,None]
+        # clusters that lost every point are reseeded with random points
+        empty = np.setdiff1d(np.arange(k),clusters)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data),len(empty),replace=False)]
+    return centroids.astype('float32')
+
+
+class ANN_Index:
+    def __init__(self,nlist=None,nprobe=8,pq_subvectors=0,threshold=0.7,train_size=100000,seed=0):
+        # nlist defaults to about 4*sqrt(N), pq_subvectors=0 keeps full float32 vectors in the lists
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_subvectors = pq_subvectors
+        self.threshold = threshold
+        self.train_size = train_size
+        self.seed = seed
+        self.source_mtime = None
+
+    def build(self,face_ids,embeddings):
+        rng = np.random.RandomState(self.seed)
+        data = l2_normalize(embeddings)
+        face_ids = np.asarray([str(x) for x in face_ids])
+        (self.classes_,self.labels) = np.unique(face_ids,return_inverse=True)
+        self.labels = self.labels.astype('int32')
+        nlist = self.nlist or max(1,int(4 * np.sqrt(len(data))))
+        sample = data[rng.choice(len(data),min(len(data),self.train_size),replace=False)]
+        self.centroids = kmeans(sample,nlist,seed=self.seed)
+        assign = nearest_centroids(data,self.centroids)
+
+        # inverted lists: rows sorted by list, list i is rows[offsets[i]:offsets[i+1]]
+        order = np.argsort(assign,kind='stable')
+        self.offsets = np.searchsorted(assign[order],np.arange(len(self.centroids) + 1)).astype('int64')
+        self.labels = self.labels[order]
+        self.list_ids = assign[order]
+        data = data[order]
+        if self.pq_subvectors:
+            residuals = data - self.centroids[self.list_ids]
+            self.train_pq(residuals[rng.choice(len(data),min(len(data),self.train_size),replace=False)])
+            self.codes = self.encode_pq(residuals)
+            self.vectors = None
+        else:
+            self.vectors = np.ascontiguousarray(data)
+            self.codes = None
+        return self
+
+    def train_pq(self,residuals):
+        dim = residuals.shape[1]
+        if dim % self.pq_subvectors != 0:
+            raise ValueError("pq_subvectors must divide the embedding size {}".format(dim))
+        self.sub_dim = dim // self.pq_subvectors
+        self.codebooks = np.stack([kmeans(residuals[:,m*self.sub_dim:(m+1)*self.sub_dim],256,seed=self.seed + m)
+                                   for m in range(self.pq_subvectors)])
+
+    def encode_pq(self,residuals):
+        codes = np.empty((len(residuals),self.pq_subvectors),dtype='uint8')
+        for m in range(self.pq_subvectors):
+            codes[:,m] = nearest_centroids(residuals[:,m*self.sub_dim:(m+1)*self.sub_dim],self.codebooks[m])
+        return codes
+
+    def candidate_scores(self,query,lists):
+        rows = np.concatenate([np.arange(self.offsets[i],self.offsets[i+1]) for i in lists])
+        if self.codes is None:
+            return (rows,self.vectors[rows] @ query)
+        # asymmetric distance: q.x = q.c + q.r, q.r is summed from per-subvector lookup tables
+        tables = np.einsum('md,mkd->mk',query.reshape(self.pq_subvectors,self.sub_dim),self.codebooks)
+        scores = tables[np.arange(self.pq_subvectors),self.codes[rows]].sum(axis=1)
+        scores += (self.centroids[lists] @ query)[np.repeat(np.arange(len(lists)),np.diff(self.offsets)[lists])]
+        return (rows,scores)
+
+    def search_labels(self,queries,k=1,nprobe=None):
+        # label indices and scores of the k best people per query, -1 where fewer were found
+        nprobe = min(nprobe or self.nprobe,len(self.centroids))
+        queries = l2_normalize(np.asarray(queries,dtype='float32').reshape(len(queries),-1))
+        labels = np.full((len(queries),k),-1,dtype='int64')
+        top_scores = np.full((len(queries),k),-1.0,dtype='float32')
+        coarse = queries @ self.centroids.T
+        for (n,query) in enumerate(queries):
+            lists = np.argpartition(-coarse[n],nprobe - 1)[:nprobe]
+            (rows,scores) = self.candidate_scores(query,lists)
+            if len(rows) == 0:
+                continue
+            # keep the best scoring sample of every person
+            order = np.argsort(-scores)
+            (_,first) = np.unique(self.labels[rows[order]],return_index=True)
+            best = order[np.sort(first)[:k]]
+            labels[n,:len(best)] = self.labels[rows[best]]
+            top_scores[n,:len(best)] = scores[best]
+        return (labels,top_scores)
+
+    def search(self,queries,k=1,nprobe=None):
+        """
+        Same output as Gallery_Matcher.search: (ids,scores) shaped (len(queries),k),
+        best first, ids below the unknown threshold are None.
+        """
+        (labels,scores) = self.search_labels(queries,k,nprobe)
+        ids = self.classes_[np.maximum(labels,0)].astype(object)
+        ids[(labels < 0) | (scores < self.threshold)] = None
+        return (ids,scores)
+
+    def identify(self,embeddings):
+        """
+        Same interface as face_pipeline.Svm_Classifier: one (id, score, class_index) per embedding.
+        """
+        (labels,scores) = self.search_labels(embeddings,k=1)
+        return [(self.classes_[p] if p >= 0 else None,score,max(p,0)) for (p,score) in zip(labels[:,0],scores[:,0])]
+
+    def save(self,index_path):
+        f = open(index_path,"wb")
+        f.write(pickle.dumps(self.__dict__))
+        f.close()
+
+    def load(self,index_path):
+        # nprobe and threshold are query time settings, keep the ones this object was created with
+        query_settings = {'nprobe':self.nprobe,'threshold':self.threshold}
+        self.__dict__.update(pickle.loads(open(index_path,"rb").read()))
+        self.__dict__.update(query_settings)
+        return self
+
+    @classmethod
+    def load_or_build(cls,embedding_path,index_path,**kwargs):
+        """
+        Loads the saved index, rebuilding it when embeddings.pickle is newer.
+        """
+        embedding_mtime = os.path.getmtime(embedding_path)
+        if os.path.exists(index_path):
+            index = cls(**kwargs).load(index_path)
+            if index.source_mtime == embedding_mtime:
+                return index
+        data = pickle.loads(open(embedding_path,"rb").read())
+        index = cls(**kwargs).build(data["face_ids"],data["embeddings"])
+        index.source_mtime = embedding_mtime
+        index.save(index_path)
+        return index
@@ -0,0 +1,181 @@
+"""
+Write-behind attendance recording.
+The ids marked today are kept in memory, seeded from the report table when the
+recorder starts and again when the day rolls over, so the "already marked"
+check never goes to MySQL. New marks are queued and a writer thread inserts
+them in batches with executemany and one commit per batch. While MySQL is
+unreachable the batch is kept and retried, nothing is lost and nobody waits.
+The inserts are INSERT IGNORE against the unique (id, date) key of report, so
+writing a mark twice (another machine, a retry after a lost commit) is harmless.
+A mark that comes back ignored while report holds another status for the day
+(an Absent written first) was not recorded, it is logged and counted as dropped.
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+
+import pymysql
+
+import database
+
+INSERT_SQL = "insert ignore into report(id,name,date,time,status) VALUES (%s,%s,%s,%s,%s)"
+
+
+class Attendance_Recorder:
+    def __init__(self,batch_size=100,retry_after=5.0,now=datetime.now):
+        self.batch_size = batch_size
+        self.retry_after = retry_after
+        self.now = now
+        self.lock = threading.Lock()
+        self.marked = set()
+        self.day = None
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.reseed = False
+        self.written = 0
+        self.ignored = 0
+        self.dropped = []
+        self.batches = 0
+        self.retries = 0
+
+    def seed(self,day):
+        rows = database.fetchall("select id from report where date = %s",(day))
+        with self.lock:
+            self.marked.update(str(id) for (id,) in rows)
+
+    def start(self):
+        """
+        Seeds today's marks (one query, raises if MySQL is down) and starts the writer.
+        """
+        day = self.now().strftime("%Y-%m-%d")
+        self.seed(day)
+        self.day = day
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run,name="attendance-writer",daemon=True)
+            self.thread.start()
+        return self
+
+    def roll_over(self,day):
+        # called with the lock held: a new day starts with nobody marked, the writer reads back marks from other machines
+        if day != self.day:
+            self.day = day
+            self.marked = set()
+            self.reseed = True
+
+    def is_marked(self,id):
+        with self.lock:
+            self.roll_over(self.now().strftime("%Y-%m-%d"))
+            return str(id) in self.marked
+
+    def record(self,id,name,status="Present"):
+        """
+        True when this is the person's first mark today, False when already
+        marked. Returns at once, the row is written by the writer thread.
+        """
+        now = self.now()
+        (date,time_of_day) = now.strftime("%Y-%m-%d %H:%M:%S").split(' ')
+        with self.lock:
+            self.roll_over(date)
+            if str(id) in self.marked:
+                return False
+            self.marked.add(str(id))
+        self.queue.put((id,name,date,time_of_day,status))
+        return True
+
+    def mark_absent(self,ids,day):
+        """
+        Called by the scheduler before it writes the Absent rows of day, returns
+        the ids nobody is marked for yet and counts them as marked from now on.
+        A Present still queued for writing is left out, so it is not overwritten.
+        """
+        with self.lock:
+            self.roll_over(day)
+            ids = [id for id in ids if str(id) not in self.marked]
+            self.marked.update(str(id) for id in ids)
+        return ids
+
+    def next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self,batch):
+        # keeps retrying while MySQL is unreachable, True once written
+        while True:
+            try:
+                inserted = database.executemany(INSERT_SQL,batch)
+                self.written += inserted
+                self.ignored += len(batch) - inserted
+                self.batches += 1
+                if inserted < len(batch):
+                    self.check_ignored(batch)
+                return True
+            except (pymysql.err.OperationalError,pymysql.err.InterfaceError) as e:
+                self.retries += 1
+                print("[INFO] attendance not written yet ({} marks), retrying in {:.0f} s: {}".format(len(batch),self.retry_after,e))
+                if self.stop_event.wait(self.retry_after):
+                    return False
+            except pymysql.err.MySQLError as e:
+                print("Error: could not write attendance {}: {}".format(batch,e))
+                return True
+
+    def check_ignored(self,batch):
+        # the rowcount says some rows were skipped, a Present kept as a Present (another machine) is fine
+        for (id,name,date,time_of_day,status) in batch:
+            try:
+                row = database.fetchone("select status from report where id = %s and date = %s",(id,date))
+            except pymysql.err.MySQLError as e:
+                print("[INFO] could not check the ignored mark of {}: {}".format(id,e))
+                continue
+            if row is not None and row[0] != status:
+                self.dropped.append((id,name,date,time_of_day,status))
+                print("Error: {} mark of {} {} at {} {} not recorded, report already has {}".format(status,id,name,date,time_of_day,row[0]))
+
+    def run(self):
+        pending = []
+        while True:
+            if self.reseed:
+                try:
+                    self.seed(self.day)
+                    self.reseed = False
+                except (pymysql.err.OperationalError,pymysql.err.InterfaceError):
+                    pass
+            if not pending:
+                pending = self.next_batch()
+            if pending:
+                if not self.write(pending):
+                    # stopped while MySQL was down, the marks stay queued
+                    for row in pending:
+                        self.queue.put(row)
+                    return
+                for row in pending:
+                    self.queue.task_done()
+                pending = []
+            elif self.stop_event.is_set():
+                return
+
+    def flush(self,timeout=10.0):
+        # waits until every queued mark is written, False on timeout
+        end = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < end:
+            time.sleep(0.05)
+        return not self.queue.unfinished_tasks
+
+    def close(self,timeout=10.0):
+        self.flush(timeout)
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+    def stats(self):
+        return {'marked_today':len(self.marked),'pending':self.queue.unfinished_tasks,'written':self.written,
+                'ignored':self.ignored,'dropped':len(self.dropped),'batches':self.batches,'retries':self.retries}
@@ -1,17 +1,21 @@
 # ############################################ Importing Tkinter modules and Libraries #####################################################################################
 
+import time
+import threading
+# reference point for the startup-to-login-window time
+startup_time = time.time()
 from tkinter import *
 import cv2
 import os
 from tkinter.ttk import Combobox, Treeview, Scrollbar, Progressbar
 from PIL import Image, ImageTk
 import pymysql
+import database
 import csv
 from tkinter import messagebox , Message
 import numpy as np
 from os import listdir
 from tkinter import simpledialog
-import time
 import random
 import pandas as pd
 from tkinter import filedialog
@@ -20,35 +24,97 @@ from gtts import gTTS
 from extract_embeddings import Extract_Embeddings
 import pickle
 from training import Training
+from gallery_matcher import Gallery_Matcher
+from identity_registry import Identity_Registry
+from recognition_engine import Recognition_Engine, register_models, classifier_files, load_classifier
+from recognition_window import Recognition_Window
+from camera_service import Camera_Service
+from face_tracker import Face_Tracker
 import os
 from datetime import datetime
-from statistics import mode
 from mark_attendance import Mark_Attendance
+from attendance_recorder import Attendance_Recorder
+from report_viewer import Report_Pager, Virtual_Table, Live_Refresh
 import sys
+import argparse
 import webbrowser
 import re
 import shutil
 from apscheduler.schedulers.background import BackgroundScheduler
 import event_scheduler
 import json
-from tensorflow.keras.preprocessing.image import img_to_array
-from tensorflow.keras.models import model_from_json
-import tensorflow as tf
+from model_loader import Model_Loader
 root_dir = os.getcwd()
+# 'svm' classifies with models/recognizer.pickle, 'gallery' matches straight against models/embeddings.pickle
+# so newly extracted staff are recognized without running Train the Data, 'ann' does the same through
+# the approximate index in models/ann_index.pickle for very large galleries. 'gallery' switches to 'ann'
+# by itself above recognition_engine.ANN_ABOVE embeddings
+MATCHER = 'svm'
+# face_recognize marks attendance as soon as one identity leads the others by DECISION_MARGIN (summed
+# log-odds of the recognitions) over at least DECISION_MIN_VOTES recognitions, or after DECISION_TIMEOUT seconds
+DECISION_MARGIN = 5.0
+DECISION_MIN_VOTES = 3
+DECISION_TIMEOUT = 10.0
+# True keeps Face Recognizer running as a kiosk: every face in view is decided and marked on its own
+KIOSK_MODE = False
+# the camera is opened and configured once and shared by recognition and enrollment
+CAMERA_INDEX = 0
+CAMERA_SIZE = (640,480)
+CAMERA_FPS = 30
+CAMERA_FOURCC = 'MJPG'
+camera = Camera_Service(CAMERA_INDEX,width = CAMERA_SIZE[0],height = CAMERA_SIZE[1],fps = CAMERA_FPS,fourcc = CAMERA_FOURCC)
+# Haar detection and inference only run while the picture changes (see motion_gate.py),
+# after IDLE_AFTER seconds without motion or faces the camera is read IDLE_FPS times a second
+MOTION_GATE = True
+IDLE_FPS = 4
+IDLE_AFTER = 3.0
+# 'keras' runs the .h5 models, 'tflite' runs the converted models from tflite_backend.py
+# (python tflite_backend.py --quantization int8) with TFLITE_QUANTIZATION = 'none', 'float16' or 'int8'.
+# These are the defaults, --backend and --quantization on the command line choose them at startup
+INFERENCE_BACKEND = 'keras'
+TFLITE_QUANTIZATION = 'int8'
+parser = argparse.ArgumentParser(description = "Face recognition attendance system")
+parser.add_argument("--backend",choices = ['keras','tflite'],default = INFERENCE_BACKEND,help = "inference backend of the models")
+parser.add_argument("--quantization",choices = ['none','float16','int8'],default = TFLITE_QUANTIZATION,help = "which converted models the tflite backend runs")
+parser.add_argument("--startup-benchmark",action = "store_true",help = "print the startup timings and exit (run_benchmarks.py)")
+args = parser.parse_args()
+(INFERENCE_BACKEND,TFLITE_QUANTIZATION) = (args.backend,args.quantization)
+# the Keras models run through a traced tf.function, XLA_JIT also compiles it with XLA
+XLA_JIT = False
+# the liveness model runs as a stage of recognition_engine.py, it can also be switched at runtime
+# with recognition_engine.set_liveness() and its models are only loaded while it is on
+LIVENESS_STAGE = True
+# texture / moire / glare checks settle the obvious faces before the liveness model (see liveness_filter.py),
+# None sends every face to the liveness model. Off until the thresholds are calibrated on real clips with
+# run_benchmarks.py (Liveness Pre-filter), then set it to the calibrated dict like liveness_filter.DEFAULT_THRESHOLDS
+LIVENESS_PREFILTER = None
+gallery_matcher = Gallery_Matcher()
+# today's marks are answered from memory and written to report in the background (see attendance_recorder.py)
+attendance_recorder = Attendance_Recorder()
+event_scheduler.attendance_recorder = attendance_recorder
+
+def staff_table_version():
+    # changes whenever a staff row is added, edited or deleted
+    try:
+        row = database.fetchone("checksum table attendance")
+        return row[1]
+    except pymysql.err.OperationalError:
+        return None
+identity_registry = Identity_Registry(os.path.join(root_dir,'dataset'),version_check = staff_table_version)
 
 try:
-    embedding_obj = Extract_Embeddings(model_path = 'models/facenet_keras.h5')
-    embedding_model = embedding_obj.load_model()
+    embedding_obj = Extract_Embeddings(model_path = 'models/facenet_keras.h5', registry = identity_registry)
     face_cascade = cv2.CascadeClassifier("models/haarcascade_frontalface_default.xml")
 
-    # Load Model
-    json_file = open('antispoofing_models/finalyearproject_antispoofing_model_mobilenet.json','r')
-    loaded_model_json = json_file.read()
-    json_file.close()
-    liveness_model = model_from_json(loaded_model_json)
-    # load weights into new model
-    liveness_model.load_weights('antispoofing_models/finalyearproject_antispoofing_model_74-0.986316.h5')
-    print("Liveness Model loaded successfully from disk")
+    # models are loaded and warmed up on a background thread once the login window is up
+    model_loader = Model_Loader()
+    register_models(model_loader,embedding_obj.load_model,backend = INFERENCE_BACKEND,quantization = TFLITE_QUANTIZATION,
+                    jit_compile = XLA_JIT,liveness = LIVENESS_STAGE)
+    # detection, recognition and the attendance decision, the GUI only feeds it frames and shows the results
+    recognition_engine = Recognition_Engine(model_loader,face_cascade,backend = INFERENCE_BACKEND,liveness = LIVENESS_STAGE,
+                                            prefilter_thresholds = LIVENESS_PREFILTER,decision_margin = DECISION_MARGIN,
+                                            decision_min_votes = DECISION_MIN_VOTES,decision_timeout = DECISION_TIMEOUT,
+                                            kiosk = KIOSK_MODE,motion_gate = MOTION_GATE,idle_fps = IDLE_FPS,idle_after = IDLE_AFTER)
 
 except cv2.error as e:
     print("Error: Provide correct path for face detection model.")
@@ -56,6 +122,13 @@ except cv2.error as e:
 except Exception as e:
     print("{}".format(str(e)))
     sys.exit(1)
+
+def camera_in_use(parent):
+    # the Face Recognizer window has the camera until it is closed, photo samples wait for it
+    if recognition_engine.in_session():
+        messagebox.showerror("Error","Close the Face Recognizer window first, it is using the camera", parent = parent)
+        return True
+    return False
 ############################################ Admin Login page #############
 face = Tk()
 face.title("Admin Login Page")
@@ -72,19 +145,17 @@ def login():
         messagebox.showerror('Error','All the fields are required', parent = face)
     else:
         try:
-            conn = pymysql.connect(host = 'localhost', user = 'root', password = '', database = 'recognition')
-            curr = conn.cursor()
-            curr.execute('select * from login where username = %s and password = %s',(username_var.get(), password_var.get()))
-            row = curr.fetchone()
+            row = database.fetchone('select * from login where username = %s and password = %s',(username_var.get(), password_var.get()))
             if row == None:
                 messagebox.showerror('Error','Invalid Data')
 
             else:
                 face.destroy()
+                attendance_recorder.start()
                 def manage_employee():
                     try:
-                        conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                        cur = conn.cursor()
+                        # fails straight away with the Sql Connection Error below when MySQL is not running
+                        database.fetchone("select 1")
                         first = Toplevel()
                         first.iconbitmap("Photos/Bokehlicia-Captiva-System-users.ico")
                         first.geometry("1350x700+0+0")
@@ -117,8 +188,8 @@ def login():
                         #################################################### Functions of Employee Management form #########################
                         ########################################## To Add the Employee
                         def add_employee():
-                            conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                            
+                            if camera_in_use(first):
+                                return
                             if post_var.get() == "" or fname_var.get() == "" or gender_var.get() ==  "" or contact_var.get() == "" or address_var.get() == "":
                                 messagebox.showerror("Error","All fields are Required", parent = first)
                             else:
@@ -135,12 +206,13 @@ def login():
                                                     os.makedirs(input_directory, exist_ok = 'True')
                                                     count = 1
                                                     print("[INFO] starting video stream...")
-                                                    video_capture = cv2.VideoCapture(0)
+                                                    tracker = Face_Tracker(face_cascade)
+                                                    reader = camera.reader()
                                                     while count <= 50:
                                                         try:
-                                                            check, frame = video_capture.read()
+                                                            check, frame = reader.read()
                                                             gray = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-                                                            faces = face_cascade.detectMultiScale(gray,1.3,5)
+                                                            faces = [box for (track_id,box) in tracker.update(gray)]
                                                             for (x,y,w,h) in faces:  
                                                                 face = frame[y-5:y+h+5,x-5:x+w+5]
                                                                 resized_face = cv2.resize(face,(160,160))
@@ -154,10 +226,8 @@ def login():
                                                                 break
                                                         except Exception as e:
                                                             pass
-                                                    video_capture.release()
                                                     cv2.destroyAllWindows()
-                                                    cur1 = conn.cursor()
-                                                    cur1.execute("insert into attendance(department,fname,gender,contact_no,email_address,date_of_join) VALUES (%s,%s,%s,%s,%s,%s)", (
+                                                    database.execute("insert into attendance(department,fname,gender,contact_no,email_address,date_of_join) VALUES (%s,%s,%s,%s,%s,%s)", (
                                                                                                                                                                                 post_var.get(),
                                                                                                                                                                                 fname_var.get(),
                                                                                                                                                                                 gender_var.get(),
@@ -166,15 +236,11 @@ def login():
                                                                                                                                                                                 DOJ_var
                                                                                                                                                                                 ))
 
-                                                    conn.commit()
-                                                    cur2 = conn.cursor()
-                                                    cur2.execute("select eid from attendance where fname=%s ",(name))
-                                                    output = cur2.fetchone()
+                                                    output = database.fetchone("select eid from attendance where fname=%s ",(name))
                                                     (id,) = output
                                                     os.rename(os.path.join(dataset_dir,name),os.path.join(dataset_dir,name + "_" + str(id)))
                                                     display()
                                                     clear()
-                                                    conn.close()
                                                     messagebox.showinfo("Success", "All photos are collected", parent = first) 
                                                 else:
                                                     if len(os.listdir(input_directory)) == 50:
@@ -193,16 +259,11 @@ def login():
                             ######################################################################## To Display the data of Employee
 
                         def display():
-                            conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                            cur = conn.cursor()
-                            cur.execute("select * from attendance")
-                            data = cur.fetchall()
+                            data = database.fetchall("select * from attendance")
                             if len(data)!= 0:
                                 table1.delete(*table1.get_children())
                                 for row in data:
                                     table1.insert('', END, values = row)                                                                                                                                                                                                                                                                                                                                                                    
-                                conn.commit()
-                            conn.close()
                             ########################################### To clear the data
                         def clear():
                             eid_var.set("")
@@ -227,8 +288,6 @@ def login():
                                 address_var.set(row[5])
                     ############################## To update the data  
                         def update():
-                            conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                            cur = conn.cursor()
                             if post_var.get() == "" or fname_var.get() == "" or gender_var.get() ==  "" or contact_var.get() == "" or address_var.get() == "":
                                 messagebox.showerror("Error","All fields are Required", parent = first)
                             else:
@@ -241,12 +300,11 @@ def login():
                                             if(re.search(regex, address_var.get())):
                                                 id = eid_var.get()
                                                 name = fname_var.get()
-                                                staff_names = os.listdir(dataset_dir)
-                                                staff_ids = [x.split('_')[1] for x in staff_names]
-                                                if id in staff_ids:
-                                                    index = staff_ids.index(id)
-                                                    staff_name = staff_names[index]
+                                                staff_name = identity_registry.refresh().folder(id)
+                                                if staff_name is not None:
                                                     q = messagebox.askyesno("Notification","Do you want to update the photo samples too", parent = attendance)
+                                                    if q == True and camera_in_use(first):
+                                                        return
                                                     if (q == True):
                                                         input_directory = os.path.join(dataset_dir,staff_name)
                                                         shutil.rmtree(input_directory) 
@@ -254,12 +312,13 @@ def login():
                                                         os.mkdir(output_directory)
                                                         count = 1
                                                         print("[INFO] starting video stream...")
-                                                        video_capture = cv2.VideoCapture(0)
+                                                        tracker = Face_Tracker(face_cascade)
+                                                        reader = camera.reader()
                                                         while count <= 50:
                                                             try:
-                                                                check, frame = video_capture.read()
+                                                                check, frame = reader.read()
                                                                 gray = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-                                                                faces = face_cascade.detectMultiScale(gray,1.3,5)
+                                                                faces = [box for (track_id,box) in tracker.update(gray)]
                                                                 for (x,y,w,h) in faces:  
                                                                     face = frame[y-5:y+h+5,x-5:x+w+5]
                                                                     resized_face = cv2.resize(face,(160,160))
@@ -273,9 +332,8 @@ def login():
                                                                     break
                                                             except Exception as e:
                                                                 pass
-                                                        video_capture.release()
                                                         cv2.destroyAllWindows()
-                                                        cur.execute("update attendance set department = %s, fname = %s, gender = %s, contact_no = %s, email_address = %s where eid = %s", (                                                               
+                                                        database.execute("update attendance set department = %s, fname = %s, gender = %s, contact_no = %s, email_address = %s where eid = %s", (                                                               
                                                                                                     post_var.get(),
                                                                                                     fname_var.get(),
                                                                                                     gender_var.get(),
@@ -283,15 +341,13 @@ def login():
                                                                                                     address_var.get(),
                                                                                                     eid_var.get()
                                                                                                     ))
-                                                        conn.commit()
                                                         display()
                                                         clear()
-                                                        conn.close()
                                                         messagebox.showinfo("Success", "Photos and database updated successfully", parent = first) 
                                                     
                                                     else:
                                                         os.rename(os.path.join(dataset_dir,staff_name),os.path.join(dataset_dir,name + "_" + id))
-                                                        cur.execute("update attendance set department = %s, fname = %s, gender = %s, contact_no = %s, email_address = %s where eid = %s", (                                                               
+                                                        database.execute("update attendance set department = %s, fname = %s, gender = %s, contact_no = %s, email_address = %s where eid = %s", (                                                               
                                                                                                                         post_var.get(),
                                                                                                                         fname_var.get(),
                                                                                                                         gender_var.get(),
@@ -299,10 +355,8 @@ def login():
                                                                                                                         address_var.get(),
                                                                                                                         eid_var.get()
                                                                                                                         ))
-                                                        conn.commit()
                                                         display()
                                                         clear()
-                                                        conn.close() 
                                                         messagebox.showinfo("Success", "Database updated successfully", parent = first) 
                                                 else:
                                                     ques = messagebox.askyesno("Notification","Photo samples for this staff didnot exist in local directory. Please delete the entry from the database", parent = attendance)
@@ -323,8 +377,6 @@ def login():
 
                     ###################### To delete the items #########################
                         def delete():
-                            conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                            cur = conn.cursor()
                             if post_var.get() == "" or fname_var.get() == "" or gender_var.get() ==  "" or contact_var.get() == "" or address_var.get() == "":
                                 messagebox.showerror("Error","All fields are Required", parent = first)
                             else:
@@ -332,12 +384,10 @@ def login():
                                     input_name = fname_var.get() + "_" + eid_var.get()
                                     staff_input = os.path.join(dataset_dir,input_name)
                                     if not os.path.exists(staff_input):
-                                        cur.execute("delete from attendance where eid = %s",eid_var.get())
+                                        database.execute("delete from attendance where eid = %s",eid_var.get())
                                     else:
-                                        cur.execute("delete from attendance where eid = %s",eid_var.get())
+                                        database.execute("delete from attendance where eid = %s",eid_var.get())
                                         shutil.rmtree(staff_input)
-                                    conn.commit()
-                                    conn.close()
                                     display()
                                     clear()
                                 except Exception as e:
@@ -345,18 +395,18 @@ def login():
                                 
 
                         def search_data():
-                            conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                            cur = conn.cursor()
-                            cur.execute("select * from attendance where " + str(search_from.get()) + " LIKE '%" + str(search_result.get()) + "%'")
-                            data = cur.fetchall()
+                            # the column comes from the combobox, only the search text is a parameter
+                            column = {"eid":"eid","fname":"fname","post":"department"}.get(search_from.get())
+                            if column is None:
+                                messagebox.showerror('Error','Select what to search by', parent = first)
+                                return
+                            data = database.fetchall("select * from attendance where " + column + " LIKE %s",(database.like_pattern(search_result.get())))
                             if len(data)!= 0:
                                 table1.delete(*table1.get_children())
                                 for row in data:
                                     table1.insert('', END, values = row)
-                                conn.commit()
                             else:
                                 messagebox.showinfo('Sorry', 'No Data Found', parent = first)
-                            conn.close()
 
                         def show_data():
                             display()
@@ -482,115 +532,76 @@ def login():
                 def distance(emb1, emb2):
                     return np.sqrt(np.square(emb1 - emb2))
 
-                
-                def getkey(val,dict):
-                    for key, value in dict.items():
-                        if val == value:
-                            return key
 
                 def face_recognize():
-                    embeddings_model_file = os.path.join(root_dir,"models/embeddings.pickle")
-                    recognizer_model_file = os.path.join(root_dir,"models/recognizer.pickle")
-                    predictions = []
-                    liveness_predictor = []
-                    if os.path.exists(embeddings_model_file and recognizer_model_file): 
-                        training_obj = Training(embedding_path='models/embeddings.pickle')
-                        [label,labels,Embeddings,ids] = training_obj.load_embeddings_and_labels()
-                        staff_details = embedding_obj.get_staff_details()
-                        recognizer = pickle.loads(open('models/recognizer.pickle', "rb").read())
-                        vs = cv2.VideoCapture(0)
+                    if all(os.path.exists(f) for f in classifier_files(MATCHER,root_dir)):
+                        identity_registry.refresh()
+                        classifier = load_classifier(MATCHER,root_dir,gallery_matcher)
+                        # class index -> name, looked up once per session instead of once per face
+                        label_names = identity_registry.label_names(classifier.classes_)
                         print("[INFO] starting video stream...")
-                        while len(predictions) <= 10:
-                            try:
-                                (ret,frame) = vs.read()
-                                gray = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-                                faces = face_cascade.detectMultiScale(gray,1.3,5)
-                                for (x,y,w,h) in faces:  
-                                    face = frame[y-5:y+h+5,x-5:x+w+5]
-                                    resized_face = cv2.resize(face,(160,160))
-                                    
-                                    processed_face = resized_face.astype("float") / 255.0
-                                    processed_face = img_to_array(processed_face)
-                                    processed_face = np.expand_dims(processed_face, axis=0)
-                                    preds = liveness_model.predict(processed_face)[0]
-                                    # print(preds)
-                                    if preds > 0.9:
-                                        label_name = 'spoof'
-                                        liveness_predictor.append(label_name)
-                                    elif preds < 0.5:
-                                        label_name = "real"
-                                        liveness_predictor.append(label_name)
-                                    else:
-                                        label_name = "none"
-                                        liveness_predictor.append(label_name)
-
-                                    face_pixel = embedding_obj.normalize_pixels(imagearrays=resized_face)
-                                    sample = np.expand_dims(face_pixel,axis=0)
-                                    embedding = embedding_model.predict(sample)
-                                    embedding = embedding.reshape(1,-1)   
-                                    COLORS = np.random.randint(0, 255, size=(len(label.classes_), 3), dtype="uint8")
-                                    # perform classification to recognize the face
-                                    preds = recognizer.predict_proba(embedding)[0]
-                                    p = np.argmax(preds)
-                                    proba = preds[p]
-                                    id = label.classes_[p]
-                                    name = getkey(id,staff_details)
-                                    if proba >= 0.6:
-                                        color = [int(c) for c in COLORS[p]]
-                                        cv2.rectangle(frame,(x,y),(x+w,y+h),color,2)
-                                        text = "{} {}".format(name,id)
-                                        cv2.putText(frame,text,(x,y - 5),cv2.FONT_HERSHEY_SIMPLEX,0.5,color,2)
-                                        predictions.append(id)
-                                    else:
-                                        name = "NONE"
-                                        id = "NONE"
-                                        color = (255,255,0)
-                                        text = "{} {}".format(name,id)
-                                        cv2.putText(frame,text,(x,y - 5),cv2.FONT_HERSHEY_SIMPLEX,0.5,color,2)
-                                        cv2.rectangle(frame,(x,y),(x+w,y+h),color,2)
-                                cv2.imshow("Capture",frame)
-                                key = cv2.waitKey(1)
-                                if key == ord('q'):
-                                    break
-                            except Exception as e:
-                                messagebox.showerror("Error",e)
-                                break
-                        vs.release()
-                        cv2.destroyAllWindows()
-                        print(liveness_predictor)
-                        final_label = mode(liveness_predictor)
-                        final_id = mode(predictions)
-                        final_name = getkey(final_id,staff_details)
-                        print(final_name)
-                        print(final_id)
-                        if final_label== "real":
-                            dt = datetime.now()
-                            dt = dt.strftime("%Y-%m-%d %I:%M:%S")
-                            date = str(dt).split(' ')[0]
-                            time = str(dt).split(' ')[1]
-                            time_hour = time.split(':')[0]
-                            time_minute = time.split(':')[1]
-                            start_hour = 0
-                            end_hour = 24
-                            status = "Present"
-                            cur1 = conn.cursor()
-                            cur1.execute("select name,date from report where name = %s and date = %s",(final_name,date))
-                            data = cur1.fetchall()
-                            if len(data)!= 0:
-                                messagebox.showwarning("Warning","Sorry {}.Your attendance has already been recorded".format(final_name))     
-                            else:
-                                if(int(time_hour) >= start_hour and int(time_hour) <= end_hour):
-                                    cur2 = conn.cursor()
-                                    cur2.execute("insert into report(id,name,date,time,status) VALUES (%s,%s,%s,%s,%s)", (final_id,
-                                                                                                                        final_name,
-                                                                                                                        date,
-                                                                                                                        time,
-                                                                                                                        status))
-
-                                    conn.commit()
+                        # its own position in the shared camera stream (see camera_service.py)
+                        reader = camera.reader()
+                        def read_frame():
+                            (ret,frame) = reader.read()
+                            if not ret:
+                                raise IOError("Could not read frame from camera")
+                            return frame
+                        def record_attendance(final_id,final_name):
+                            # True when recorded, False when already recorded today.
+                            # Answered from memory, the row is written by the recorder's own thread so MySQL never holds up a decision
+                            return attendance_recorder.record(final_id,final_name)
+                        def kiosk_decision(id,liveness):
+                            # shown on the person's box instead of a message box, nobody has to touch the UI
+                            if id is None:
+                                return ("Not recognized",False)
+                            if liveness != "real":
+                                return ("Spoofing attempted",False)
+                            name = identity_registry.name(id)
+                            if record_attendance(id,name):
+                                return ("Marked {}".format(name),True)
+                            return ("Already marked {}".format(name),False)
+                        # kiosk mode keeps the camera open and decides every tracked face on its own until cancelled
+                        recognition_engine.start_session(classifier,label_names,on_decision = kiosk_decision)
+                        recognition_engine.start(read_frame)
+                        # the window does not block, one session at a time until it closes and no photo samples
+                        # meanwhile (Student Management adds them, windows already open check camera_in_use)
+                        for button in (B1,B2):
+                            button.config(state = DISABLED)
+                        # the drawing loop runs on the recognition worker and the window only shows its newest frame,
+                        # so the admin UI stays responsive
+                        def recognize(stop_event,show):
+                            while not stop_event.is_set() and recognition_engine.running():
+                                frame_result = recognition_engine.next_result()
+                                if frame_result is not None:
+                                    show(recognition_engine.annotate(frame_result))
+                        def finish(error,lag):
+                            recognition_engine.stop()
+                            for button in (B1,B2):
+                                button.config(state = NORMAL)
+                            recognition_engine.report()
+                            print("[INFO] event loop lag while recognizing: {}".format(lag))
+                            if error is not None:
+                                messagebox.showerror("Error",error)
+                            if KIOSK_MODE:
+                                return
+                            if recognition_engine.decision() is None:
+                                # cancelled before a decision
+                                return
+                            (final_id,final_label) = recognition_engine.decision()
+                            final_name = identity_registry.name(final_id)
+                            print(final_name)
+                            print(final_id)
+                            if final_id is None and final_label != "spoof":
+                                messagebox.showinfo("Error","Face not recognized. Please try again")
+                            elif final_label== "real":
+                                if record_attendance(final_id,final_name):
                                     messagebox.showinfo("Success","Hello {}.Your attendance has been recorded successfully".format(final_name))
-                        else:
-                            messagebox.showinfo("Error","Spoofing attempted")
+                                else:
+                                    messagebox.showwarning("Warning","Sorry {}.Your attendance has already been recorded".format(final_name))
+                            else:
+                                messagebox.showinfo("Error","Spoofing attempted")
+                        Recognition_Window(attendance,"Face Recognizer",recognize,finish,status = recognition_engine.status,queue_length = recognition_engine.queue_length).start()
 
                     else:
                         messagebox.showerror("Error","Model file not found. Embeddings.pickle file and Recognizer.pickle file must exist within models directory.")
@@ -641,17 +652,12 @@ def login():
                         if oldpass_var.get() == "" or newuser_var.get() == "" or newpass_var.get() == "" :
                             messagebox.showerror('Error',' All fields are Required', parent = account)
                         else:
-                            conn = pymysql.connect(host = 'localhost', user = 'root', password = '', database = 'recognition')
-                            cur = conn.cursor()
-                            cur.execute('select * from login where password = %s',(oldpass_var.get()))
-                            row = cur.fetchone()
+                            row = database.fetchone('select * from login where password = %s',(oldpass_var.get()))
                             if row == None:
 
                                 messagebox.showerror('Error', 'Invalid Old Password', parent = account)
                             else:
-                                cur.execute('update login set password = %s , username = %s',(newpass_var.get(), newuser_var.get()))
-                                conn.commit()
-                                conn.close()
+                                database.execute('update login set password = %s , username = %s',(newpass_var.get(), newuser_var.get()))
                                 messagebox.showinfo('Success', 'Datas Reset Successfully', parent = account)
                                 account.destroy()
                         
@@ -692,47 +698,28 @@ def login():
 
                     ##################################################### To show all the datas from the database #######################################################################
                     def show_data():
-                        conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                        cur = conn.cursor()
-                        cur.execute("select * from report")
-                        data = cur.fetchall()
-                        if len(data)!= 0:
-                            report_table.delete(*report_table.get_children())
-                            for row in data:
-                                report_table.insert('', END, values = row)                                                                                                                                                                                                                                                                                                                                                                    
-                            conn.commit()
-                        conn.close()
+                        # only the first page is read, the rest is fetched while scrolling
+                        report_view.search(None,"")
 
                     ############################################ To save the csv data into mysql database ################################################################
 
 
                     def delete_data():
-                        conn = pymysql.connect(host = 'localhost', user = 'root', password = '', database = 'recognition')
-                        cur = conn.cursor()
                         selected_item = report_table.selection()[0]
                         uid = report_table.item(selected_item)['values'][0]
                         print("UID is ",uid)
-                        cur.execute('delete from report where id = %s',(uid))
-                        conn.commit()
-                        report_table.delete(selected_item)
+                        database.execute('delete from report where id = %s',(uid))
+                        report_view.remove(selected_item)
                         messagebox.showinfo('Success', ' Data Deleted Successfully', parent = report) 
-                        conn.close()
                     
                     
                     def search_data():
-                        conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-                        cur = conn.cursor()
-                    
-                        cur.execute("select * from report where " + str(search_by.get()) + " LIKE '%" + str(search_text.get()) + "%'")
-                        rows = cur.fetchall()
-                        if len(rows)!= 0:
-                            report_table.delete(*report_table.get_children())
-                            for row in rows:
-                                report_table.insert('', END, values = row)
-                            conn.commit()
-                        else:
+                        column = {"date":"date","name":"name"}.get(search_by.get())
+                        if column is None:
+                            messagebox.showerror('Error','Select what to search by', parent = report)
+                            return
+                        if report_view.search(column,search_text.get()) == 0:
                             messagebox.showinfo('Sorry', 'No Data Found', parent = report)
-                        conn.close()
 
                 
                     
@@ -777,6 +764,10 @@ def login():
                     report_table.column("Time", width = 140)
                     report_table.column('Status', width = 140)
                     report_table.pack(fill = BOTH, expand = 1)
+                    # newest marks first, clicking ID, Name, Date or Time sorts by that column in MySQL
+                    report_view = Virtual_Table(report_table,scroll_y,Report_Pager(report_table['columns']))
+                    # today's new marks show up on their own while the screen is open, no need to press Show All
+                    Live_Refresh(report_view).start()
 
                     show_data()
                     # save_data()  
@@ -822,6 +813,7 @@ def login():
                         [image_ids,image_paths,image_arrays,names,face_ids] = embedding_obj.get_all_face_pixels(staff_details)
                         face_pixels = embedding_obj.normalize_pixels(imagearrays = image_arrays)
                         def start_extracting_embedding(pixels):   
+                            embedding_model = model_loader.get('embedding')
                             embeddings = []
                             for (i,face_pixel) in enumerate(face_pixels):
                                 j = i+1
@@ -863,6 +855,7 @@ def login():
                             [image_ids,image_paths,image_arrays,names,face_ids] = data
                             face_pixels = embedding_obj.normalize_pixels(imagearrays = image_arrays)
                             def start_extracting_embedding(pixels):   
+                                embedding_model = model_loader.get('embedding')
                                 embeddings = []
                                 for (i,face_pixel) in enumerate(face_pixels):
                                     j = i+1
@@ -966,6 +959,8 @@ def login():
                 B8 = Button(attendance, text = "Extract Embeddings", fg = "green", font = ("Times new Roman", 15), image = photo8, height = 230, width = 265,command= face_embedding, compound = BOTTOM)
                 B8.place(x = 1040, y =100)
                 attendance.mainloop()
+                # marks still queued (MySQL down or a batch in flight) get a last chance to be written
+                attendance_recorder.close()
         except pymysql.err.OperationalError as e:
             messagebox.showerror( "Error","Sql Connection Error... Open Xamp Control Panel and then start MySql Server ")
         except Exception as e:
@@ -992,6 +987,27 @@ title.place(x = 0, y = 0, relwidth = 1)
 clock = Label(face , font = ("times",20,"bold"), bg = "green", relief = GROOVE)
 clock.place(x = 1000, y= 600)
 tick()
+startup = {}
+def login_shown(event):
+    if event.widget is not face or 'login_window_s' in startup:
+        return
+    startup['login_window_s'] = time.time() - startup_time
+    print("[INFO] Login window shown {:.2f} s after startup".format(startup['login_window_s']))
+    model_loader.start()
+    # USB cameras take a second or two to open and settle, do it now rather than on the first button press
+    threading.Thread(target=camera.start,daemon=True).start()
+    if args.startup_benchmark:
+        face.after(100,finish_startup_benchmark)
+def finish_startup_benchmark():
+    # run_benchmarks.py starts the app with --startup-benchmark and reads this line
+    if model_loader.thread.is_alive():
+        face.after(100,finish_startup_benchmark)
+        return
+    startup['models_ready_s'] = time.time() - startup_time
+    startup['models'] = model_loader.timings
+    print("STARTUP " + json.dumps(startup))
+    face.destroy()
+face.bind('<Map>',login_shown)
 login_frame= Frame(face, bg = "white" )
 login_frame.place(x = 400, y = 200)
 logo_icon = PhotoImage(file = "Photos/logo.png", master= login_frame)
@@ -0,0 +1,144 @@
+"""
+Long-lived camera shared by recognition and enrollment.
+The device is opened once, resolution, FOURCC and FPS are set once, and a
+reader thread keeps it streaming so exposure stays settled between sessions.
+Every screen reads through its own reader(), which hands out the newest frame
+that screen has not had yet, so a screen can start using the camera instantly
+instead of paying for VideoCapture negotiation every time, and two screens
+reading at once (recognition and enrollment) do not take frames from each
+other. While no screen is reading, frames are only grabbed, not decoded, so a
+reader that is paced down (see motion_gate.Frame_Rate_Governor) only pays for
+the frames it takes.
+"""
+import threading
+import time
+
+import cv2
+
+
+class Camera_Service:
+    def __init__(self,device=0,width=640,height=480,fps=30,fourcc='MJPG',idle_after=0.1,open_capture=cv2.VideoCapture):
+        self.device = device
+        self.settings = (width,height,fps,fourcc)
+        self.idle_after = idle_after
+        self.open_capture = open_capture
+        self.capture = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+        self.frame = None
+        self.sequence = 0
+        self.default_reader = None
+        self.last_request = 0.0
+        self.waiting = 0
+        self.running = False
+        self.opens = 0
+        self.error = None
+
+    def configure(self,capture):
+        (width,height,fps,fourcc) = self.settings
+        # FOURCC first, some UVC cameras only offer the higher resolutions compressed
+        if fourcc:
+            capture.set(cv2.CAP_PROP_FOURCC,cv2.VideoWriter_fourcc(*fourcc))
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH,width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT,height)
+        capture.set(cv2.CAP_PROP_FPS,fps)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return self
+            if self.capture is not None:
+                # the reader stopped on an error, open the device again
+                self.capture.release()
+            self.capture = self.open_capture(self.device)
+            self.opens += 1
+            self.configure(self.capture)
+            self.running = True
+            self.error = None
+            self.thread = threading.Thread(target=self.run,name="camera",daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while self.running:
+            if not self.waiting and time.time() - self.last_request >= self.idle_after:
+                # nobody is reading: keep the stream and exposure going without decoding
+                if not self.capture.grab():
+                    self.fail(IOError("Could not read frame from camera"))
+                    return
+                continue
+            (ret,frame) = self.capture.read()
+            if not ret:
+                self.fail(IOError("Could not read frame from camera"))
+                return
+            with self.new_frame:
+                self.frame = frame
+                self.sequence += 1
+                self.new_frame.notify_all()
+
+    def fail(self,error):
+        with self.new_frame:
+            self.error = error
+            self.running = False
+            self.new_frame.notify_all()
+
+    def reader(self):
+        return Camera_Reader(self)
+
+    def read(self,timeout=2.0):
+        # for a single consumer such as a script, screens that may read at the same time take a reader() each
+        if self.default_reader is None:
+            self.default_reader = self.reader()
+        return self.default_reader.read(timeout)
+
+    def read_after(self,after,timeout=2.0):
+        """
+        (sequence,frame) of the newest frame after sequence `after`, waiting for
+        it up to timeout, or (None,None) on timeout or when the camera fails.
+        """
+        self.last_request = time.time()
+        if not self.running:
+            self.start()
+        with self.new_frame:
+            end = time.time() + timeout
+            self.waiting += 1
+            try:
+                while self.sequence <= after and self.running:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        return (None,None)
+                    self.new_frame.wait(remaining)
+            finally:
+                self.waiting -= 1
+                self.last_request = time.time()
+            if self.sequence <= after:
+                return (None,None)
+            return (self.sequence,self.frame)
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class Camera_Reader:
+    """
+    One consumer's position in the shared stream. read() has the same return
+    value as VideoCapture.read(): (True,frame) with a frame this reader has not
+    had before, or (False,None) when the camera fails. It starts with the
+    frames after it was created, not the last one decoded before.
+    """
+    def __init__(self,camera):
+        self.camera = camera
+        self.last_read = camera.sequence
+
+    def read(self,timeout=2.0):
+        (sequence,frame) = self.camera.read_after(self.last_read,timeout)
+        if sequence is None:
+            return (False,None)
+        self.last_read = sequence
+        return (True,frame)
@@ -0,0 +1,48 @@
+"""
+Compiled inference path for the Keras models.
+Keras predict() builds a data pipeline and callbacks on every call, which costs
+more than the model itself for the one to a few faces the recognition loop
+sends. Compiled_Model traces the model once into a tf.function with a fixed
+input signature (only the batch size is left open, so it is never retraced),
+optionally compiled with XLA, and returns NumPy like predict() does.
+Fused_Model does the same for the liveness model and FaceNet together.
+"""
+import numpy as np
+
+
+class Compiled_Model:
+    def __init__(self,model,jit_compile=False):
+        import tensorflow as tf
+        self.model = model
+        self.jit_compile = jit_compile
+        self.input_shape = tuple(model.input_shape)
+        signature = [tf.TensorSpec((None,) + self.input_shape[1:],tf.float32)]
+        # experimental_compile is the XLA switch of the pinned TensorFlow 2.4 (jit_compile came in 2.5), later 2.x still take it
+        self.function = tf.function(lambda batch: model(batch,training=False),input_signature=signature,experimental_compile=jit_compile)
+
+    def predict(self,batch):
+        return self.function(np.asarray(batch,dtype='float32')).numpy()
+
+
+class Fused_Model:
+    """
+    Liveness and FaceNet in one traced function. It takes the uint8 face crops
+    once, does both preprocessings in the graph (scaled to [0,1] for liveness,
+    standardized per face for FaceNet) and returns (liveness_scores,embeddings),
+    so each frame is a single call into TensorFlow.
+    """
+    def __init__(self,embedding_model,liveness_model,jit_compile=False):
+        import tensorflow as tf
+        self.jit_compile = jit_compile
+        self.input_shape = tuple(embedding_model.input_shape)
+        def run(crops):
+            faces = tf.cast(crops,tf.float32)
+            mean = tf.reduce_mean(faces,axis=[1,2,3],keepdims=True)
+            std = tf.math.reduce_std(faces,axis=[1,2,3],keepdims=True)
+            return (liveness_model(faces / 255.0,training=False),embedding_model((faces - mean) / std,training=False))
+        signature = [tf.TensorSpec((None,) + self.input_shape[1:],tf.uint8)]
+        self.function = tf.function(run,input_signature=signature,experimental_compile=jit_compile)
+
+    def predict(self,crops):
+        (scores,embeddings) = self.function(np.asarray(crops,dtype='uint8'))
+        return (scores.numpy(),embeddings.numpy())
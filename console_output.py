@@ -0,0 +1,42 @@
+"""
+Coloured console output shared by run_tests.py and run_benchmarks.py
+"""
+
+class Colors:
+    """ANSI color codes for terminal output"""
+    HEADER = '\033[95m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    GREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+def print_header(text):
+    """Print formatted header"""
+    print(f"\n{Colors.HEADER}{Colors.BOLD}{'='*80}{Colors.ENDC}")
+    print(f"{Colors.HEADER}{Colors.BOLD}{text.center(80)}{Colors.ENDC}")
+    print(f"{Colors.HEADER}{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
+
+def print_subheader(text):
+    """Print formatted subheader"""
+    print(f"\n{Colors.CYAN}{Colors.BOLD}{text}{Colors.ENDC}")
+    print(f"{Colors.CYAN}{'-'*60}{Colors.ENDC}")
+
+def print_success(text):
+    """Print success message"""
+    print(f"{Colors.GREEN}✓ {text}{Colors.ENDC}")
+
+def print_error(text):
+    """Print error message"""
+    print(f"{Colors.FAIL}✗ {text}{Colors.ENDC}")
+
+def print_warning(text):
+    """Print warning message"""
+    print(f"{Colors.WARNING}⚠ {text}{Colors.ENDC}")
+
+def print_info(text):
+    """Print info message"""
+    print(f"{Colors.BLUE}ℹ {text}{Colors.ENDC}")
@@ -0,0 +1,164 @@
+"""
+Shared MySQL access for the GUIs and event_scheduler.
+One thread-safe Connection_Pool keeps a few authenticated connections open and
+hands them out, so a busy day does not pay the TCP connect and login for every
+query. The helpers below take parameterized SQL (%s placeholders, values passed
+separately, never formatted into the string) and give the connection back to
+the pool when done, also on errors. A connection that failed at the MySQL level
+is dropped and replaced by a fresh one on the next checkout.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+# autocommit: a pooled connection must not keep an open transaction between checkouts, under
+# REPEATABLE READ its reads would stay on the first snapshot and miss rows other machines wrote since
+DB_SETTINGS = {'host':'localhost','user':'root','password':'','database':'recognition','autocommit':True}
+
+
+class Connection_Pool:
+    def __init__(self,size=5,timeout=10.0,ping_after=60.0,connect=None,**settings):
+        self.settings = dict(DB_SETTINGS)
+        self.settings.update(settings)
+        self.size = size
+        self.timeout = timeout
+        # a connection idle for longer than ping_after is pinged (and reconnected) before it is handed out
+        self.ping_after = ping_after
+        self.connect = connect or (lambda: pymysql.connect(**self.settings))
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.active = 0
+        self.checkouts = 0
+        self.wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def acquire(self):
+        start = time.time()
+        conn = None
+        create = False
+        with self.lock:
+            try:
+                (conn,last_used) = self.idle.get_nowait()
+            except queue.Empty:
+                if self.created < self.size:
+                    self.created += 1
+                    create = True
+        if create:
+            try:
+                conn = self.connect()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+            last_used = time.time()
+        elif conn is None:
+            try:
+                (conn,last_used) = self.idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise pymysql.err.OperationalError(2003,"No free database connection after {:.0f} s".format(self.timeout))
+        if time.time() - last_used >= self.ping_after:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                self.discard(conn)
+                raise
+        waited = time.time() - start
+        with self.lock:
+            self.active += 1
+            self.checkouts += 1
+            self.wait_s += waited
+            self.max_wait_s = max(self.max_wait_s,waited)
+        return conn
+
+    def release(self,conn):
+        with self.lock:
+            self.active -= 1
+        self.idle.put((conn,time.time()))
+
+    def discard(self,conn,was_active=False):
+        with self.lock:
+            self.created -= 1
+            if was_active:
+                self.active -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError,pymysql.err.InterfaceError):
+            # the server went away or the connection is in an unknown state
+            self.discard(conn,was_active=True)
+            raise
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self.discard(conn,was_active=True)
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def metrics(self):
+        with self.lock:
+            return {'checkouts':self.checkouts,'active':self.active,'open':self.created,'idle':self.idle.qsize(),
+                    'wait_s':round(self.wait_s,4),'mean_wait_ms':round(1000 * self.wait_s / self.checkouts,3) if self.checkouts else 0.0,
+                    'max_wait_ms':round(1000 * self.max_wait_s,3)}
+
+    def close(self):
+        while True:
+            try:
+                (conn,last_used) = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+
+# the pool every module shares, connections are only opened on first use
+pool = Connection_Pool()
+
+
+def fetchall(sql,args=None):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql,args)
+        return cur.fetchall()
+
+
+def fetchone(sql,args=None):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql,args)
+        return cur.fetchone()
+
+
+def execute(sql,args=None):
+    # one statement in its own transaction, returns the affected row count
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        rows = cur.execute(sql,args)
+        conn.commit()
+        return rows
+
+
+def executemany(sql,rows):
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        count = cur.executemany(sql,rows)
+        conn.commit()
+        return count
+
+
+def like_pattern(text):
+    # LIKE '%text%' with the user's % and _ matched literally
+    return "%" + text.replace("\\","\\\\").replace("%","\\%").replace("_","\\_") + "%"
@@ -0,0 +1,107 @@
+"""
+Streaming attendance decision for one person in front of the camera.
+Every fresh recognition is a vote: the identity's vote count goes up and its
+evidence grows by the log-odds log(p / (1 - p)) of the vote's confidence. The
+decision is made as soon as the leading identity has enough votes and leads the
+runner-up by the margin, instead of after a fixed number of frames. Liveness
+votes are counted the same way. A clear spoof ends the session at once. At the
+timeout the current leader is taken if it has min_votes and leads at all,
+otherwise nobody is recognized and the person tries again.
+"""
+import math
+import time
+
+# a vote at p = 0.9975 or above counts the same, so one overconfident frame cannot decide alone
+MAX_LOG_ODDS = 6.0
+
+
+def log_odds(proba):
+    proba = min(max(float(proba),1e-6),1 - 1e-6)
+    return min(math.log(proba / (1 - proba)),MAX_LOG_ODDS)
+
+
+class Decision_Engine:
+    def __init__(self,margin=5.0,min_votes=3,timeout=10.0,liveness_margin=2):
+        self.margin = margin
+        self.min_votes = min_votes
+        self.timeout = timeout
+        self.liveness_margin = liveness_margin
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.time()
+        self.decided_at = None
+        self.result = None
+        self.counts = {}
+        self.evidence = {}
+        self.liveness_counts = {}
+
+    def add(self,id,proba,liveness=None):
+        """
+        id is None for a face below the recognition threshold, it then only
+        counts as a liveness vote. liveness is None when anti-spoofing is off.
+        """
+        if self.result is not None:
+            return
+        if id is not None:
+            self.counts[id] = self.counts.get(id,0) + 1
+            self.evidence[id] = self.evidence.get(id,0.0) + log_odds(proba)
+        if liveness is not None:
+            self.liveness_counts[liveness] = self.liveness_counts.get(liveness,0) + 1
+
+    def leader(self):
+        # (best id, its lead in evidence over the runner-up)
+        if not self.evidence:
+            return (None,0.0)
+        ranked = sorted(self.evidence.items(),key=lambda item: item[1],reverse=True)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return (ranked[0][0],ranked[0][1] - runner_up)
+
+    def liveness(self):
+        # 'real', 'spoof' or None while undecided, 'real' when anti-spoofing is off
+        if not self.liveness_counts:
+            return 'real'
+        lead = self.liveness_counts.get('real',0) - self.liveness_counts.get('spoof',0)
+        if lead >= self.liveness_margin:
+            return 'real'
+        if -lead >= self.liveness_margin:
+            return 'spoof'
+        return None
+
+    def majority_liveness(self):
+        if not self.liveness_counts:
+            return 'real'
+        return max(self.liveness_counts.items(),key=lambda item: item[1])[0]
+
+    def decide(self,result):
+        self.result = result
+        self.decided_at = time.time()
+        return result
+
+    def decision(self):
+        """
+        Returns (id,liveness_label) once decided, None while still collecting.
+        id is None when nobody had min_votes and a lead over the runner-up by the timeout.
+        """
+        if self.result is not None:
+            return self.result
+        (id,lead) = self.leader()
+        liveness = self.liveness()
+        if liveness == 'spoof':
+            return self.decide((id,'spoof'))
+        if id is not None and self.counts[id] >= self.min_votes and lead >= self.margin and liveness == 'real':
+            return self.decide((id,'real'))
+        if time.time() - self.started_at >= self.timeout:
+            if id is None or self.counts[id] < self.min_votes or lead <= 0:
+                id = None
+            return self.decide((id,self.majority_liveness()))
+        return None
+
+    def decision_latency(self):
+        # seconds from the start of the session to the decision, None while undecided
+        if self.decided_at is None:
+            return None
+        return self.decided_at - self.started_at
+
+    def votes(self):
+        return sum(self.counts.values())
@@ -1,44 +1,34 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-import pymysql
+import database
 from datetime import datetime
 import smtplib
 from mark_attendance import Mark_Attendance
 from email.message import EmailMessage
 
+# the recorder of the GUI running this scheduler, set by the GUI so the absentees written
+# here count as marked there too (see attendance_recorder.py)
+attendance_recorder = None
+
 def getall_staffs():
-    conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-    cur = conn.cursor()
-    cur.execute("select eid,email_address from attendance")
-    data = cur.fetchall()
+    data = database.fetchall("select eid,email_address from attendance")
     all_staffs = {}
     if len(data) != 0:
         for(id,email) in data:
             all_staffs[id] = email
-    conn.close()
     return all_staffs
 
 def registered_vs_absent_staffs(all_staffs):
     dt = datetime.now()
-    dt = dt.strftime("%Y-%m-%d %I:%M:%S")
-    date = str(dt).split(' ')[0]
-    time = str(dt).split(' ')[1]
-    time_hour = time.split(':')[0]
-    time_minute = time.split(':')[1]
+    date = dt.strftime("%Y-%m-%d")
     start_hour = 1
     end_hour = 11
-    # start_minute = 0
-    # end_minute = 0
-    conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-    cur = conn.cursor()
-    cur.execute("select id,time from report where date=%s ",(date))
-    output = cur.fetchall()
+    # marks from start_hour:00 up to the end of end_hour, a range scan on the (date,time,id) index (see migrate.py)
+    output = database.fetchall("select id from report where date = %s and time >= %s and time < %s",
+                               (date,"{:02d}:00:00".format(start_hour),"{:02d}:00:00".format(end_hour + 1)))
     if len(output)!= 0:
         registered_staff_ids = []
-        for(x,y) in output:
-            y_hour = y.split(":")[0]
-            y_minute = y.split(":")[1]
-            if(int(y_hour) >= start_hour and int(y_hour) <= end_hour):
-                registered_staff_ids.append(int(x))
+        for(x,) in output:
+            registered_staff_ids.append(int(x))
         absent_staff_ids = []
         all_staff_ids = list(all_staffs.keys())
         for x in all_staff_ids:
@@ -46,7 +36,6 @@ def registered_vs_absent_staffs(all_staffs):
                 absent_staff_ids.append(x)
     else:
         absent_staff_ids = list(all_staffs.keys())
-    conn.close()
     return absent_staff_ids
 
 def absent_emails():
@@ -60,13 +49,9 @@ def absent_emails():
 
 def get_manager_email():
     department = "Manager"
-    conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-    cur = conn.cursor()
-    cur.execute("select email_address from attendance where department=%s ",(department))
-    data = cur.fetchall()
+    data = database.fetchall("select email_address from attendance where department=%s ",(department))
     if len(data) != 0:
         manager_email = data[0][0]
-    conn.close()
     return manager_email
 
 def generate_attendance_sheet():
@@ -74,10 +59,7 @@ def generate_attendance_sheet():
     date = str(dt).split(' ')[0]
     csv_name = 'Attendance_Details/attendance_{}.csv'.format(date)
     mark_attendance_obj = Mark_Attendance(csv_filename=csv_name)
-    conn = pymysql.connect(host = 'localhost', user = 'root', password ='', database = 'recognition')
-    cur = conn.cursor()
-    cur.execute('select * from report where date = %s ', (date))
-    mydata = cur.fetchall()
+    mydata = database.fetchall('select * from report where date = %s ', (date))
     if len(mydata) < 1:
         print("No data found in database")
     else:
@@ -94,24 +76,21 @@ def send_mail():
     absent_staff_emails = absent_emails()
     print(absent_staff_emails)
     dt = datetime.now()
-    dt = dt.strftime("%Y-%m-%d %I:%M:%S")
+    dt = dt.strftime("%Y-%m-%d %H:%M:%S")
     date = str(dt).split(' ')[0]
     time = str(dt).split(' ')[1]
+    status = "Absent"
+    if attendance_recorder is not None:
+        # a mark the recorder has not written yet keeps its Present
+        absent_staff_ids = attendance_recorder.mark_absent(absent_staff_ids,date)
+    absent_rows = []
     for id in absent_staff_ids:
-        status = "Absent"
-        conn = pymysql.connect(host = "localhost", user = "root", password = "", database = "recognition")
-        cur1 = conn.cursor()
-        cur1.execute("select fname from attendance where eid=%s ",id)
-        output = cur1.fetchone()
+        output = database.fetchone("select fname from attendance where eid=%s ",id)
         (name,) = output
-        cur2 = conn.cursor()
-        cur2.execute("insert into report(id,name,date,time,status) VALUES (%s,%s,%s,%s,%s)", (id,
-                                                                                              name,
-                                                                                              date,
-                                                                                              time,
-                                                                                              status))
-        conn.commit()
-        conn.close()
+        absent_rows.append((id,name,date,time,status))
+    # all absentees in one transaction on one pooled connection, someone who came in after the window keeps the mark they have
+    if absent_rows:
+        database.executemany("insert ignore into report(id,name,date,time,status) VALUES (%s,%s,%s,%s,%s)",absent_rows)
         print("Attendance for absent staffs has been recorded successfully")
 
     server = smtplib.SMTP('smtp.gmail.com',587)
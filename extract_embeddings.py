@@ -1,21 +1,25 @@
 import cv2
 import os
 import numpy as np
-from tensorflow.keras.models import load_model
 import pickle
+from identity_registry import Identity_Registry
+from model_loader import load_keras_model
 
 
 rootdir = os.getcwd()
 
 class Extract_Embeddings():
 
-	def __init__(self,model_path):
+	def __init__(self,model_path,registry=None):
 		self.model_path = model_path		
 		self.dataset_dir = os.path.join(rootdir,'dataset')
+		# dataset/ is only scanned again when it changes
+		self.registry = registry if registry is not None else Identity_Registry(self.dataset_dir)
 
 
 	def load_model(self):
-		model = load_model(self.model_path)
+		# TensorFlow is imported here, not when this module is imported
+		model = load_keras_model(self.model_path)
 		return model
 
 	def check_pretrained_file(self,embeddings_model):
@@ -26,13 +30,7 @@ class Extract_Embeddings():
 		return [data,unique_names]
 
 	def get_staff_details(self):
-		details = os.listdir(self.dataset_dir)
-		staff_details = {}
-		for item in details:
-			name = item.split("_")[0]
-			id = item.split("_")[1]
-			staff_details[name] = id
-		return staff_details
+		return dict(self.registry.refresh().name_to_id)
 
 	def get_remaining_names(self,dictionaries,unique_names):
 		self.dictionaries = dictionaries
@@ -0,0 +1,166 @@
+"""
+Batched face inference for the recognition loop.
+All the faces detected in one frame are stacked into a single tensor so that
+the liveness model, FaceNet and the classifier each run once per frame.
+"""
+import cv2
+import numpy as np
+
+FACE_SIZE = (160,160)
+
+
+def crop_faces(frame,faces,margin=5):
+    # same crop and resize as the one by one loop
+    resized_faces = []
+    for (x,y,w,h) in faces:
+        face = frame[y-margin:y+h+margin,x-margin:x+w+margin]
+        resized_faces.append(cv2.resize(face,FACE_SIZE))
+    return resized_faces
+
+
+def liveness_label(score):
+    if score > 0.9:
+        return 'spoof'
+    elif score < 0.5:
+        return 'real'
+    else:
+        return 'none'
+
+
+class Svm_Classifier:
+    """
+    Wraps the calibrated SVM from training.py. identify() returns one
+    (id, proba, class_index) tuple per embedding.
+    """
+    def __init__(self,recognizer,label,threshold=0.6):
+        self.recognizer = recognizer
+        self.label = label
+        self.classes_ = label.classes_
+        self.threshold = threshold
+
+    def identify(self,embeddings):
+        results = []
+        for preds in self.recognizer.predict_proba(embeddings):
+            p = np.argmax(preds)
+            results.append((self.classes_[p],preds[p],p))
+        return results
+
+
+class Preprocess_Buffers:
+    """
+    Preallocated float32 batch buffers for the recognition loop. Faces are
+    resized straight into the crop buffer and both the liveness scaling and the
+    FaceNet standardization are computed in place, so a steady stream of frames
+    does almost no allocation. Buffers only grow when a frame has more faces
+    than they can hold.
+    """
+    def __init__(self,max_batch=8,face_size=FACE_SIZE):
+        self.face_size = face_size
+        self.capacity = 0
+        self.reserve(max_batch)
+
+    def reserve(self,n):
+        if n <= self.capacity:
+            return
+        self.capacity = max(n,2 * self.capacity)
+        (w,h) = self.face_size
+        self.crops = np.empty((self.capacity,h,w,3),dtype='uint8')
+        self.scaled = np.empty((self.capacity,h,w,3),dtype='float32')
+        self.standardized = np.empty((self.capacity,h,w,3),dtype='float32')
+
+    def load_crops(self,frame,faces,margin=5):
+        # same crop as crop_faces, resized into the buffer instead of a new array
+        self.reserve(len(faces))
+        for (i,(x,y,w,h)) in enumerate(faces):
+            cv2.resize(frame[y-margin:y+h+margin,x-margin:x+w+margin],self.face_size,dst=self.crops[i])
+        return len(faces)
+
+    def load_faces(self,resized_faces):
+        self.reserve(len(resized_faces))
+        for (i,face) in enumerate(resized_faces):
+            self.crops[i] = face
+        return len(resized_faces)
+
+    def liveness_batch(self,n):
+        # pixels scaled to [0,1] for the liveness model
+        batch = self.scaled[:n]
+        np.copyto(batch,self.crops[:n])
+        np.multiply(batch,np.float32(1.0 / 255.0),out=batch)
+        return batch
+
+    def standardized_batch(self,n):
+        # every face standardized with its own mean and std, as normalize_pixels does for a single face.
+        # one face at a time with scalars: broadcasting a per-face column makes numpy allocate scratch buffers
+        batch = self.standardized[:n]
+        np.copyto(batch,self.crops[:n])
+        for face in batch.reshape(n,-1):
+            np.subtract(face,face.mean(),out=face)
+            np.divide(face,np.sqrt(np.dot(face,face) / face.size),out=face)
+        return batch
+
+
+class Batch_Recognizer:
+    def __init__(self,embedding_model,classifier,liveness_model=None,max_batch=8,fused_model=None,prefilter=None):
+        # fused_model (compiled_model.Fused_Model) runs liveness and FaceNet in one call on the raw crops,
+        # prefilter (liveness_filter.Liveness_Prefilter) settles the obvious faces before the liveness model
+        self.embedding_model = embedding_model
+        self.classifier = classifier
+        self.threshold = classifier.threshold
+        self.liveness_model = liveness_model
+        self.fused_model = fused_model
+        self.prefilter = prefilter
+        self.buffers = Preprocess_Buffers(max_batch)
+
+    def predict_liveness(self,n,rows=None):
+        batch = self.buffers.liveness_batch(n)
+        if rows is not None:
+            batch = batch[rows]
+        scores = self.liveness_model.predict(batch)
+        return np.asarray(scores).reshape(len(batch),-1)[:,0]
+
+    def predict_embeddings(self,n):
+        embeddings = self.embedding_model.predict(self.buffers.standardized_batch(n))
+        return np.asarray(embeddings).reshape(n,-1)
+
+    def prefilter_labels(self,n):
+        labels = [self.prefilter.classify(self.buffers.crops[i]) for i in range(n)]
+        return (labels,[i for (i,label) in enumerate(labels) if label is None])
+
+    def predict_loaded(self,n):
+        if n == 0:
+            return []
+        if self.liveness_model is None and self.fused_model is None:
+            (labels,ambiguous) = ([None] * n,[])
+        elif self.prefilter is not None:
+            (labels,ambiguous) = self.prefilter_labels(n)
+        else:
+            (labels,ambiguous) = ([None] * n,list(range(n)))
+        if self.fused_model is not None and ambiguous:
+            (scores,embeddings) = self.fused_model.predict(self.buffers.crops[:n])
+            scores = np.asarray(scores).reshape(n,-1)[:,0]
+            for i in ambiguous:
+                labels[i] = liveness_label(scores[i])
+            embeddings = np.asarray(embeddings).reshape(n,-1)
+        else:
+            if ambiguous:
+                scores = self.predict_liveness(n,ambiguous if len(ambiguous) < n else None)
+                for (i,score) in zip(ambiguous,scores):
+                    labels[i] = liveness_label(score)
+            embeddings = self.predict_embeddings(n)
+        identities = self.classifier.identify(embeddings)
+        return [(label_name,id,proba,p) for (label_name,(id,proba,p)) in zip(labels,identities)]
+
+    def predict_faces(self,frame,faces):
+        """
+        Crops the face boxes out of the frame and recognizes them in one batch.
+        Returns one (liveness_label, id, proba, class_index) tuple per face.
+        liveness_label is None when no liveness model is loaded, a face is
+        recognized when proba >= self.threshold.
+        """
+        return self.predict_loaded(self.buffers.load_crops(frame,faces))
+
+    def predict(self,resized_faces):
+        """
+        Same as predict_faces for faces that are already resized to FACE_SIZE.
+        """
+        return self.predict_loaded(self.buffers.load_faces(resized_faces))
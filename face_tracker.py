@@ -0,0 +1,111 @@
+"""
+Follow detected faces between Haar cascade runs.
+The cascade only runs every few frames (or when a track is lost); in between
+every face box is followed with a small template match around its last position.
+"""
+import cv2
+
+# template width used for matching, faces are shrunk to this before tracking
+TEMPLATE_WIDTH = 32
+# the cascade runs on the gray frame shrunk by this factor, boxes are mapped back to full resolution
+DETECTION_SCALE = 0.5
+
+
+def detect_faces(face_cascade,gray,scale=DETECTION_SCALE):
+    if scale == 1.0:
+        return [tuple(int(v) for v in box) for box in face_cascade.detectMultiScale(gray,1.3,5)]
+    small = cv2.resize(gray,None,fx=scale,fy=scale,interpolation=cv2.INTER_AREA)
+    faces = face_cascade.detectMultiScale(small,1.3,5)
+    return [tuple(int(round(v / scale)) for v in box) for box in faces]
+
+
+def box_iou(box1,box2):
+    (x1,y1,w1,h1) = box1
+    (x2,y2,w2,h2) = box2
+    inter_w = max(0,min(x1 + w1,x2 + w2) - max(x1,x2))
+    inter_h = max(0,min(y1 + h1,y2 + h2) - max(y1,y2))
+    inter = inter_w * inter_h
+    union = w1 * h1 + w2 * h2 - inter
+    return inter / float(union) if union > 0 else 0.0
+
+
+class Face_Tracker:
+    def __init__(self,face_cascade,detect_every=5,min_confidence=0.6,search_margin=0.5,detect_scale=DETECTION_SCALE):
+        self.face_cascade = face_cascade
+        self.detect_scale = detect_scale
+        self.detect_every = detect_every
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.tracks = []
+        self.next_id = 1
+        self.frames = 0
+        self.detections = 0
+
+    def detect(self,gray):
+        self.detections += 1
+        return detect_faces(self.face_cascade,gray,self.detect_scale)
+
+    def make_template(self,gray,box):
+        (x,y,w,h) = box
+        scale = TEMPLATE_WIDTH / float(w)
+        face = gray[y:y+h,x:x+w]
+        template = cv2.resize(face,(TEMPLATE_WIDTH,max(1,int(round(h * scale)))))
+        return (template,scale)
+
+    def assign_tracks(self,gray,faces):
+        # keep the id of the track that overlaps a new detection the most
+        tracks = []
+        unmatched = list(self.tracks)
+        for box in faces:
+            box = tuple(int(v) for v in box)
+            best = None
+            best_iou = 0.3
+            for track in unmatched:
+                iou = box_iou(track['box'],box)
+                if iou > best_iou:
+                    best,best_iou = track,iou
+            if best is not None:
+                unmatched.remove(best)
+                track_id = best['id']
+            else:
+                track_id = self.next_id
+                self.next_id += 1
+            (template,scale) = self.make_template(gray,box)
+            tracks.append({'id':track_id,'box':box,'template':template,'scale':scale,'confidence':1.0})
+        self.tracks = tracks
+
+    def follow(self,gray,track):
+        (x,y,w,h) = track['box']
+        (img_h,img_w) = gray.shape[:2]
+        mx = int(w * self.search_margin)
+        my = int(h * self.search_margin)
+        x0,y0 = max(0,x - mx),max(0,y - my)
+        x1,y1 = min(img_w,x + w + mx),min(img_h,y + h + my)
+        scale = track['scale']
+        window = cv2.resize(gray[y0:y1,x0:x1],(max(1,int(round((x1 - x0) * scale))),max(1,int(round((y1 - y0) * scale)))))
+        template = track['template']
+        if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+            return 0.0
+        result = cv2.matchTemplate(window,template,cv2.TM_CCOEFF_NORMED)
+        (_,confidence,_,(loc_x,loc_y)) = cv2.minMaxLoc(result)
+        track['box'] = (x0 + int(round(loc_x / scale)),y0 + int(round(loc_y / scale)),w,h)
+        track['confidence'] = confidence
+        return confidence
+
+    def update(self,gray):
+        """
+        Returns a list of (track_id,(x,y,w,h)) for the faces in this frame.
+        """
+        redetect = self.frames % self.detect_every == 0
+        self.frames += 1
+        if not redetect:
+            for track in self.tracks:
+                if self.follow(gray,track) < self.min_confidence:
+                    redetect = True
+                    break
+        if redetect:
+            self.assign_tracks(gray,self.detect(gray))
+        return [(track['id'],track['box']) for track in self.tracks]
+
+    def detection_rate(self):
+        return self.detections / float(self.frames) if self.frames else 0.0
@@ -0,0 +1,128 @@
+"""
+Threaded capture -> detect -> infer pipeline for the recognition loop.
+Stages are joined by small bounded queues that drop the oldest item when full,
+so the frame rate is set by the slowest stage and stale frames never pile up.
+"""
+import queue
+import threading
+import time
+
+
+class Latest_Queue:
+    def __init__(self,maxsize=1):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self,item):
+        with self.lock:
+            if self.queue.full():
+                # drop the stale item to make room for the newest one
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+            self.queue.put_nowait(item)
+
+    def get(self,timeout=None):
+        return self.queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+class Pipeline_Stage(threading.Thread):
+    def __init__(self,name,function,input_queue,output_queue,stop_event,on_error):
+        threading.Thread.__init__(self,name=name,daemon=True)
+        self.function = function
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.on_error = on_error
+        self.processed = 0
+        self.started_at = None
+
+    def next_item(self):
+        while not self.stop_event.is_set():
+            try:
+                return self.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def run(self):
+        self.started_at = time.time()
+        while not self.stop_event.is_set():
+            item = self.next_item() if self.input_queue is not None else ()
+            if item is None:
+                break
+            try:
+                result = self.function(*item)
+            except Exception as e:
+                self.on_error(e)
+                break
+            self.processed += 1
+            self.output_queue.put(result)
+
+    def throughput(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.time() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class Frame_Pipeline:
+    """
+    read_frame() -> frame, detect(frame) -> (frame,faces) and infer(frame,faces) -> result
+    each run on their own thread. Results are collected with get_result() on the
+    caller's thread, which is where cv2.imshow has to stay.
+    """
+    def __init__(self,read_frame,detect,infer,queue_size=1):
+        self.stop_event = threading.Event()
+        self.error = None
+        self.queues = {'capture':Latest_Queue(queue_size),'detect':Latest_Queue(queue_size),'infer':Latest_Queue(queue_size)}
+        self.stages = [
+            Pipeline_Stage('capture',lambda: (read_frame(),),None,self.queues['capture'],self.stop_event,self.set_error),
+            Pipeline_Stage('detect',detect,self.queues['capture'],self.queues['detect'],self.stop_event,self.set_error),
+            Pipeline_Stage('infer',infer,self.queues['detect'],self.queues['infer'],self.stop_event,self.set_error),
+        ]
+        self.displayed = 0
+        self.started_at = None
+
+    def set_error(self,error):
+        self.error = error
+        self.stop_event.set()
+
+    def start(self):
+        self.started_at = time.time()
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def get_result(self,timeout=0.1):
+        try:
+            result = self.queues['infer'].get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.displayed += 1
+        return result
+
+    def queue_length(self):
+        # frames waiting between the stages
+        return sum(q.qsize() for q in self.queues.values())
+
+    def stop(self):
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout=2)
+
+    def stats(self):
+        stats = {}
+        for stage in self.stages:
+            output_queue = self.queues[stage.name]
+            stats[stage.name] = {'queue_depth':output_queue.qsize(),'processed':stage.processed,
+                                 'dropped':output_queue.dropped,'fps':round(stage.throughput(),2)}
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        stats['display'] = {'processed':self.displayed,'fps':round(self.displayed / elapsed,2) if elapsed > 0 else 0.0}
+        return stats
@@ -0,0 +1,94 @@
+"""
+Nearest-neighbour matching of face embeddings against the enrolled gallery.
+Every embedding from models/embeddings.pickle is kept as one L2-normalized
+float32 matrix, grouped by face id, so a batch of queries is scored with a
+single matrix multiply. New staff are matched as soon as their embeddings are
+added, no retraining of the SVM is needed.
+"""
+import os
+import pickle
+import numpy as np
+
+EMBEDDING_SIZE = 128
+
+
+def l2_normalize(embeddings):
+    embeddings = np.asarray(embeddings,dtype='float32')
+    norms = np.linalg.norm(embeddings,axis=1,keepdims=True)
+    return embeddings / np.maximum(norms,1e-10)
+
+
+class Gallery_Matcher:
+    def __init__(self,threshold=0.7):
+        # cosine similarity below threshold is reported as unknown
+        self.threshold = threshold
+        self.embedding_path = None
+        self.mtime = None
+        self.set_gallery([],np.zeros((0,EMBEDDING_SIZE),dtype='float32'))
+
+    def set_gallery(self,face_ids,embeddings):
+        face_ids = np.asarray([str(x) for x in face_ids])
+        embeddings = np.asarray(embeddings,dtype='float32').reshape(len(face_ids),-1) if len(face_ids) else np.zeros((0,EMBEDDING_SIZE),dtype='float32')
+        embeddings = l2_normalize(embeddings)
+        # sort rows by face id so the best score per person is one reduceat call
+        order = np.argsort(face_ids,kind='stable')
+        self.face_ids = face_ids[order]
+        # stored transposed (embedding_size, N) so a query batch is one contiguous matrix multiply
+        self.matrix_t = np.ascontiguousarray(embeddings[order].T)
+        (self.classes_,self.starts) = np.unique(self.face_ids,return_index=True)
+
+    def load(self,embedding_path):
+        data = pickle.loads(open(embedding_path,"rb").read())
+        self.set_gallery(data["face_ids"],data["embeddings"])
+        self.embedding_path = embedding_path
+        self.mtime = os.path.getmtime(embedding_path)
+        return self
+
+    def refresh(self):
+        # reload when Extract Embeddings has rewritten the pickle
+        if self.embedding_path is not None and os.path.getmtime(self.embedding_path) != self.mtime:
+            self.load(self.embedding_path)
+        return self
+
+    def add(self,face_id,embeddings):
+        embeddings = np.asarray(embeddings,dtype='float32').reshape(-1,self.matrix_t.shape[0])
+        face_ids = list(self.face_ids) + [str(face_id)] * len(embeddings)
+        self.set_gallery(face_ids,np.concatenate([self.matrix_t.T,embeddings]))
+
+    def remove(self,face_id):
+        keep = self.face_ids != str(face_id)
+        self.set_gallery(self.face_ids[keep],self.matrix_t.T[keep])
+
+    def identity_scores(self,queries):
+        # best cosine similarity of every query against every person in the gallery
+        scores = l2_normalize(queries) @ self.matrix_t
+        return np.maximum.reduceat(scores,self.starts,axis=1)
+
+    def search(self,queries,k=1):
+        """
+        Returns (ids,scores), both shaped (len(queries),k) and sorted best first.
+        ids below the unknown threshold are None.
+        """
+        queries = np.asarray(queries,dtype='float32').reshape(len(queries),-1)
+        if len(self.classes_) == 0:
+            return (np.full((len(queries),k),None,dtype=object),np.zeros((len(queries),k),dtype='float32'))
+        scores = self.identity_scores(queries)
+        k = min(k,scores.shape[1])
+        top = np.argpartition(-scores,k - 1,axis=1)[:,:k]
+        top_scores = np.take_along_axis(scores,top,axis=1)
+        order = np.argsort(-top_scores,axis=1)
+        top = np.take_along_axis(top,order,axis=1)
+        top_scores = np.take_along_axis(top_scores,order,axis=1)
+        ids = self.classes_[top].astype(object)
+        ids[top_scores < self.threshold] = None
+        return (ids,top_scores)
+
+    def identify(self,embeddings):
+        """
+        Same interface as face_pipeline.Svm_Classifier: one (id, score, class_index) per embedding.
+        """
+        if len(self.classes_) == 0:
+            return [(None,0.0,0) for _ in range(len(embeddings))]
+        scores = self.identity_scores(np.asarray(embeddings,dtype='float32').reshape(len(embeddings),-1))
+        best = np.argmax(scores,axis=1)
+        return [(self.classes_[p],scores[i,p],p) for (i,p) in enumerate(best)]
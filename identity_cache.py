@@ -0,0 +1,63 @@
+"""
+Per-track identity cache for the recognition loop.
+Once a tracked face has been recognized, its identity, confidence and liveness
+verdict are reused until the refresh interval runs out or the box moves a lot,
+so FaceNet and the classifier only run a few times per visit.
+"""
+import time
+
+from face_tracker import box_iou
+
+
+class Identity_Cache:
+    def __init__(self,refresh_every=2.0,min_iou=0.5,accept=None):
+        # refresh_every is in seconds, min_iou is the overlap below which the box counts as changed
+        self.refresh_every = refresh_every
+        self.min_iou = min_iou
+        self.accept = accept
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        # track ids recognized by the last resolve() call rather than served from the cache
+        self.fresh_tracks = set()
+
+    def needs_refresh(self,track_id,box,now):
+        entry = self.entries.get(track_id)
+        if entry is None:
+            return True
+        if now - entry['updated_at'] >= self.refresh_every:
+            return True
+        return box_iou(entry['box'],box) < self.min_iou
+
+    def put(self,track_id,box,result,now):
+        if self.accept is None or self.accept(result):
+            self.entries[track_id] = {'box':box,'result':result,'updated_at':now}
+        else:
+            self.entries.pop(track_id,None)
+
+    def resolve(self,tracks,recognize):
+        """
+        tracks is a list of (track_id,box). recognize(boxes) is called once with
+        every box whose cached result is missing or stale and returns one result per box.
+        Returns one result per track, in the same order.
+        """
+        now = time.time()
+        stale = [(track_id,box) for (track_id,box) in tracks if self.needs_refresh(track_id,box,now)]
+        fresh = {}
+        if len(stale) != 0:
+            for ((track_id,box),result) in zip(stale,recognize([box for (track_id,box) in stale])):
+                fresh[track_id] = result
+                self.put(track_id,box,result,now)
+        self.fresh_tracks = set(fresh)
+        self.misses += len(stale)
+        self.hits += len(tracks) - len(stale)
+        # forget the tracks that left the frame
+        active = set(track_id for (track_id,box) in tracks)
+        for track_id in list(self.entries.keys()):
+            if track_id not in active:
+                del self.entries[track_id]
+        return [fresh[track_id] if track_id in fresh else self.entries[track_id]['result'] for (track_id,box) in tracks]
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / float(total) if total else 0.0
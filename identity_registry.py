@@ -0,0 +1,73 @@
+"""
+In-memory registry of enrolled staff built from the dataset/<name>_<id> folders.
+id -> name, name -> id and id -> folder are plain dicts, so every lookup in the
+recognition loop is O(1). The folders are only scanned again when dataset/ or
+the staff table has changed.
+"""
+import os
+import numpy as np
+
+
+class Identity_Registry:
+    def __init__(self,dataset_dir,version_check=None):
+        # version_check() returns anything that changes when the staff table changes, or None
+        self.dataset_dir = dataset_dir
+        self.version_check = version_check
+        self.version = None
+        self.id_to_name = {}
+        self.name_to_id = {}
+        self.id_to_folder = {}
+        self.label_names_cache = (None,None)
+        self.loads = 0
+
+    def current_version(self):
+        dataset_mtime = os.stat(self.dataset_dir).st_mtime_ns if os.path.exists(self.dataset_dir) else None
+        table_version = self.version_check() if self.version_check is not None else None
+        return (dataset_mtime,table_version)
+
+    def load(self):
+        id_to_name = {}
+        name_to_id = {}
+        id_to_folder = {}
+        if os.path.exists(self.dataset_dir):
+            for folder in os.listdir(self.dataset_dir):
+                parts = folder.split("_")
+                if len(parts) < 2:
+                    # folder of an enrollment that has not been given an id yet
+                    continue
+                (name,id) = (parts[0],parts[1])
+                id_to_name[id] = name
+                name_to_id[name] = id
+                id_to_folder[id] = folder
+        self.id_to_name = id_to_name
+        self.name_to_id = name_to_id
+        self.id_to_folder = id_to_folder
+        self.label_names_cache = (None,None)
+        self.loads += 1
+
+    def refresh(self):
+        version = self.current_version()
+        if version != self.version:
+            self.load()
+            self.version = version
+        return self
+
+    def name(self,id):
+        return self.id_to_name.get(str(id))
+
+    def id(self,name):
+        return self.name_to_id.get(name)
+
+    def folder(self,id):
+        return self.id_to_folder.get(str(id))
+
+    def label_names(self,classes):
+        """
+        Array of names lined up with a classifier's classes_, so the
+        name of class index p is label_names(classes)[p].
+        """
+        (cached_classes,names) = self.label_names_cache
+        if cached_classes is not classes:
+            names = np.array([self.id_to_name.get(str(id)) for id in classes],dtype=object)
+            self.label_names_cache = (classes,names)
+        return names
@@ -0,0 +1,75 @@
+"""
+Continuous multi-person attendance.
+The camera stays open and every tracked face gets its own Decision_Engine, so
+people walking through together are decided independently and each one is
+marked without touching the UI. A decided track keeps its result until it
+leaves the frame and is not recognized again.
+"""
+import time
+
+from decision_engine import Decision_Engine
+
+
+class Kiosk_Session:
+    def __init__(self,on_decision,threshold,new_engine=Decision_Engine,forget_after=2.0):
+        # on_decision(id,liveness) records the person and returns (text shown on the box, True if newly marked),
+        # id is None for a track that timed out without min_votes and a lead (see decision_engine.py)
+        self.on_decision = on_decision
+        self.threshold = threshold
+        self.new_engine = new_engine
+        self.forget_after = forget_after
+        self.engines = {}
+        self.labels = {}
+        self.last_seen = {}
+        self.started_at = time.time()
+        self.marked = 0
+        self.decisions = 0
+        self.latencies = []
+
+    def is_decided(self,track_id):
+        return track_id in self.labels
+
+    def update(self,tracks,results,fresh):
+        """
+        tracks, results and fresh are lined up as in face_recognize: the
+        (track_id,box), the (liveness,id,proba,p) or None for a decided track,
+        and whether it is a new recognition. Returns the tracks decided by this call.
+        """
+        now = time.time()
+        decided = []
+        for ((track_id,box),result,is_fresh) in zip(tracks,results,fresh):
+            self.last_seen[track_id] = now
+            if track_id in self.labels or result is None:
+                continue
+            (label_name,id,proba,p) = result
+            if track_id not in self.engines:
+                self.engines[track_id] = self.new_engine()
+            engine = self.engines[track_id]
+            if is_fresh:
+                engine.add(id if proba >= self.threshold else None,proba,label_name)
+            decision = engine.decision()
+            if decision is not None:
+                (text,marked) = self.on_decision(*decision)
+                self.labels[track_id] = text
+                self.latencies.append(engine.decision_latency())
+                self.decisions += 1
+                self.marked += 1 if marked else 0
+                del self.engines[track_id]
+                decided.append(track_id)
+        self.forget(now)
+        return decided
+
+    def forget(self,now):
+        for track_id in [t for (t,seen) in self.last_seen.items() if now - seen >= self.forget_after]:
+            del self.last_seen[track_id]
+            self.engines.pop(track_id,None)
+            self.labels.pop(track_id,None)
+
+    def throughput(self):
+        # people marked per minute since the session started
+        minutes = (time.time() - self.started_at) / 60.0
+        return self.marked / minutes if minutes > 0 else 0.0
+
+    def stats(self):
+        return {'marked':self.marked,'decisions':self.decisions,'people_per_minute':round(self.throughput(),2),
+                'mean_decision_s':round(sum(self.latencies) / len(self.latencies),3) if self.latencies else None}
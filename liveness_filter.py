@@ -0,0 +1,96 @@
+"""
+Cheap anti-spoofing checks that run before the MobileNet liveness model.
+Three NumPy/OpenCV cues are computed on the 160x160 face crop:
+  moire    - share of the high frequency energy in the few strongest peaks,
+             screens and printed dots leave periodic patterns there
+  specular - share of bright, colourless pixels, glare off a screen or glossy photo
+  texture  - entropy of the LBP histogram, recaptured faces lose skin micro-texture
+A face that is clearly spoofed or clearly real on every cue is settled here,
+only the ambiguous ones are sent to the liveness model.
+"""
+import cv2
+import numpy as np
+
+# every threshold can be overridden through Liveness_Prefilter(thresholds={...}),
+# setting a *_real value to None sends every face that is not clearly spoofed to the liveness model.
+# These are starting points only, a bright or overexposed background alone can pass specular_spoof,
+# calibrate them with LivenessPrefilterBenchmark on real clips before turning the pre-filter on
+DEFAULT_THRESHOLDS = {
+    'moire_spoof': 0.30,
+    'moire_real': 0.12,
+    'specular_spoof': 0.10,
+    'specular_real': 0.02,
+    'texture_spoof': 4.0,
+    'texture_real': 6.5,
+}
+
+# neighbour offsets of the 8-bit LBP code, clockwise from top-left
+LBP_OFFSETS = [(-1,-1),(-1,0),(-1,1),(0,1),(1,1),(1,0),(1,-1),(0,-1)]
+
+
+def lbp_histogram(gray):
+    center = gray[1:-1,1:-1]
+    (h,w) = gray.shape
+    codes = np.zeros(center.shape,dtype='uint8')
+    for (bit,(dy,dx)) in enumerate(LBP_OFFSETS):
+        codes |= (gray[1+dy:h-1+dy,1+dx:w-1+dx] >= center).astype('uint8') << bit
+    histogram = np.bincount(codes.ravel(),minlength=256).astype('float64')
+    return histogram / histogram.sum()
+
+
+def texture_score(gray):
+    # entropy in bits of the LBP histogram, 8 is the maximum
+    histogram = lbp_histogram(gray)
+    histogram = histogram[histogram > 0]
+    return float(-(histogram * np.log2(histogram)).sum())
+
+
+def moire_score(gray,low_band=0.25,peaks=0.01):
+    spectrum = np.abs(np.fft.fftshift(np.fft.fft2(gray.astype('float32') - gray.mean())))
+    (h,w) = gray.shape
+    (y,x) = np.ogrid[:h,:w]
+    radius = np.sqrt(((y - h / 2) / h) ** 2 + ((x - w / 2) / w) ** 2)
+    high = spectrum[radius > low_band / 2]
+    total = high.sum()
+    if total == 0:
+        return 0.0
+    count = max(1,int(peaks * len(high)))
+    return float(np.partition(high,len(high) - count)[-count:].sum() / total)
+
+
+def specular_score(face):
+    hsv = cv2.cvtColor(face,cv2.COLOR_BGR2HSV)
+    return float(np.mean((hsv[:,:,2] > 240) & (hsv[:,:,1] < 30)))
+
+
+class Liveness_Prefilter:
+    def __init__(self,thresholds=None):
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        self.thresholds.update(thresholds or {})
+        self.checked = 0
+        self.settled = 0
+
+    def scores(self,face):
+        gray = cv2.cvtColor(face,cv2.COLOR_BGR2GRAY)
+        return {'moire':moire_score(gray),'specular':specular_score(face),'texture':texture_score(gray)}
+
+    def classify(self,face):
+        """
+        Returns 'spoof' or 'real' when the cues settle the face, None when it
+        has to go to the liveness model.
+        """
+        t = self.thresholds
+        s = self.scores(face)
+        self.checked += 1
+        if s['moire'] >= t['moire_spoof'] or s['specular'] >= t['specular_spoof'] or s['texture'] <= t['texture_spoof']:
+            self.settled += 1
+            return 'spoof'
+        if None not in (t['moire_real'],t['specular_real'],t['texture_real']):
+            if s['moire'] <= t['moire_real'] and s['specular'] <= t['specular_real'] and s['texture'] >= t['texture_real']:
+                self.settled += 1
+                return 'real'
+        return None
+
+    def escalation_rate(self):
+        # share of checked faces that still needed the liveness model
+        return 1 - self.settled / self.checked if self.checked else 0.0
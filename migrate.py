@@ -0,0 +1,174 @@
+"""
+Versioned schema migrations for the recognition database.
+Every migration has a version number and is applied once, in order; the applied
+versions are recorded in schema_migrations. The steps look at the current table
+definition first, so a database created from the README schema (already typed,
+already keyed on (id, date)) and one created by an older release both end up
+the same. Run it with the application closed, the report table is rebuilt.
+
+    python migrate.py            apply the pending migrations
+    python migrate.py --status   list applied and pending migrations
+"""
+import argparse
+import sys
+from datetime import datetime
+
+import database
+
+
+def column_type(cur,table,column):
+    cur.execute("select data_type from information_schema.columns where table_schema = database() and table_name = %s and column_name = %s",(table,column))
+    row = cur.fetchone()
+    return row[0].lower() if row else None
+
+
+def index_columns(cur,table):
+    # index name -> (columns in index order, unique)
+    cur.execute("select index_name,column_name,non_unique from information_schema.statistics where table_schema = database() and table_name = %s order by index_name,seq_in_index",(table))
+    indexes = {}
+    for (name,column,non_unique) in cur.fetchall():
+        (columns,unique) = indexes.get(name,((),not int(non_unique)))
+        indexes[name] = (columns + (column.lower(),),unique)
+    return indexes
+
+
+class Ambiguous_Times(Exception):
+    pass
+
+
+def ambiguous_times(cur):
+    """
+    Older releases wrote the time as a 12-hour string without AM/PM. Rows with an
+    hour from 01 to 12 and no recorded_at timestamp of the same day to take the
+    time from cannot be converted safely, returns their count and a few of them.
+    """
+    where = "cast(substring_index(time,':',1) as unsigned) between 1 and 12"
+    if column_type(cur,'report','recorded_at') is not None:
+        where += " and (recorded_at is null or date(recorded_at) <> date)"
+    cur.execute("select count(*) from report where " + where)
+    (count,) = cur.fetchone()
+    cur.execute("select id,date,time from report where " + where + " limit 5")
+    return (count,cur.fetchall())
+
+
+def typed_date_time(cur,options):
+    """
+    date becomes DATE and time a 24-hour TIME, taken from recorded_at where the
+    row has one of the same day. Stops with Ambiguous_Times when some 12-hour
+    times would be kept as written, unless the operator accepted that.
+    """
+    if column_type(cur,'report','time') != 'time':
+        (count,examples) = ambiguous_times(cur)
+        if count and not options['accept_12_hour_times']:
+            raise Ambiguous_Times("{} marks in report have a 12-hour time without AM/PM and nothing to correct it from, "
+                                  "e.g. (id, date, time) {}. Converted as written, afternoon marks become morning times. "
+                                  "Correct them first, or run python migrate.py --accept-12-hour-times to keep them as written."
+                                  .format(count,", ".join(str(tuple(row)) for row in examples)))
+        if count:
+            options['log']("[INFO] keeping {} 12-hour times as written".format(count))
+    if column_type(cur,'report','date') != 'date':
+        cur.execute("alter table report modify date DATE")
+    if column_type(cur,'report','time') != 'time':
+        cur.execute("alter table report modify time TIME")
+        if column_type(cur,'report','recorded_at') is not None:
+            cur.execute("update report set time = time(recorded_at) where date(recorded_at) = date")
+
+
+def one_mark_per_day(cur,options):
+    """
+    Unique (id, date) key, which also serves every lookup by id. Existing
+    duplicates are dropped by copying the table in (date, time) order through
+    INSERT IGNORE, so the first mark of the day is the one kept.
+    """
+    if any(unique and sorted(columns) == ['date','id'] for (columns,unique) in index_columns(cur,'report').values()):
+        return
+    cur.execute("drop table if exists report_migrating")
+    cur.execute("create table report_migrating like report")
+    cur.execute("alter table report_migrating add unique key report_id_date (id,date)")
+    cur.execute("insert ignore into report_migrating select * from report order by date,time")
+    cur.execute("rename table report to report_before_unique, report_migrating to report")
+    cur.execute("drop table report_before_unique")
+
+
+def date_index(cur,options):
+    """
+    Index for everything that reads one day: the (date, id) lookups of the
+    scheduler, report screen and recorder, with time in between so the
+    scheduler's time window is a range scan on the same index.
+    """
+    if 'report_date_time_id' not in index_columns(cur,'report'):
+        cur.execute("create index report_date_time_id on report (date,time,id)")
+
+
+def name_index(cur,options):
+    # sorting the report screen by name pages through this index (see report_viewer.py)
+    if 'report_name_date_id' not in index_columns(cur,'report'):
+        cur.execute("create index report_name_date_id on report (name,date,id)")
+
+
+MIGRATIONS = [(1,"typed date and time columns in report",typed_date_time),
+              (2,"one mark per person per day",one_mark_per_day),
+              (3,"date index on report",date_index),
+              (4,"name index on report",name_index)]
+
+
+def ensure_version_table(cur):
+    cur.execute("create table if not exists schema_migrations (version INT PRIMARY KEY, name VARCHAR(100), applied_at DATETIME)")
+
+
+def applied_versions(pool=None):
+    with (pool or database.pool).connection() as conn:
+        cur = conn.cursor()
+        ensure_version_table(cur)
+        cur.execute("select version from schema_migrations")
+        return set(version for (version,) in cur.fetchall())
+
+
+def pending(pool=None):
+    applied = applied_versions(pool)
+    return [(version,name,step) for (version,name,step) in MIGRATIONS if version not in applied]
+
+
+def upgrade(target=None,pool=None,log=print,accept_12_hour_times=False):
+    """
+    Applies the pending migrations up to target (all by default) and returns the
+    versions applied. MySQL commits DDL on its own, a step that fails half way is
+    safe to run again because every step checks what is already there.
+    """
+    options = {'log':log,'accept_12_hour_times':accept_12_hour_times}
+    done = []
+    for (version,name,step) in pending(pool):
+        if target is not None and version > target:
+            break
+        log("[INFO] migration {}: {}".format(version,name))
+        with (pool or database.pool).connection() as conn:
+            cur = conn.cursor()
+            step(cur,options)
+            cur.execute("insert into schema_migrations(version,name,applied_at) VALUES (%s,%s,%s)",(version,name,datetime.now()))
+            conn.commit()
+        done.append(version)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Apply the schema migrations of the recognition database")
+    parser.add_argument("--status",action = "store_true",help = "list applied and pending migrations")
+    parser.add_argument("--target",type = int,default = None,help = "stop after this version")
+    parser.add_argument("--accept-12-hour-times",action = "store_true",
+                        help = "convert 12-hour times without AM/PM as written (afternoon marks become morning times)")
+    args = parser.parse_args()
+    if args.status:
+        applied = applied_versions()
+        for (version,name,step) in MIGRATIONS:
+            print("{} {:3d} {}".format("applied" if version in applied else "pending",version,name))
+        return
+    try:
+        done = upgrade(args.target,accept_12_hour_times = args.accept_12_hour_times)
+    except Ambiguous_Times as e:
+        print("Error: {}".format(e))
+        sys.exit(1)
+    print("Applied {} migration(s)".format(len(done)) if done else "Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
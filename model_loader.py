@@ -0,0 +1,97 @@
+"""
+Lazy loading of the Keras models used by the GUIs.
+TensorFlow is only imported when a model is loaded, so the login window comes
+up without paying for it. start() loads every registered model on a background
+thread and runs one warm-up prediction on each, so the first recognition does
+not hit graph tracing. get() waits for a model that is still loading, and starts
+the loading thread itself when start() has not been called yet. A model
+registered with preload=False is left out of start() and loaded by its first get().
+"""
+import threading
+import time
+import numpy as np
+
+
+def warm_up(model):
+    # one prediction on a zero batch traces the predict graph ahead of the first real frame
+    input_shape = tuple(dim or 1 for dim in model.input_shape[1:])
+    model.predict(np.zeros((1,) + input_shape,dtype='float32'))
+
+
+def load_keras_model(model_path):
+    from tensorflow.keras.models import load_model
+    return load_model(model_path)
+
+
+def load_json_model(json_path,weights_path):
+    from tensorflow.keras.models import model_from_json
+    json_file = open(json_path,'r')
+    model = model_from_json(json_file.read())
+    json_file.close()
+    model.load_weights(weights_path)
+    return model
+
+
+class Model_Loader:
+    def __init__(self):
+        self.loaders = {}
+        self.models = {}
+        self.errors = {}
+        self.events = {}
+        self.timings = {}
+        self.preload = []
+        self.requested = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self,name,load,warmup=warm_up,preload=True):
+        self.loaders[name] = (load,warmup)
+        self.events[name] = threading.Event()
+        if preload:
+            self.preload.append(name)
+
+    def load(self,name):
+        (load,warmup) = self.loaders[name]
+        try:
+            start = time.time()
+            model = load()
+            loaded = time.time()
+            if warmup is not None:
+                warmup(model)
+            self.timings[name] = {'load_s':loaded - start,'warmup_s':time.time() - loaded}
+            self.models[name] = model
+            print("[INFO] {} model loaded in {:.2f} s, warmed up in {:.2f} s".format(name,loaded - start,self.timings[name]['warmup_s']))
+        except Exception as e:
+            print("Error: could not load {} model: {}".format(name,e))
+            self.errors[name] = e
+        self.events[name].set()
+
+    def load_all(self):
+        for name in self.preload:
+            if not self.events[name].is_set():
+                self.load(name)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.load_all,name="model-loader",daemon=True)
+                self.thread.start()
+        return self
+
+    def ready(self,name=None):
+        names = [name] if name is not None else self.preload
+        return all(self.events[n].is_set() and n in self.models for n in names)
+
+    def get(self,name):
+        if name in self.preload:
+            self.start()
+        else:
+            with self.lock:
+                first = name not in self.requested
+                self.requested.add(name)
+            if first:
+                self.load(name)
+        self.events[name].wait()
+        if name in self.errors:
+            raise self.errors[name]
+        return self.models[name]
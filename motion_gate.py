@@ -0,0 +1,101 @@
+"""
+Motion gate and frame-rate governor for the recognition loop.
+Motion_Gate compares each frame with the previous one on a small blurred gray
+copy (80 pixels wide by default), which costs a fraction of a millisecond, and
+only lets the frame through to Haar detection and inference when enough of the
+picture changed, or changed less than `hold` seconds ago.
+Frame_Rate_Governor paces the capture stage: full rate while something is going
+on, a few frames per second once the scene has been still for `idle_after`
+seconds, so an empty room costs almost nothing.
+"""
+import time
+
+import cv2
+
+
+class Motion_Gate:
+    def __init__(self,width=80,pixel_threshold=12,min_changed=0.005,hold=1.0):
+        # a pixel counts as changed when its gray level moved by more than pixel_threshold,
+        # the frame counts as motion when more than min_changed of the pixels did
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.hold = hold
+        self.previous = None
+        self.last_motion = 0.0
+        self.frames = 0
+        self.passed = 0
+
+    def small_gray(self,frame):
+        (h,w) = frame.shape[:2]
+        small = cv2.resize(frame,(self.width,max(1,int(h * self.width / w))),interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small,cv2.COLOR_BGR2GRAY)
+        # sensor noise must not count as motion
+        return cv2.GaussianBlur(small,(5,5),0)
+
+    def changed(self,frame):
+        small = self.small_gray(frame)
+        if self.previous is None or self.previous.shape != small.shape:
+            self.previous = small
+            return True
+        diff = cv2.absdiff(small,self.previous)
+        self.previous = small
+        return cv2.countNonZero(cv2.threshold(diff,self.pixel_threshold,255,cv2.THRESH_BINARY)[1]) > self.min_changed * diff.size
+
+    def update(self,frame,now=None):
+        """
+        True when the frame should go through detection: the scene changed now
+        or within the last `hold` seconds.
+        """
+        now = time.time() if now is None else now
+        self.frames += 1
+        if self.changed(frame):
+            self.last_motion = now
+        active = now - self.last_motion < self.hold
+        self.passed += 1 if active else 0
+        return active
+
+    def pass_rate(self):
+        # share of frames sent on to detection
+        return self.passed / self.frames if self.frames else 0.0
+
+
+class Frame_Rate_Governor:
+    def __init__(self,active_fps=None,idle_fps=5,idle_after=3.0):
+        # active_fps None reads as fast as the camera delivers
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.last_activity = time.time()
+        self.last_frame = 0.0
+        self.frames = 0
+        self.idle_frames = 0
+
+    def activity(self,now=None):
+        # called for every frame with motion or a tracked face
+        self.last_activity = time.time() if now is None else now
+
+    def is_idle(self,now=None):
+        now = time.time() if now is None else now
+        return now - self.last_activity >= self.idle_after
+
+    def interval(self,now=None):
+        if self.is_idle(now):
+            return 1.0 / self.idle_fps
+        return 1.0 / self.active_fps if self.active_fps else 0.0
+
+    def wait(self):
+        # called by the capture stage before every read, sleeps until the next frame is due
+        now = time.time()
+        idle = self.is_idle(now)
+        delay = self.last_frame + self.interval(now) - now
+        if delay > 0:
+            time.sleep(delay)
+        self.last_frame = time.time()
+        self.frames += 1
+        self.idle_frames += 1 if idle else 0
+
+    def idle_share(self):
+        # share of frames read at the idle rate
+        return self.idle_frames / self.frames if self.frames else 0.0
@@ -0,0 +1,287 @@
+"""
+Headless recognition engine: frames in, decisions out.
+Everything face_recognize() used to build inside the GUIs lives here: the motion
+gate, face tracking, the identity cache, batched liveness + FaceNet +
+classification and the streaming decision (one Decision_Engine, or one per
+tracked face in kiosk mode). Nothing here needs Tk or MySQL, so the same engine
+runs behind both GUIs, the benchmarks and the tests.
+Liveness is a stage that can be switched on and off with set_liveness(), its
+models are only loaded the first time the stage is switched on.
+"""
+import os
+import pickle
+
+import cv2
+import numpy as np
+
+from ann_index import ANN_Index
+from compiled_model import Compiled_Model, Fused_Model
+from decision_engine import Decision_Engine
+from face_pipeline import Batch_Recognizer, Svm_Classifier
+from face_tracker import Face_Tracker
+from frame_pipeline import Frame_Pipeline
+from identity_cache import Identity_Cache
+from kiosk_mode import Kiosk_Session
+from liveness_filter import Liveness_Prefilter
+from model_loader import load_json_model
+from motion_gate import Motion_Gate, Frame_Rate_Governor
+from tflite_backend import TFLite_Model, tflite_path, LIVENESS_JSON_PATH, LIVENESS_WEIGHTS_PATH
+from training import Training
+
+
+def register_models(model_loader,load_embedding,backend='keras',quantization='int8',jit_compile=False,liveness=False):
+    """
+    Registers 'embedding', 'liveness' and for Keras 'fused' (both models in one
+    traced call on the raw crops). The liveness models are only loaded in the
+    background when liveness is True, otherwise on the first set_liveness(True).
+    """
+    if backend == 'tflite':
+        model_loader.register('embedding',lambda: TFLite_Model(tflite_path('facenet',quantization)))
+        model_loader.register('liveness',lambda: TFLite_Model(tflite_path('liveness',quantization)),preload = liveness)
+    else:
+        model_loader.register('embedding',lambda: Compiled_Model(load_embedding(),jit_compile = jit_compile))
+        model_loader.register('liveness',lambda: Compiled_Model(load_json_model(LIVENESS_JSON_PATH,LIVENESS_WEIGHTS_PATH),jit_compile = jit_compile),preload = liveness)
+        model_loader.register('fused',lambda: Fused_Model(model_loader.get('embedding').model,model_loader.get('liveness').model,jit_compile = jit_compile),preload = liveness)
+
+
+# the exact 1:N lookup of Gallery_Matcher takes about a millisecond at this many embeddings (run_benchmarks.py,
+# Gallery Matcher), MATCHER = 'gallery' goes through the ANN index above it
+ANN_ABOVE = 20000
+
+
+def classifier_files(matcher,root_dir):
+    # files that have to exist before face_recognize can start
+    embeddings_path = os.path.join(root_dir,"models/embeddings.pickle")
+    if matcher in ('gallery','ann'):
+        return [embeddings_path]
+    return [embeddings_path,os.path.join(root_dir,"models/recognizer.pickle")]
+
+
+def load_classifier(matcher,root_dir,gallery_matcher=None,ann_above=ANN_ABOVE):
+    embeddings_path = os.path.join(root_dir,"models/embeddings.pickle")
+    if matcher == 'gallery':
+        if gallery_matcher.embedding_path is None:
+            gallery_matcher.load(embeddings_path)
+        gallery_matcher.refresh()
+        if len(gallery_matcher.face_ids) <= ann_above:
+            return gallery_matcher
+        matcher = 'ann'
+    if matcher == 'ann':
+        # rebuilt and saved next to embeddings.pickle whenever that file changes
+        return ANN_Index.load_or_build(embeddings_path,os.path.join(root_dir,"models/ann_index.pickle"),pq_subvectors=16)
+    training_obj = Training(embedding_path = embeddings_path)
+    [label,labels,Embeddings,ids] = training_obj.load_embeddings_and_labels()
+    recognizer = pickle.loads(open(os.path.join(root_dir,"models/recognizer.pickle"),"rb").read())
+    return Svm_Classifier(recognizer,label)
+
+
+class Recognition_Engine:
+    """
+    One engine per app, one session per face_recognize(). A session is either
+    driven frame by frame with process(frame), or threaded with start(read_frame)
+    and next_result(). Both return (frame,tracks,results,fresh) as the
+    pipeline stages do and count the votes, decision() gives the outcome.
+    """
+    def __init__(self,model_loader,face_cascade,backend='keras',liveness=False,prefilter_thresholds=None,
+                 decision_margin=5.0,decision_min_votes=3,decision_timeout=10.0,kiosk=False,
+                 motion_gate=True,idle_fps=4,idle_after=3.0,refresh_every=0.25):
+        self.model_loader = model_loader
+        self.face_cascade = face_cascade
+        self.backend = backend
+        self.liveness = liveness
+        self.prefilter_thresholds = prefilter_thresholds
+        self.decision_settings = (decision_margin,decision_min_votes,decision_timeout)
+        self.kiosk_mode = kiosk
+        self.use_motion_gate = motion_gate
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.refresh_every = refresh_every
+        self.recognizer = None
+        self.prefilter = None
+        self.pipeline = None
+        self.kiosk = None
+
+    def new_decision_engine(self):
+        (margin,min_votes,timeout) = self.decision_settings
+        return Decision_Engine(margin = margin,min_votes = min_votes,timeout = timeout)
+
+    def set_liveness(self,enabled):
+        """
+        Switches the liveness stage, also in the middle of a session. The first
+        switch on loads the liveness models, which takes a while with Keras.
+        """
+        self.liveness = enabled
+        if self.recognizer is not None:
+            self.configure_liveness()
+
+    def configure_liveness(self):
+        recognizer = self.recognizer
+        if not self.liveness:
+            (recognizer.liveness_model,recognizer.fused_model,recognizer.prefilter) = (None,None,None)
+            return
+        if self.prefilter is None and self.prefilter_thresholds is not None:
+            self.prefilter = Liveness_Prefilter(self.prefilter_thresholds)
+        recognizer.prefilter = self.prefilter
+        recognizer.liveness_model = self.model_loader.get('liveness')
+        recognizer.fused_model = self.model_loader.get('fused') if self.backend == 'keras' else None
+
+    def start_session(self,classifier,label_names,on_decision=None):
+        """
+        label_names maps class index -> name for annotate(). In kiosk mode
+        on_decision(id,liveness) is called for every decided face and returns
+        (text shown on its box, True if newly marked), see kiosk_mode.py.
+        """
+        if self.in_session():
+            raise RuntimeError("A recognition session is already running, stop() it first")
+        self.recognizer = Batch_Recognizer(self.model_loader.get('embedding'),classifier)
+        self.configure_liveness()
+        self.label_names = label_names
+        self.threshold = self.recognizer.threshold
+        # one box colour per class for the whole session
+        self.colors = np.random.randint(0,255,size = (len(classifier.classes_),3),dtype = "uint8")
+        # the cascade runs every few frames, faces are tracked in between
+        self.tracker = Face_Tracker(self.face_cascade)
+        # a recognized face is embedded again at most every refresh_every seconds, every fresh recognition is one vote
+        self.identity_cache = Identity_Cache(refresh_every = self.refresh_every,accept = lambda result: result[2] >= self.threshold)
+        # an empty scene is skipped by the motion gate and read at the idle frame rate
+        self.motion_gate = Motion_Gate() if self.use_motion_gate else None
+        self.governor = Frame_Rate_Governor(idle_fps = self.idle_fps,idle_after = self.idle_after)
+        self.kiosk = Kiosk_Session(on_decision,self.threshold,new_engine = self.new_decision_engine) if self.kiosk_mode else None
+        self.decision_engine = self.new_decision_engine()
+        return self
+
+    def capture(self,read_frame):
+        if self.motion_gate is not None:
+            self.governor.wait()
+        return read_frame()
+
+    def detect(self,frame):
+        if self.motion_gate is not None:
+            if not self.motion_gate.update(frame) and not self.tracker.tracks:
+                return (frame,[])
+            self.governor.activity()
+        gray = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        return (frame,self.tracker.update(gray))
+
+    def infer(self,frame,tracks):
+        # liveness, embedding and classification run once for all the uncached faces in the frame,
+        # faces already decided in kiosk mode are not recognized again
+        kiosk = self.kiosk
+        pending = [(track_id,box) for (track_id,box) in tracks if kiosk is None or not kiosk.is_decided(track_id)]
+        pending_results = self.identity_cache.resolve(pending,lambda boxes: self.recognizer.predict_faces(frame,boxes))
+        by_track = dict(zip([track_id for (track_id,box) in pending],pending_results))
+        results = [by_track.get(track_id) for (track_id,box) in tracks]
+        fresh = [track_id in self.identity_cache.fresh_tracks for (track_id,box) in tracks]
+        return (frame,tracks,results,fresh)
+
+    def vote(self,frame_result):
+        (frame,tracks,results,fresh) = frame_result
+        if self.kiosk is not None:
+            self.kiosk.update(tracks,results,fresh)
+            return
+        for (result,is_fresh) in zip(results,fresh):
+            if result is not None and is_fresh:
+                # cached results repeat an earlier vote, only new recognitions count
+                (label_name,id,proba,p) = result
+                self.decision_engine.add(id if proba >= self.threshold else None,proba,label_name)
+
+    def process(self,frame):
+        # the whole pipeline on the caller's thread
+        frame_result = self.infer(*self.detect(frame))
+        self.vote(frame_result)
+        return frame_result
+
+    def in_session(self):
+        # a pipeline was started and has not been stopped, its threads still own the session state
+        return self.pipeline is not None and not self.pipeline.stop_event.is_set()
+
+    def start(self,read_frame):
+        # capture, detection and inference on their own threads, one pipeline at a time
+        if self.in_session():
+            raise RuntimeError("A recognition session is already running, stop() it first")
+        self.pipeline = Frame_Pipeline(lambda: self.capture(read_frame),self.detect,self.infer).start()
+        return self
+
+    def next_result(self,timeout=0.1):
+        if self.pipeline.error is not None:
+            raise self.pipeline.error
+        frame_result = self.pipeline.get_result(timeout = timeout)
+        if frame_result is not None:
+            self.vote(frame_result)
+        return frame_result
+
+    def stop(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def running(self):
+        # kiosk sessions run until stopped, a single person until decided
+        return self.kiosk is not None or self.decision_engine.decision() is None
+
+    def decision(self):
+        # (id,liveness_label) once decided, None before and in kiosk mode
+        if self.kiosk is not None:
+            return None
+        return self.decision_engine.decision()
+
+    def annotate(self,frame_result):
+        (frame,tracks,results,fresh) = frame_result
+        kiosk = self.kiosk
+        for ((track_id,(x,y,w,h)),result) in zip(tracks,results):
+            if kiosk is not None and kiosk.is_decided(track_id):
+                color = (0,255,0)
+                cv2.rectangle(frame,(x,y),(x+w,y+h),color,2)
+                cv2.putText(frame,kiosk.labels[track_id],(x,y - 5),cv2.FONT_HERSHEY_SIMPLEX,0.5,color,2)
+                continue
+            if result is None:
+                continue
+            (label_name,id,proba,p) = result
+            if proba >= self.threshold:
+                color = [int(c) for c in self.colors[p]]
+                text = "{} {}".format(self.label_names[p],id)
+            else:
+                color = (255,255,0)
+                text = "NONE NONE"
+            cv2.rectangle(frame,(x,y),(x+w,y+h),color,2)
+            cv2.putText(frame,text,(x,y - 5),cv2.FONT_HERSHEY_SIMPLEX,0.5,color,2)
+        if kiosk is not None:
+            cv2.putText(frame,"Marked: {}  ({:.1f} / min)".format(kiosk.marked,kiosk.throughput()),(10,25),cv2.FONT_HERSHEY_SIMPLEX,0.7,(0,255,0),2)
+        return frame
+
+    def status(self):
+        if self.kiosk is not None:
+            return "Kiosk: {} marked ({:.1f} / min)".format(self.kiosk.marked,self.kiosk.throughput())
+        return "Recognizing... {} votes".format(self.decision_engine.votes())
+
+    def queue_length(self):
+        return self.pipeline.queue_length() if self.pipeline is not None else 0
+
+    def stats(self):
+        stats = {'detection_rate':round(self.tracker.detection_rate(),3),'cache_hit_rate':round(self.identity_cache.hit_rate(),3)}
+        if self.pipeline is not None:
+            stats['pipeline'] = self.pipeline.stats()
+        if self.motion_gate is not None:
+            stats['motion_pass_rate'] = round(self.motion_gate.pass_rate(),3)
+            stats['idle_share'] = round(self.governor.idle_share(),3)
+        if self.liveness and self.prefilter is not None:
+            stats['liveness_escalation_rate'] = round(self.prefilter.escalation_rate(),3)
+        if self.kiosk is not None:
+            stats['kiosk'] = self.kiosk.stats()
+        elif self.decision_engine.decision_latency() is not None:
+            stats['decision_s'] = round(self.decision_engine.decision_latency(),3)
+            stats['votes'] = self.decision_engine.votes()
+        return stats
+
+    def report(self):
+        if self.pipeline is not None:
+            print("[INFO] pipeline stats: {}".format(self.pipeline.stats()))
+        print("[INFO] face detection ran on {:.0%} of frames".format(self.tracker.detection_rate()))
+        if self.motion_gate is not None:
+            print("[INFO] motion gate passed {:.0%} of frames, {:.0%} read at the idle rate".format(self.motion_gate.pass_rate(),self.governor.idle_share()))
+        print("[INFO] identity cache served {:.0%} of faces".format(self.identity_cache.hit_rate()))
+        if self.liveness and self.prefilter is not None:
+            print("[INFO] liveness model ran on {:.0%} of checked faces".format(self.prefilter.escalation_rate()))
+        if self.kiosk is not None:
+            print("[INFO] kiosk session: {}".format(self.kiosk.stats()))
+        elif self.decision_engine.decision() is not None:
+            print("[INFO] decided after {:.2f} s and {} votes".format(self.decision_engine.decision_latency(),self.decision_engine.votes()))
@@ -0,0 +1,162 @@
+"""
+Recognition screen that keeps the Tk event loop free.
+The recognition loop runs on a worker thread and hands every annotated frame to
+a Latest_Frame slot. The window polls the slot with a throttled after() and only
+ever draws the newest frame, frames produced between two refreshes are replaced,
+never queued. Event_Loop_Monitor measures how late Tk callbacks run while the
+worker is busy, which is the lag the user feels in the rest of the admin UI.
+"""
+import threading
+import time
+from tkinter import Toplevel, Canvas, Label, Button, DISABLED
+
+import cv2
+from PIL import Image, ImageTk
+
+
+class Latest_Frame:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = None
+        self.published = 0
+        self.shown = 0
+
+    def put(self,frame):
+        with self.lock:
+            self.frame = frame
+            self.published += 1
+
+    def take(self):
+        # the newest frame if it has not been taken yet, None otherwise
+        with self.lock:
+            frame = self.frame
+            self.frame = None
+        if frame is not None:
+            self.shown += 1
+        return frame
+
+    def skipped(self):
+        # frames replaced by a newer one before the window got to them
+        return self.published - self.shown
+
+
+class Event_Loop_Monitor:
+    """
+    Schedules a callback every interval_ms and records how late it runs. With an
+    idle event loop the lag is a millisecond or two, anything blocking the Tk
+    thread shows up directly in it.
+    """
+    def __init__(self,widget,interval_ms=20):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.lags = []
+        self.job = None
+        self.expected = None
+
+    def start(self):
+        self.expected = time.perf_counter() + self.interval_ms / 1000.0
+        self.job = self.widget.after(self.interval_ms,self.tick)
+        return self
+
+    def tick(self):
+        self.lags.append(max(0.0,time.perf_counter() - self.expected))
+        self.start()
+
+    def stop(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+
+    def stats(self):
+        if not self.lags:
+            return {'samples':0}
+        lags = sorted(self.lags)
+        return {'samples':len(lags),'mean_ms':round(1000 * sum(lags) / len(lags),1),
+                'p95_ms':round(1000 * lags[int(0.95 * (len(lags) - 1))],1),'max_ms':round(1000 * lags[-1],1)}
+
+
+class Recognition_Worker(threading.Thread):
+    # runs work(stop_event) and keeps the exception it raised
+    def __init__(self,work):
+        threading.Thread.__init__(self,name="recognition",daemon=True)
+        self.work = work
+        self.stop_event = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            self.work(self.stop_event)
+        except Exception as e:
+            self.error = e
+
+    def cancel(self):
+        self.stop_event.set()
+
+
+class Recognition_Window:
+    """
+    work(stop_event,show) runs on the worker and calls show(frame) for every
+    annotated frame, returning when it is done or stop_event is set.
+    on_finish(error,lag_stats) is called on the Tk thread once the worker ended
+    and the window closed, so it can show message boxes. status() and
+    queue_length() are polled with every refresh.
+    """
+    def __init__(self,master,title,work,on_finish,status=None,queue_length=None,refresh_ms=33,size=(640,480)):
+        self.on_finish = on_finish
+        self.status = status
+        self.queue_length = queue_length
+        self.refresh_ms = refresh_ms
+        self.latest = Latest_Frame()
+        self.worker = Recognition_Worker(lambda stop_event: work(stop_event,self.latest.put))
+        self.window = Toplevel(master)
+        self.window.title(title)
+        self.window.protocol("WM_DELETE_WINDOW",self.cancel)
+        # q still stops recognition like it did in the OpenCV window
+        self.window.bind('<q>',lambda event: self.cancel())
+        self.canvas = Canvas(self.window,width = size[0],height = size[1],bg = 'black',highlightthickness = 0)
+        self.canvas.pack()
+        self.image_item = self.canvas.create_image(0,0,anchor = 'nw')
+        self.photo = None
+        self.status_label = Label(self.window,text = "Starting...",font = ('times new roman',13),anchor = 'w')
+        self.status_label.pack(side = 'left',padx = 5,pady = 5)
+        self.cancel_button = Button(self.window,text = "Cancel",fg = 'white',bg = 'red',font = ('times new roman',13,'bold'),command = self.cancel)
+        self.cancel_button.pack(side = 'right',padx = 5,pady = 5)
+        self.queue_label = Label(self.window,text = "",font = ('times new roman',13))
+        self.queue_label.pack(side = 'right',padx = 5,pady = 5)
+        self.monitor = Event_Loop_Monitor(self.window)
+
+    def start(self):
+        self.worker.start()
+        self.monitor.start()
+        self.window.after(self.refresh_ms,self.refresh)
+        return self
+
+    def refresh(self):
+        frame = self.latest.take()
+        if frame is not None:
+            self.show(frame)
+        if self.status is not None:
+            self.status_label.config(text = self.status())
+        if self.queue_length is not None:
+            self.queue_label.config(text = "Queue: {}".format(self.queue_length()))
+        if self.worker.is_alive():
+            self.window.after(self.refresh_ms,self.refresh)
+        else:
+            self.close()
+
+    def show(self,frame):
+        (h,w) = frame.shape[:2]
+        if (int(self.canvas['width']),int(self.canvas['height'])) != (w,h):
+            self.canvas.config(width = w,height = h)
+        # keep a reference, Tk does not and the image would be garbage collected
+        self.photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(frame,cv2.COLOR_BGR2RGB)),master = self.window)
+        self.canvas.itemconfig(self.image_item,image = self.photo)
+
+    def cancel(self):
+        self.worker.cancel()
+        self.cancel_button.config(text = "Stopping...",state = DISABLED)
+
+    def close(self):
+        self.monitor.stop()
+        self.window.destroy()
+        self.on_finish(self.worker.error,self.monitor.stats())
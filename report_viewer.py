@@ -0,0 +1,329 @@
+"""
+Paginated, virtualized view of the report table.
+Report_Pager reads report one page at a time with keyset pagination: every page
+continues after (or before) the sort key of the last row shown instead of using
+OFFSET, so each page is an index range scan of `page_size` rows, whatever the
+size of the table. Sorting is done by MySQL on indexed keys that end in the
+unique (id, date), which makes every key unique and the paging exact.
+Virtual_Table shows the pages in a Treeview and keeps at most `window_rows` of
+them in the widget: pages are fetched when the view scrolls near either end and
+the rows at the other end are dropped.
+Live_Refresh adds today's new marks while the screen is open, reading only the
+rows newer than the newest one it has seen on a background thread.
+"""
+import queue
+import threading
+import time
+from datetime import date
+
+import pymysql
+
+import database
+
+# Treeview heading -> report column
+COLUMNS = {'ID':'id','Name':'name','Date':'date','Time':'time','Status':'status'}
+
+# heading -> sort key, each one is the prefix of an index created by migrate.py
+SORT_KEYS = {'ID':('id','date'),
+             'Name':('name','date','id'),
+             'Date':('date','time','id'),
+             'Time':('date','time','id')}
+
+
+class Report_Pager:
+    def __init__(self,headings,page_size=100,sort='Date',descending=True,fetch=None):
+        self.columns = [COLUMNS[heading] for heading in headings]
+        self.page_size = page_size
+        self.fetch = fetch or database.fetchall
+        self.filter = None
+        self.sort(sort,descending)
+
+    def sort(self,heading,descending=False):
+        self.sort_heading = heading
+        self.key = SORT_KEYS[heading]
+        self.descending = descending
+        # positions of the key columns in a fetched row, the key columns not shown are fetched after them
+        self.select = self.columns + [column for column in self.key if column not in self.columns]
+        self.key_index = [self.select.index(column) for column in self.key]
+
+    def search(self,column,text):
+        # column None shows every row again
+        self.filter = (column,database.like_pattern(text)) if column is not None else None
+
+    def row_key(self,row):
+        return tuple(row[i] for i in self.key_index)
+
+    def after(self,key,forward):
+        """
+        (a,b,c) > (x,y,z) spelled out as a > x or (a = x and (b > y or ...)),
+        which MySQL turns into a range on the index.
+        """
+        greater = forward != self.descending
+        op = ">" if greater else "<"
+        sql = "{} {} %s".format(self.key[-1],op)
+        args = [key[-1]]
+        for (column,value) in reversed(list(zip(self.key[:-1],key[:-1]))):
+            sql = "{0} {1} %s or ({0} = %s and ({2}))".format(column,op,sql)
+            args = [value,value] + args
+        return (sql,args)
+
+    def page(self,key=None,forward=True):
+        """
+        The page after key (forward) or before it, in display order either way.
+        key None is the first page.
+        """
+        (where,args) = ([],[])
+        if self.filter is not None:
+            where.append("{} LIKE %s".format(self.filter[0]))
+            args.append(self.filter[1])
+        if key is not None:
+            (sql,key_args) = self.after(key,forward)
+            where.append("({})".format(sql))
+            args.extend(key_args)
+        # a page before the key is read nearest first and turned around
+        desc = self.descending == forward
+        order = ",".join("{} {}".format(column,"desc" if desc else "asc") for column in self.key)
+        sql = "select {} from report{} order by {} limit %s".format(",".join(self.select),
+                                                                   " where " + " and ".join(where) if where else "",order)
+        rows = list(self.fetch(sql,tuple(args + [self.page_size])))
+        if not forward:
+            rows.reverse()
+        return rows
+
+    def newer(self,day,since):
+        # the marks of day from since on, a range on the (date,time,id) index
+        sql = "select {} from report where date = %s and time >= %s order by time,id".format(",".join(self.select))
+        return list(self.fetch(sql,(day,since)))
+
+
+class Virtual_Table:
+    """
+    Keeps rows[i] / items[i] for the rows currently in the Treeview. The
+    scrollbar covers the rows in the widget, the next page is loaded as soon
+    as the view comes within `margin` of either end.
+    """
+    def __init__(self,tree,scrollbar,pager,window_rows=300,margin=0.1):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.pager = pager
+        self.window_rows = window_rows
+        self.margin = margin
+        self.rows = []
+        self.items = []
+        self.more_before = False
+        self.more_after = False
+        self.pending = None
+        self.pages = 0
+        self.reloads = 0
+        tree.config(yscrollcommand = self.on_scroll)
+        for heading in SORT_KEYS:
+            if heading in tree['columns']:
+                tree.heading(heading,command = lambda heading = heading: self.sort(heading))
+
+    def reload(self):
+        # back to the first page, the only query needed to open the screen
+        self.reloads += 1
+        self.tree.delete(*self.items)
+        (self.rows,self.items) = ([],[])
+        rows = self.load(None,True)
+        self.append(rows)
+        self.more_before = False
+        self.more_after = len(rows) == self.pager.page_size
+        self.tree.yview_moveto(0)
+        return len(rows)
+
+    def load(self,key,forward):
+        self.pages += 1
+        return self.pager.page(key,forward)
+
+    def append(self,rows):
+        for row in rows:
+            self.rows.append(row)
+            self.items.append(self.tree.insert('','end',values = row[:len(self.pager.columns)]))
+
+    def prepend(self,rows):
+        for row in reversed(rows):
+            self.rows.insert(0,row)
+            self.items.insert(0,self.tree.insert('',0,values = row[:len(self.pager.columns)]))
+
+    def insert_at(self,index,row):
+        self.rows.insert(index,row)
+        self.items.insert(index,self.tree.insert('',index,values = row[:len(self.pager.columns)]))
+
+    def drop(self,count,from_top):
+        if count <= 0:
+            return
+        if from_top:
+            (dropped,self.items,self.rows) = (self.items[:count],self.items[count:],self.rows[count:])
+            self.more_before = True
+        else:
+            (dropped,self.items,self.rows) = (self.items[-count:],self.items[:-count],self.rows[:-count])
+            self.more_after = True
+        self.tree.delete(*dropped)
+
+    def on_scroll(self,first,last):
+        self.scrollbar.set(first,last)
+        # inserting rows scrolls again, the check runs once Tk is idle
+        if self.pending is None:
+            self.pending = self.tree.after_idle(self.check)
+
+    def check(self):
+        self.pending = None
+        if not self.rows:
+            return
+        (first,last) = self.tree.yview()
+        top = int(round(first * len(self.rows)))
+        if last >= 1.0 - self.margin and self.more_after:
+            rows = self.load(self.pager.row_key(self.rows[-1]),True)
+            self.more_after = len(rows) == self.pager.page_size
+            self.append(rows)
+            overflow = len(self.rows) - self.window_rows
+            self.drop(overflow,True)
+            self.tree.yview_moveto((top - max(0,overflow)) / float(len(self.rows)))
+        elif first <= self.margin and self.more_before:
+            rows = self.load(self.pager.row_key(self.rows[0]),False)
+            self.more_before = len(rows) == self.pager.page_size
+            self.prepend(rows)
+            self.drop(len(self.rows) - self.window_rows,False)
+            self.tree.yview_moveto((top + len(rows)) / float(len(self.rows)))
+
+    def sort(self,heading):
+        # clicking the sorted heading again flips the direction
+        descending = not self.pager.descending if heading == self.pager.sort_heading else False
+        self.pager.sort(heading,descending)
+        self.reload()
+
+    def search(self,column,text):
+        self.pager.search(column,text)
+        return self.reload()
+
+    def remove(self,item):
+        i = self.items.index(item)
+        del self.items[i]
+        del self.rows[i]
+        self.tree.delete(item)
+
+
+def seconds(value):
+    # TIME comes back from pymysql as a timedelta
+    if hasattr(value,'total_seconds'):
+        return int(value.total_seconds())
+    (h,m,sec) = str(value).split(':')
+    return int(h) * 3600 + int(m) * 60 + int(float(sec))
+
+
+class Live_Refresh:
+    """
+    Every interval_ms a background thread asks for today's rows from `lag`
+    seconds before the newest mark seen, the overlap picks up marks another
+    machine wrote a little late, rows already shown are skipped by their
+    (id, date). The result is put into the table on the Tk thread, so the
+    screen never waits for MySQL. New rows only go in while the table shows
+    every row sorted by date, after a search or another sort they appear
+    with the next reload.
+    """
+    def __init__(self,table,interval_ms=5000,lag=120,check_ms=200,today=None):
+        self.table = table
+        self.interval_ms = interval_ms
+        self.lag = lag
+        self.check_ms = check_ms
+        self.today = today or (lambda: date.today().isoformat())
+        self.results = queue.Queue()
+        self.worker = None
+        self.last_poll = 0.0
+        self.job = None
+        self.reloads = None
+        self.day = None
+        self.seen = set()
+        self.newest = None
+        self.polls = 0
+        self.added = 0
+
+    def start(self):
+        self.job = self.table.tree.after(self.check_ms,self.tick)
+        self.table.tree.bind('<Destroy>',lambda event: self.stop(),add = '+')
+        return self
+
+    def stop(self):
+        if self.job is not None:
+            self.table.tree.after_cancel(self.job)
+            self.job = None
+
+    def live(self):
+        pager = self.table.pager
+        return pager.filter is None and pager.key == SORT_KEYS['Date']
+
+    def tick(self):
+        self.job = self.table.tree.after(self.check_ms,self.tick)
+        while True:
+            try:
+                (reloads,day,rows) = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if rows is not None and reloads == self.reloads and day == self.day and self.live():
+                self.apply(rows)
+        if self.worker is not None and self.worker.is_alive():
+            return
+        if not self.live() or time.time() - self.last_poll < self.interval_ms / 1000.0:
+            return
+        self.sync()
+        since = max(0,self.newest - self.lag) if self.newest is not None else 0
+        self.last_poll = time.time()
+        self.worker = threading.Thread(target = self.fetch,args = (self.reloads,self.day,"{:02d}:{:02d}:{:02d}".format(since // 3600,since // 60 % 60,since % 60)),
+                                       name = "report-refresh",daemon = True)
+        self.worker.start()
+
+    def fetch(self,reloads,day,since):
+        self.polls += 1
+        try:
+            rows = self.table.pager.newer(day,since)
+        except pymysql.err.MySQLError as e:
+            print("[INFO] report refresh skipped: {}".format(e))
+            rows = None
+        self.results.put((reloads,day,rows))
+
+    def key(self,row):
+        pager = self.table.pager
+        return (row[pager.select.index('id')],str(row[pager.select.index('date')]))
+
+    def sync(self):
+        # after a reload or at midnight start again from what the table shows of today
+        day = self.today()
+        if (self.table.reloads,day) == (self.reloads,self.day):
+            return
+        (self.reloads,self.day) = (self.table.reloads,day)
+        self.seen = set()
+        self.newest = None
+        self.note([row for row in self.table.rows if str(row[self.table.pager.select.index('date')]) == day])
+
+    def note(self,rows):
+        time_index = self.table.pager.select.index('time')
+        for row in rows:
+            self.seen.add(self.key(row))
+            self.newest = max(self.newest if self.newest is not None else 0,seconds(row[time_index]))
+
+    def apply(self,rows):
+        table = self.table
+        pager = table.pager
+        rows = [row for row in rows if self.key(row) not in self.seen]
+        if not rows:
+            return
+        self.note(rows)
+        (first,last) = table.tree.yview()
+        top = int(round(first * len(table.rows)))
+        for row in rows:
+            # its place in the sort order, a mark written late can land below newer ones
+            key = pager.row_key(row)
+            i = 0
+            while i < len(table.rows) and (pager.row_key(table.rows[i]) > key) == pager.descending:
+                i += 1
+            if (i == 0 and table.more_before) or (i == len(table.rows) and table.more_after):
+                # outside the rows in the widget, paged in when scrolled to
+                continue
+            table.insert_at(i,row)
+            top += 1 if i < top else 0
+            self.added += 1
+        table.drop(len(table.rows) - table.window_rows,False)
+        # a view at the top stays there and shows the new marks, otherwise it stays on the rows it showed
+        if first > 0:
+            table.tree.yview_moveto(top / float(len(table.rows)))
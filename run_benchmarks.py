@@ -0,0 +1,962 @@
+"""
+Performance Benchmarks for Facial Recognition Attendance Management System
+Measures the recognition pipeline on recorded clips and saves the numbers as JSON
+"""
+
+import os
+import glob
+import time
+import json
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from console_output import Colors, print_header, print_subheader, print_success, print_error, print_warning, print_info
+
+# Recorded camera clips (.avi / .mp4) used by the benchmarks
+CLIPS_DIR = "benchmark_data/clips"
+FACE_CASCADE_PATH = "models/haarcascade_frontalface_default.xml"
+
+
+def load_clip_frames(path, max_frames=300):
+    """Read up to max_frames frames from a recorded clip"""
+    frames = []
+    capture = cv2.VideoCapture(path)
+    while len(frames) < max_frames:
+        (ret, frame) = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def list_clips(clips_dir=CLIPS_DIR):
+    clips = sorted(glob.glob(os.path.join(clips_dir, "*.avi")) + glob.glob(os.path.join(clips_dir, "*.mp4")))
+    if not clips:
+        print_error(f"No clips found in {clips_dir} - record one first (menu option 1)")
+    return clips
+
+
+def record_clip(path=None, seconds=20):
+    """Record a clip from the kiosk camera for the benchmarks"""
+    os.makedirs(CLIPS_DIR, exist_ok=True)
+    if path is None:
+        path = os.path.join(CLIPS_DIR, "clip_{}.avi".format(datetime.now().strftime("%Y%m%d_%H%M%S")))
+    # same resolution / FOURCC / FPS as the kiosk apps
+    from camera_service import Camera_Service
+    camera = Camera_Service(0)
+    (ret, frame) = camera.read()
+    if not ret:
+        print_error("Could not read from the camera")
+        camera.close()
+        return None
+    (height, width) = frame.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 15, (width, height))
+    end = time.time() + seconds
+    while time.time() < end and ret:
+        writer.write(frame)
+        (ret, frame) = camera.read()
+    writer.release()
+    camera.close()
+    print_success(f"Clip saved to: {path}")
+    return path
+
+
+def save_results(results, filename):
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+    print_success(f"\nResults saved to: {filename}")
+
+
+class DetectionScaleBenchmark:
+    """Haar detection time and recall against the detection scale factor"""
+
+    SCALES = [1.0, 0.75, 0.5, 0.35, 0.25]
+
+    def run(self):
+        from face_tracker import detect_faces, box_iou
+
+        print_header("DETECTION SCALE BENCHMARK - Time & Recall")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'clips': [],
+            'scales': {}
+        }
+        clips = list_clips()
+        if not clips:
+            return results
+        face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+
+        gray_frames = []
+        for clip in clips:
+            frames = load_clip_frames(clip)
+            print_info(f"{clip}: {len(frames)} frames")
+            results['clips'].append(clip)
+            gray_frames.extend(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames)
+
+        # full resolution detections are the reference the smaller scales are compared with
+        reference = [detect_faces(face_cascade, gray, 1.0) for gray in gray_frames]
+        total_faces = sum(len(faces) for faces in reference)
+        print_info(f"Reference faces (scale 1.0): {total_faces}")
+
+        for scale in self.SCALES:
+            timings = []
+            found = 0
+            for (gray, expected) in zip(gray_frames, reference):
+                start = time.perf_counter()
+                faces = detect_faces(face_cascade, gray, scale)
+                timings.append(time.perf_counter() - start)
+                for box in expected:
+                    if any(box_iou(box, face) >= 0.5 for face in faces):
+                        found += 1
+            recall = found / total_faces if total_faces else 0.0
+            results['scales'][str(scale)] = {
+                'mean_ms': round(1000 * float(np.mean(timings)), 3),
+                'p95_ms': round(1000 * float(np.percentile(timings, 95)), 3),
+                'recall': round(recall, 4)
+            }
+            print_info(f"scale {scale:<5} mean {1000 * np.mean(timings):7.2f} ms   recall {recall:.3f}")
+
+        save_results(results, 'benchmark_results_detection.json')
+        return results
+
+
+class GalleryMatcherBenchmark:
+    """1:N gallery lookup latency on a synthetic gallery"""
+
+    GALLERY_SIZES = [1000, 10000, 25000, 50000]
+
+    def run(self):
+        from gallery_matcher import Gallery_Matcher
+        from recognition_engine import ANN_ABOVE
+
+        print_header("GALLERY MATCHER BENCHMARK - 1:N Lookup Latency")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'sizes': {}
+        }
+        rng = np.random.RandomState(0)
+        for size in self.GALLERY_SIZES:
+            # 50 samples per person, like the enrollment loop captures
+            people = max(1, size // 50)
+            centers = rng.randn(people, 128).astype("float32")
+            labels = np.repeat(np.arange(people), 50)[:size]
+            matcher = Gallery_Matcher()
+            matcher.set_gallery(labels, centers[labels] + 0.3 * rng.randn(size, 128).astype("float32"))
+            query = centers[:1] + 0.3 * rng.randn(1, 128).astype("float32")
+            matcher.search(query, k=5)
+            timings = []
+            for _ in range(200):
+                start = time.perf_counter()
+                matcher.search(query, k=5)
+                timings.append(time.perf_counter() - start)
+            # above ANN_ABOVE the app does not use the exact lookup, see ANN Index for that path
+            results['sizes'][str(size)] = {
+                'mean_ms': round(1000 * float(np.mean(timings)), 4),
+                'p95_ms': round(1000 * float(np.percentile(timings, 95)), 4),
+                'app_matcher': 'gallery' if size <= ANN_ABOVE else 'ann'
+            }
+            print_info(f"{size:>6} embeddings   mean {1000 * np.mean(timings):.3f} ms   p95 {1000 * np.percentile(timings, 95):.3f} ms"
+                       + ("" if size <= ANN_ABOVE else "   (the app switches to the ANN index)"))
+
+        save_results(results, 'benchmark_results_gallery.json')
+        return results
+
+
+class ANNIndexBenchmark:
+    """Recall@k and latency of the IVF / IVF-PQ index against exact search"""
+
+    PEOPLE = 2000
+    SAMPLES_PER_PERSON = 50
+    NPROBES = [1, 2, 4, 8, 16, 32]
+    K = 5
+
+    def run(self):
+        from ann_index import ANN_Index
+        from gallery_matcher import Gallery_Matcher
+
+        print_header("ANN INDEX BENCHMARK - Recall@k & Latency vs Exact Search")
+        size = self.PEOPLE * self.SAMPLES_PER_PERSON
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'gallery_size': size,
+            'k': self.K,
+            'indexes': {}
+        }
+        rng = np.random.RandomState(0)
+        centers = rng.randn(self.PEOPLE, 128).astype("float32")
+        labels = np.repeat(np.arange(self.PEOPLE), self.SAMPLES_PER_PERSON)
+        embeddings = centers[labels] + 0.35 * rng.randn(size, 128).astype("float32")
+        queries = centers[rng.choice(self.PEOPLE, 200)] + 0.35 * rng.randn(200, 128).astype("float32")
+
+        exact = Gallery_Matcher(threshold=0.0)
+        exact.set_gallery(labels, embeddings)
+        start = time.perf_counter()
+        exact_ids = np.concatenate([exact.search(query[None], k=self.K)[0] for query in queries])
+        exact_ms = 1000 * (time.perf_counter() - start) / len(queries)
+        results['exact_ms'] = round(exact_ms, 4)
+        print_info(f"Exact search over {size} embeddings: {exact_ms:.3f} ms / query")
+
+        for (name, pq_subvectors) in [("ivf_flat", 0), ("ivf_pq16", 16)]:
+            start = time.time()
+            index = ANN_Index(pq_subvectors=pq_subvectors, threshold=0.0).build(labels, embeddings)
+            build_s = time.time() - start
+            print_subheader(f"{name}: {len(index.centroids)} lists, built in {build_s:.1f} s")
+            results['indexes'][name] = {'build_s': round(build_s, 2), 'nlist': len(index.centroids), 'nprobe': {}}
+            for nprobe in self.NPROBES:
+                start = time.perf_counter()
+                ids = np.concatenate([index.search(query[None], k=self.K, nprobe=nprobe)[0] for query in queries])
+                query_ms = 1000 * (time.perf_counter() - start) / len(queries)
+                recall_1 = float(np.mean(ids[:, 0] == exact_ids[:, 0]))
+                recall_k = float(np.mean([len(set(a) & set(e)) / self.K for (a, e) in zip(ids, exact_ids)]))
+                results['indexes'][name]['nprobe'][str(nprobe)] = {
+                    'query_ms': round(query_ms, 4),
+                    'recall@1': round(recall_1, 4),
+                    f'recall@{self.K}': round(recall_k, 4)
+                }
+                print_info(f"nprobe {nprobe:<3} {query_ms:.3f} ms / query   recall@1 {recall_1:.3f}   recall@{self.K} {recall_k:.3f}")
+
+        save_results(results, 'benchmark_results_ann.json')
+        return results
+
+
+class StartupBenchmark:
+    """Time from process start to the login window, and to warmed-up models"""
+
+    APPS = ["attendance_with_antispoofing.py", "attendance_without_antispoofing.py"]
+    RUNS = 3
+
+    def run(self):
+        import subprocess
+        import sys
+
+        print_header("STARTUP BENCHMARK - Time to Login Window")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'apps': {}
+        }
+        for app in self.APPS:
+            print_subheader(app)
+            runs = []
+            for _ in range(self.RUNS):
+                # the app closes itself once the models are warm and prints one STARTUP line
+                output = subprocess.run([sys.executable, app, "--startup-benchmark"], capture_output=True, text=True, timeout=600).stdout
+                lines = [line for line in output.splitlines() if line.startswith("STARTUP ")]
+                if not lines:
+                    print_error(f"{app} did not report its startup time")
+                    break
+                runs.append(json.loads(lines[-1][len("STARTUP "):]))
+                print_info(f"login window {runs[-1]['login_window_s']:.2f} s   models ready {runs[-1]['models_ready_s']:.2f} s")
+            if runs:
+                results['apps'][app] = {
+                    'login_window_s': round(float(np.median([r['login_window_s'] for r in runs])), 3),
+                    'models_ready_s': round(float(np.median([r['models_ready_s'] for r in runs])), 3),
+                    'runs': runs
+                }
+
+        save_results(results, 'benchmark_results_startup.json')
+        return results
+
+
+class TFLiteBenchmark:
+    """Accuracy drift and latency of the TFLite models against the Keras models"""
+
+    # face crops in real/ and spoof/ sub folders, used for the liveness AUC
+    LIVENESS_DIR = "benchmark_data/liveness"
+    RUNS = 50
+
+    def time_per_call(self, model, batch):
+        model.predict(batch)
+        start = time.perf_counter()
+        for _ in range(self.RUNS):
+            model.predict(batch)
+        return round(1000 * (time.perf_counter() - start) / self.RUNS, 3)
+
+    def liveness_faces(self):
+        faces = []
+        labels = []
+        for (label, folder) in [(0, "real"), (1, "spoof")]:
+            for path in sorted(glob.glob(os.path.join(self.LIVENESS_DIR, folder, "*"))):
+                face = cv2.imread(path)
+                if face is not None:
+                    faces.append(cv2.resize(face, (160, 160)))
+                    labels.append(label)
+        return (faces, labels)
+
+    def run(self):
+        from sklearn.metrics import roc_auc_score
+        from model_loader import load_keras_model, load_json_model
+        from tflite_backend import (QUANTIZATIONS, FACENET_PATH, LIVENESS_JSON_PATH, LIVENESS_WEIGHTS_PATH,
+                                    TFLite_Model, tflite_path, dataset_faces, standardize_face, scale_face)
+
+        print_header("TFLITE BENCHMARK - Accuracy Drift & Latency vs Keras")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'facenet': {},
+            'liveness': {}
+        }
+        faces = dataset_faces()
+        if not faces:
+            print_error("No face crops found in dataset/ - enroll some staff first")
+            return results
+        samples = np.stack([standardize_face(face) for face in faces])
+        print_info(f"{len(samples)} face crops from dataset/")
+
+        print_subheader("FaceNet - embedding cosine vs Keras")
+        keras_model = load_keras_model(FACENET_PATH)
+        reference = keras_model.predict(samples)
+        reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+        results['facenet']['keras'] = {'ms_per_face': self.time_per_call(keras_model, samples[:1])}
+        for quantization in QUANTIZATIONS:
+            path = tflite_path('facenet', quantization)
+            if not os.path.exists(path):
+                print_warning(f"{path} not found - run: python tflite_backend.py --quantization {quantization}")
+                continue
+            model = TFLite_Model(path)
+            embeddings = model.predict(samples)
+            cosine = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True) * reference).sum(axis=1)
+            results['facenet'][quantization] = {
+                'cosine_mean': round(float(cosine.mean()), 5),
+                'cosine_min': round(float(cosine.min()), 5),
+                'ms_per_face': self.time_per_call(model, samples[:1]),
+                'size_mb': round(os.path.getsize(path) / 1e6, 2)
+            }
+            print_info(f"{quantization:<8} cosine mean {cosine.mean():.4f}  min {cosine.min():.4f}  {results['facenet'][quantization]['ms_per_face']:.2f} ms / face")
+        print_info(f"keras    {results['facenet']['keras']['ms_per_face']:.2f} ms / face")
+
+        print_subheader("Liveness - AUC on real / spoof crops")
+        (liveness_faces, labels) = self.liveness_faces()
+        if len(set(labels)) < 2:
+            print_warning(f"Put real and spoof face crops in {self.LIVENESS_DIR}/real and {self.LIVENESS_DIR}/spoof for the liveness AUC")
+        else:
+            batch = np.stack([scale_face(face) for face in liveness_faces])
+            models = [('keras', load_json_model(LIVENESS_JSON_PATH, LIVENESS_WEIGHTS_PATH))]
+            models += [(q, TFLite_Model(tflite_path('liveness', q))) for q in QUANTIZATIONS if os.path.exists(tflite_path('liveness', q))]
+            for (name, model) in models:
+                # the model scores spoofs high, see face_pipeline.liveness_label
+                scores = np.asarray(model.predict(batch)).reshape(len(batch), -1)[:, 0]
+                results['liveness'][name] = {
+                    'auc': round(float(roc_auc_score(labels, scores)), 5),
+                    'ms_per_face': self.time_per_call(model, batch[:1])
+                }
+                print_info(f"{name:<8} AUC {results['liveness'][name]['auc']:.4f}  {results['liveness'][name]['ms_per_face']:.2f} ms / face")
+
+        save_results(results, 'benchmark_results_tflite.json')
+        return results
+
+
+class InferencePathBenchmark:
+    """Per-call latency of Keras predict() against the compiled tf.function path"""
+
+    BATCH_SIZES = [1, 4, 16, 64]
+    RUNS = 20
+
+    def run(self):
+        import tensorflow as tf
+        from compiled_model import Compiled_Model
+        from tflite_backend import FACENET_PATH
+
+        print_header("INFERENCE PATH BENCHMARK - predict() vs Compiled")
+        if os.path.exists(FACENET_PATH):
+            from model_loader import load_keras_model
+            model = load_keras_model(FACENET_PATH)
+        else:
+            # same input size and a similar cost per face as the kiosk models
+            print_warning(f"{FACENET_PATH} not found - timing an untrained MobileNetV2 instead")
+            model = tf.keras.applications.MobileNetV2(input_shape=(160, 160, 3), weights=None)
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'model': model.name,
+            'paths': {}
+        }
+        paths = [
+            ('predict', lambda batch: model.predict(batch, verbose=0)),
+            ('compiled', Compiled_Model(model).predict),
+            ('compiled_xla', Compiled_Model(model, jit_compile=True).predict)
+        ]
+        rng = np.random.RandomState(0)
+        for (name, predict) in paths:
+            print_subheader(name)
+            results['paths'][name] = {}
+            for batch_size in self.BATCH_SIZES:
+                batch = rng.randn(batch_size, 160, 160, 3).astype("float32")
+                # the first calls trace / compile, they are not timed
+                predict(batch)
+                predict(batch)
+                timings = []
+                for _ in range(self.RUNS):
+                    start = time.perf_counter()
+                    predict(batch)
+                    timings.append(time.perf_counter() - start)
+                results['paths'][name][str(batch_size)] = {
+                    'mean_ms': round(1000 * float(np.mean(timings)), 3),
+                    'p95_ms': round(1000 * float(np.percentile(timings, 95)), 3),
+                    'ms_per_face': round(1000 * float(np.mean(timings)) / batch_size, 3)
+                }
+                print_info(f"batch {batch_size:<3} mean {1000 * np.mean(timings):8.2f} ms   {1000 * np.mean(timings) / batch_size:7.2f} ms / face")
+
+        save_results(results, 'benchmark_results_inference.json')
+        return results
+
+
+class FusedModelBenchmark:
+    """Per-frame recognition latency with and without the fused liveness + embedding call"""
+
+    FACE_COUNTS = [1, 2, 4]
+    RUNS = 20
+
+    def run(self):
+        import tensorflow as tf
+        from compiled_model import Compiled_Model, Fused_Model
+        from face_pipeline import Batch_Recognizer
+        from gallery_matcher import Gallery_Matcher
+
+        print_header("FUSED MODEL BENCHMARK - Liveness + Embedding per Frame")
+        # untrained stand-ins with the kiosk input size, the weights do not change the timings
+        embedding_model = tf.keras.applications.MobileNetV2(input_shape=(160, 160, 3), weights=None, classes=128, classifier_activation=None)
+        liveness_model = tf.keras.applications.MobileNetV2(input_shape=(160, 160, 3), weights=None, alpha=0.5, classes=1, classifier_activation="sigmoid")
+        rng = np.random.RandomState(0)
+        matcher = Gallery_Matcher()
+        matcher.set_gallery(np.repeat(np.arange(50), 20), rng.randn(1000, 128))
+        frame = rng.randint(0, 255, size=(480, 640, 3)).astype("uint8")
+        recognizers = [
+            ('no_liveness', Batch_Recognizer(Compiled_Model(embedding_model), matcher)),
+            ('separate', Batch_Recognizer(Compiled_Model(embedding_model), matcher, liveness_model=Compiled_Model(liveness_model))),
+            ('fused', Batch_Recognizer(embedding_model, matcher, fused_model=Fused_Model(embedding_model, liveness_model)))
+        ]
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'paths': {}
+        }
+        for (name, recognizer) in recognizers:
+            print_subheader(name)
+            results['paths'][name] = {}
+            for count in self.FACE_COUNTS:
+                faces = [(20 + 150 * i, 100, 120, 120) for i in range(count)]
+                recognizer.predict_faces(frame, faces)
+                timings = []
+                for _ in range(self.RUNS):
+                    start = time.perf_counter()
+                    recognizer.predict_faces(frame, faces)
+                    timings.append(time.perf_counter() - start)
+                results['paths'][name][str(count)] = {
+                    'mean_ms': round(1000 * float(np.mean(timings)), 3),
+                    'p95_ms': round(1000 * float(np.percentile(timings, 95)), 3)
+                }
+                print_info(f"{count} face(s)   mean {1000 * np.mean(timings):7.2f} ms   p95 {1000 * np.percentile(timings, 95):7.2f} ms")
+
+        save_results(results, 'benchmark_results_fused.json')
+        return results
+
+
+class LivenessPrefilterBenchmark:
+    """Liveness model invocation rate and spoof detection of the pre-filter cascade"""
+
+    # recorded clips of live people in real/ and of photos / screens in spoof/
+    LIVENESS_CLIPS_DIR = "benchmark_data/liveness_clips"
+
+    def clip_faces(self, folder, face_cascade):
+        from face_tracker import detect_faces
+        from face_pipeline import crop_faces
+        faces = []
+        for clip in sorted(glob.glob(os.path.join(self.LIVENESS_CLIPS_DIR, folder, "*"))):
+            for frame in load_clip_frames(clip):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                boxes = [(x, y, w, h) for (x, y, w, h) in detect_faces(face_cascade, gray, 0.5) if x >= 5 and y >= 5]
+                faces.extend(crop_faces(frame, boxes))
+        return faces
+
+    def run(self):
+        from face_pipeline import liveness_label
+        from liveness_filter import Liveness_Prefilter
+        from model_loader import load_json_model
+        from tflite_backend import LIVENESS_JSON_PATH, LIVENESS_WEIGHTS_PATH
+
+        print_header("LIVENESS PRE-FILTER BENCHMARK - Model Invocations & Spoof Detection")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'thresholds': Liveness_Prefilter().thresholds,
+            'classes': {}
+        }
+        face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+        try:
+            liveness_model = load_json_model(LIVENESS_JSON_PATH, LIVENESS_WEIGHTS_PATH)
+        except Exception as e:
+            print_warning(f"Liveness model not available ({e}) - escalated faces are left undecided")
+            liveness_model = None
+
+        for (folder, expected) in [("real", "real"), ("spoof", "spoof")]:
+            faces = self.clip_faces(folder, face_cascade)
+            if not faces:
+                print_warning(f"No faces found in {self.LIVENESS_CLIPS_DIR}/{folder}")
+                continue
+            prefilter = Liveness_Prefilter()
+            start = time.perf_counter()
+            labels = [prefilter.classify(face) for face in faces]
+            prefilter_ms = 1000 * (time.perf_counter() - start) / len(faces)
+            prefilter_labels = list(labels)
+            escalated = [i for (i, label) in enumerate(labels) if label is None]
+            if liveness_model is not None and escalated:
+                batch = np.stack([faces[i] for i in escalated]).astype("float32") / 255.0
+                for (i, score) in zip(escalated, np.asarray(liveness_model.predict(batch)).reshape(len(batch), -1)[:, 0]):
+                    labels[i] = liveness_label(score)
+            results['classes'][folder] = {
+                'faces': len(faces),
+                'prefilter_ms_per_face': round(prefilter_ms, 3),
+                'liveness_model_rate': round(len(escalated) / len(faces), 4),
+                'settled_by_prefilter_as_spoof': round(sum(1 for label in prefilter_labels if label == 'spoof') / len(faces), 4),
+                'labelled_' + expected: round(sum(1 for label in labels if label == expected) / len(faces), 4)
+            }
+            print_info(f"{folder:<6} {len(faces)} faces   liveness model on {len(escalated) / len(faces):.1%}   "
+                       f"labelled {expected} {results['classes'][folder]['labelled_' + expected]:.1%}   pre-filter {prefilter_ms:.2f} ms / face")
+
+        save_results(results, 'benchmark_results_liveness_prefilter.json')
+        return results
+
+
+class DecisionBenchmark:
+    """Time-to-mark of the early-exit decision engine against the fixed 11-vote mode"""
+
+    # seconds between fresh recognitions of one face (Identity_Cache refresh in face_recognize)
+    VOTE_INTERVAL = 0.25
+    PEOPLE = 500
+    # (mean confidence, share of recognitions that go to somebody else)
+    SCENARIOS = {'clear': (0.92, 0.02), 'average': (0.80, 0.08), 'hard': (0.68, 0.20)}
+
+    def votes(self, rng, person, confidence, confusion):
+        while True:
+            proba = float(np.clip(rng.normal(confidence, 0.05), 0.6, 0.999))
+            yield (person if rng.rand() >= confusion else int(rng.randint(1000, 1010)), proba)
+
+    def run(self):
+        from statistics import mode
+        from decision_engine import Decision_Engine
+
+        print_header("DECISION BENCHMARK - Time to Mark per Employee")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'vote_interval_s': self.VOTE_INTERVAL,
+            'scenarios': {}
+        }
+        rng = np.random.RandomState(0)
+        for (scenario, (confidence, confusion)) in self.SCENARIOS.items():
+            fixed_votes = []
+            fixed_correct = 0
+            engine_votes = []
+            engine_correct = 0
+            for person in range(self.PEOPLE):
+                stream = self.votes(rng, person, confidence, confusion)
+                # old loop: 11 recognitions, then the most common id
+                ids = [next(stream)[0] for _ in range(11)]
+                fixed_votes.append(11)
+                fixed_correct += mode(ids) == person
+                engine = Decision_Engine(timeout=float("inf"))
+                while engine.decision() is None:
+                    (id, proba) = next(stream)
+                    engine.add(id, proba)
+                engine_votes.append(engine.votes())
+                engine_correct += engine.decision()[0] == person
+            results['scenarios'][scenario] = {
+                'fixed': {'mean_s': round(self.VOTE_INTERVAL * float(np.mean(fixed_votes)), 3), 'accuracy': fixed_correct / self.PEOPLE},
+                'engine': {
+                    'mean_s': round(self.VOTE_INTERVAL * float(np.mean(engine_votes)), 3),
+                    'p95_s': round(self.VOTE_INTERVAL * float(np.percentile(engine_votes, 95)), 3),
+                    'accuracy': engine_correct / self.PEOPLE
+                }
+            }
+            r = results['scenarios'][scenario]
+            print_info(f"{scenario:<8} fixed {r['fixed']['mean_s']:.2f} s ({r['fixed']['accuracy']:.1%})   "
+                       f"engine {r['engine']['mean_s']:.2f} s, p95 {r['engine']['p95_s']:.2f} s ({r['engine']['accuracy']:.1%})")
+
+        save_results(results, 'benchmark_results_decision.json')
+        return results
+
+
+class KioskBenchmark:
+    """People marked per minute when recorded walk-through clips are replayed through kiosk mode"""
+
+    EMBEDDINGS_PATH = "models/embeddings.pickle"
+
+    def run(self):
+        from gallery_matcher import Gallery_Matcher
+        from model_loader import Model_Loader, load_keras_model
+        from recognition_engine import Recognition_Engine, register_models
+        from tflite_backend import FACENET_PATH
+
+        print_header("KIOSK BENCHMARK - People Marked per Minute")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'clips': {}
+        }
+        clips = list_clips()
+        if not clips:
+            return results
+        if not (os.path.exists(FACENET_PATH) and os.path.exists(self.EMBEDDINGS_PATH)):
+            print_error(f"{FACENET_PATH} and {self.EMBEDDINGS_PATH} are needed to recognize the people in the clips")
+            return results
+        model_loader = Model_Loader()
+        register_models(model_loader, lambda: load_keras_model(FACENET_PATH))
+        # the same engine as the apps, headless and without the motion gate so every frame is processed
+        engine = Recognition_Engine(model_loader, cv2.CascadeClassifier(FACE_CASCADE_PATH), kiosk=True, motion_gate=False)
+        classifier = Gallery_Matcher().load(self.EMBEDDINGS_PATH)
+
+        for clip in clips:
+            marked = set()
+            def on_decision(id, liveness):
+                if id is None or id in marked:
+                    return ("", False)
+                marked.add(id)
+                return ("Marked", True)
+            engine.start_session(classifier, [str(c) for c in classifier.classes_], on_decision=on_decision)
+            frames = load_clip_frames(clip, max_frames=100000)
+            # frames are processed as fast as possible, the throughput is per minute of processing
+            start = time.time()
+            for frame in frames:
+                engine.process(frame)
+            elapsed = time.time() - start
+            stats = engine.kiosk.stats()
+            results['clips'][clip] = {
+                'frames': len(frames),
+                'seconds': round(elapsed, 2),
+                'marked': stats['marked'],
+                'people_per_minute': round(60.0 * stats['marked'] / elapsed, 2) if elapsed else 0.0,
+                'mean_decision_s': stats['mean_decision_s']
+            }
+            print_info(f"{clip}: {stats['marked']} people in {elapsed:.1f} s   {results['clips'][clip]['people_per_minute']:.1f} people / min")
+
+        save_results(results, 'benchmark_results_kiosk.json')
+        return results
+
+class IdleCpuBenchmark:
+    """CPU used by the recognition loop in front of an empty scene, with and without the motion gate"""
+
+    SECONDS = 10
+
+    class Still_Capture:
+        # replays one JPEG at 30 fps like an MJPG webcam: grab() waits for the frame, read() also decodes it
+        def __init__(self, jpeg, fps=30):
+            self.jpeg = jpeg
+            self.interval = 1.0 / fps
+            self.next_frame = time.time()
+            self.noise = np.random.RandomState(0)
+        def set(self, prop, value):
+            return True
+        def grab(self):
+            self.next_frame += self.interval
+            time.sleep(max(0.0, self.next_frame - time.time()))
+            return True
+        def read(self):
+            self.grab()
+            frame = cv2.imdecode(self.jpeg, cv2.IMREAD_COLOR)
+            # sensor noise
+            frame[::7, ::7] += self.noise.randint(0, 3, size=frame[::7, ::7].shape).astype("uint8")
+            return (True, frame)
+        def release(self):
+            pass
+
+    def empty_scene(self):
+        clips = sorted(glob.glob(os.path.join(CLIPS_DIR, "*.avi")) + glob.glob(os.path.join(CLIPS_DIR, "*.mp4")))
+        frames = load_clip_frames(clips[0], max_frames=1) if clips else []
+        if frames:
+            return frames[0]
+        print_warning(f"No clip in {CLIPS_DIR}, using a synthetic room")
+        room = cv2.resize(np.random.RandomState(1).randint(40, 220, size=(12, 16, 3)).astype("uint8"), (640, 480))
+        return cv2.GaussianBlur(room, (0, 0), 15)
+
+    def measure(self, jpeg, face_cascade, gated):
+        from camera_service import Camera_Service
+        from face_tracker import Face_Tracker
+        from motion_gate import Motion_Gate, Frame_Rate_Governor
+        camera = Camera_Service(0, open_capture=lambda device: self.Still_Capture(jpeg))
+        tracker = Face_Tracker(face_cascade)
+        motion_gate = Motion_Gate()
+        governor = Frame_Rate_Governor(idle_fps=4, idle_after=3.0)
+        def step():
+            if gated:
+                governor.wait()
+            (ret, frame) = camera.read()
+            if gated and not motion_gate.update(frame) and not tracker.tracks:
+                return 0
+            if gated:
+                governor.activity()
+            tracker.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            return 1
+        # the scene has to stay still for IDLE_AFTER seconds before the governor slows down, only the idle part is measured
+        warm_up = time.time() + 5.0
+        while time.time() < warm_up:
+            step()
+        frames = 0
+        detected = 0
+        (wall, cpu) = (time.time(), time.process_time())
+        while time.time() - wall < self.SECONDS:
+            detected += step()
+            frames += 1
+        (wall, cpu) = (time.time() - wall, time.process_time() - cpu)
+        camera.close()
+        return {
+            'cpu_percent': round(100.0 * cpu / wall, 1),
+            'frames_per_second': round(frames / wall, 1),
+            'detected_per_second': round(detected / wall, 1)
+        }
+
+    def run(self):
+        print_header("IDLE CPU BENCHMARK - Motion Gate & Frame-Rate Governor")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'seconds': self.SECONDS
+        }
+        face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+        (ok, jpeg) = cv2.imencode(".jpg", self.empty_scene())
+        for (name, gated) in [('ungated', False), ('gated', True)]:
+            results[name] = self.measure(jpeg, face_cascade, gated)
+            print_info(f"{name:8s}: {results[name]['cpu_percent']:5.1f}% CPU   {results[name]['frames_per_second']:5.1f} frames/s   "
+                       f"{results[name]['detected_per_second']:5.1f} detections/s")
+
+        save_results(results, 'benchmark_results_idle_cpu.json')
+        return results
+
+
+class UiLagBenchmark:
+    """Tk event-loop lag while the recognition worker runs at full speed (needs a display)"""
+
+    SECONDS = 10
+
+    def run(self):
+        from tkinter import Tk, TclError
+        from face_tracker import Face_Tracker
+        from recognition_window import Recognition_Window, Event_Loop_Monitor
+
+        print_header("UI LAG BENCHMARK - Event Loop Lag During Recognition")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'seconds': self.SECONDS
+        }
+        try:
+            root = Tk()
+        except TclError as e:
+            print_error(f"No display for Tk: {e}")
+            return results
+        clips = sorted(glob.glob(os.path.join(CLIPS_DIR, "*.avi")) + glob.glob(os.path.join(CLIPS_DIR, "*.mp4")))
+        frames = load_clip_frames(clips[0]) if clips else []
+        if not frames:
+            print_warning(f"No clip in {CLIPS_DIR}, using random frames")
+            frames = [np.random.RandomState(i).randint(0, 255, size=(480, 640, 3)).astype("uint8") for i in range(30)]
+
+        # baseline: the same window with nothing running
+        monitor = Event_Loop_Monitor(root).start()
+        root.after(int(1000 * self.SECONDS / 5), root.quit)
+        root.mainloop()
+        monitor.stop()
+        results['idle'] = monitor.stats()
+        print_info(f"idle        : {results['idle']}")
+
+        face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+        processed = [0]
+        def work(stop_event, show):
+            # detection and drawing as fast as the worker can go, no frame pacing
+            tracker = Face_Tracker(face_cascade, detect_every=1)
+            end = time.time() + self.SECONDS
+            while not stop_event.is_set() and time.time() < end:
+                frame = frames[processed[0] % len(frames)].copy()
+                for (track_id, (x, y, w, h)) in tracker.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)):
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                show(frame)
+                processed[0] += 1
+        def finish(error, lag):
+            results['recognizing'] = lag
+            root.quit()
+        window = Recognition_Window(root, "UI Lag Benchmark", work, finish, status=lambda: f"{processed[0]} frames",
+                                    queue_length=lambda: 0).start()
+        start = time.time()
+        root.mainloop()
+        elapsed = time.time() - start
+        results['worker_fps'] = round(processed[0] / elapsed, 1)
+        results['frames_shown'] = window.latest.shown
+        results['frames_skipped'] = window.latest.skipped()
+        root.destroy()
+        print_info(f"recognizing : {results['recognizing']}")
+        print_info(f"worker {results['worker_fps']} frames/s, {results['frames_shown']} shown, {results['frames_skipped']} replaced before display")
+
+        save_results(results, 'benchmark_results_ui_lag.json')
+        return results
+
+
+class ReportSchemaBenchmark:
+    """Daily report queries on a synthetic multi-million-row report table, before and after migrate.py (needs MySQL)"""
+
+    DATABASE = "recognition_bench"
+    ROWS = 2000000
+    STAFF = 2000
+    REPEAT = 20
+
+    def fill(self, pool):
+        # the schema of older releases: string date and 12-hour string time, no keys
+        rng = np.random.RandomState(0)
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("create table report (id INT, name VARCHAR(100), date VARCHAR(20), time VARCHAR(20), status VARCHAR(20))")
+            days = self.ROWS // self.STAFF
+            start = datetime(2020, 1, 1).toordinal()
+            for day in range(days):
+                date = datetime.fromordinal(start + day).strftime("%Y-%m-%d")
+                seconds = rng.randint(7 * 3600, 19 * 3600, size=self.STAFF)
+                rows = [(id, f"Staff {id}", date, time.strftime("%I:%M:%S", time.gmtime(int(seconds[id - 1]))), "Present")
+                        for id in range(1, self.STAFF + 1)]
+                cur.executemany("insert into report(id,name,date,time,status) VALUES (%s,%s,%s,%s,%s)", rows)
+                if day % 50 == 0:
+                    conn.commit()
+                    print_info(f"{(day + 1) * self.STAFF:,} rows")
+            conn.commit()
+            return datetime.fromordinal(start + days - 1).strftime("%Y-%m-%d")
+
+    def timed(self, pool, queries):
+        timings = {}
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            for (name, sql, args) in queries:
+                samples = []
+                for i in range(self.REPEAT):
+                    start = time.perf_counter()
+                    cur.execute(sql, args)
+                    cur.fetchall()
+                    samples.append(time.perf_counter() - start)
+                timings[name] = round(1000 * float(np.median(samples)), 2)
+                print_info(f"{name:14s}: {timings[name]:9.2f} ms")
+        return timings
+
+    def report_pages(self):
+        # the queries report_viewer.py sends to open the report screen and to scroll one page down
+        from report_viewer import Report_Pager
+        queries = []
+        pager = Report_Pager(("ID", "Name", "Date", "Time", "Status"),
+                             fetch=lambda sql, args: queries.append((sql, args)) or [(7, "Staff 7", "2024-01-01", "10:00:00", "Present")])
+        first = pager.page()
+        pager.page(pager.row_key(first[-1]))
+        return [('report_open',) + queries[0], ('report_scroll',) + queries[1]]
+
+    def run(self):
+        import pymysql
+        import database
+        import migrate
+
+        print_header("REPORT SCHEMA BENCHMARK - Daily Queries Before and After Migrations")
+        results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'rows': self.ROWS,
+            'staff': self.STAFF
+        }
+        try:
+            server = database.Connection_Pool(size=1, database=None)
+            with server.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"drop database if exists {self.DATABASE}")
+                cur.execute(f"create database {self.DATABASE}")
+            server.close()
+        except pymysql.err.OperationalError as e:
+            print_error(f"MySQL is not reachable: {e}")
+            return results
+        pool = database.Connection_Pool(size=1, database=self.DATABASE)
+        start = time.time()
+        date = self.fill(pool)
+        results['fill_s'] = round(time.time() - start, 1)
+
+        print_subheader("Before (string columns, no index)")
+        results['before'] = self.timed(pool, [
+            ('by_date', "select * from report where date = %s", (date,)),
+            ('window', "select id,time from report where date = %s", (date,)),
+            ('name_and_date', "select name,date from report where name = %s and date = %s", ("Staff 7", date))])
+
+        start = time.time()
+        # the synthetic 12-hour times are random, converting them as written is fine here
+        migrate.upgrade(pool=pool, accept_12_hour_times=True)
+        results['migration_s'] = round(time.time() - start, 1)
+        print_info(f"migrations took {results['migration_s']} s")
+
+        print_subheader("After (DATE/TIME, unique (id, date), (date, time, id) index)")
+        results['after'] = self.timed(pool, [
+            ('by_date', "select * from report where date = %s", (date,)),
+            ('window', "select id from report where date = %s and time >= %s and time < %s", (date, "01:00:00", "12:00:00")),
+            ('id_and_date', "select id from report where id = %s and date = %s", (7, date))] + self.report_pages())
+        pool.close()
+
+        save_results(results, 'benchmark_results_report_schema.json')
+        return results
+
+
+def main_menu():
+    """Display main menu and handle user input"""
+
+    while True:
+        print(f"\n{Colors.BOLD}{Colors.HEADER}")
+        print("╔════════════════════════════════════════════════════════════╗")
+        print("║     ATTENDANCE SYSTEM - PERFORMANCE BENCHMARKS            ║")
+        print("╚════════════════════════════════════════════════════════════╝")
+        print(f"{Colors.ENDC}")
+
+        print(f"{Colors.CYAN}Select Benchmark:{Colors.ENDC}")
+        print(f"{Colors.BOLD}1.{Colors.ENDC} Record Benchmark Clip From Camera")
+        print(f"{Colors.BOLD}2.{Colors.ENDC} Detection Scale (Time & Recall)")
+        print(f"{Colors.BOLD}3.{Colors.ENDC} Gallery Matcher (1:N Lookup Latency)")
+        print(f"{Colors.BOLD}4.{Colors.ENDC} ANN Index (Recall@k & Latency vs Exact)")
+        print(f"{Colors.BOLD}5.{Colors.ENDC} Startup (Time to Login Window)")
+        print(f"{Colors.BOLD}6.{Colors.ENDC} TFLite Backend (Accuracy Drift & Latency)")
+        print(f"{Colors.BOLD}7.{Colors.ENDC} Inference Path (predict() vs Compiled, Batch 1-64)")
+        print(f"{Colors.BOLD}8.{Colors.ENDC} Fused Liveness + Embedding (Latency per Frame)")
+        print(f"{Colors.BOLD}9.{Colors.ENDC} Liveness Pre-filter (Model Invocations & Spoof Detection)")
+        print(f"{Colors.BOLD}10.{Colors.ENDC} Decision Engine (Time to Mark)")
+        print(f"{Colors.BOLD}11.{Colors.ENDC} Kiosk Mode (People Marked per Minute)")
+        print(f"{Colors.BOLD}12.{Colors.ENDC} Idle CPU (Motion Gate & Frame-Rate Governor)")
+        print(f"{Colors.BOLD}13.{Colors.ENDC} UI Lag (Event Loop Lag During Recognition)")
+        print(f"{Colors.BOLD}14.{Colors.ENDC} Report Schema (Daily Queries Before/After Migrations)")
+        print(f"{Colors.BOLD}0.{Colors.ENDC} Exit")
+        print()
+
+        choice = input(f"{Colors.GREEN}Enter your choice: {Colors.ENDC}").strip()
+
+        if choice == "1":
+            record_clip()
+        elif choice == "2":
+            DetectionScaleBenchmark().run()
+        elif choice == "3":
+            GalleryMatcherBenchmark().run()
+        elif choice == "4":
+            ANNIndexBenchmark().run()
+        elif choice == "5":
+            StartupBenchmark().run()
+        elif choice == "6":
+            TFLiteBenchmark().run()
+        elif choice == "7":
+            InferencePathBenchmark().run()
+        elif choice == "8":
+            FusedModelBenchmark().run()
+        elif choice == "9":
+            LivenessPrefilterBenchmark().run()
+        elif choice == "10":
+            DecisionBenchmark().run()
+        elif choice == "11":
+            KioskBenchmark().run()
+        elif choice == "12":
+            IdleCpuBenchmark().run()
+        elif choice == "13":
+            UiLagBenchmark().run()
+        elif choice == "14":
+            ReportSchemaBenchmark().run()
+        elif choice == "0":
+            print(f"\n{Colors.GREEN}Benchmarks finished.{Colors.ENDC}\n")
+            break
+        else:
+            print_error("Invalid choice.")
+
+        input(f"\n{Colors.CYAN}Press Enter to continue...{Colors.ENDC}")
+
+if __name__ == "__main__":
+    try:
+        main_menu()
+    except KeyboardInterrupt:
+        print(f"\n\n{Colors.WARNING}Benchmarks interrupted by user.{Colors.ENDC}\n")
+    except Exception as e:
+        print_error(f"An error occurred: {str(e)}")
+        import traceback
+        traceback.print_exc()
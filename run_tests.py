@@ -12,6 +12,8 @@ import inspect
 from datetime import datetime
 import json
 
+from console_output import Colors, print_header, print_subheader, print_success, print_error, print_warning, print_info
+
 # Install required packages if not available
 try:
     from radon.complexity import cc_visit
@@ -31,48 +33,30 @@ PROJECT_FILES = [
     "event_scheduler.py",
     "extract_embeddings.py",
     "mark_attendance.py",
-    "training.py"
+    "training.py",
+    "face_pipeline.py",
+    "frame_pipeline.py",
+    "face_tracker.py",
+    "identity_cache.py",
+    "gallery_matcher.py",
+    "ann_index.py",
+    "identity_registry.py",
+    "model_loader.py",
+    "tflite_backend.py",
+    "compiled_model.py",
+    "liveness_filter.py",
+    "decision_engine.py",
+    "kiosk_mode.py",
+    "camera_service.py",
+    "motion_gate.py",
+    "recognition_window.py",
+    "recognition_engine.py",
+    "database.py",
+    "attendance_recorder.py",
+    "migrate.py",
+    "report_viewer.py"
 ]
 
-class Colors:
-    """ANSI color codes for terminal output"""
-    HEADER = '\033[95m'
-    BLUE = '\033[94m'
-    CYAN = '\033[96m'
-    GREEN = '\033[92m'
-    WARNING = '\033[93m'
-    FAIL = '\033[91m'
-    ENDC = '\033[0m'
-    BOLD = '\033[1m'
-    UNDERLINE = '\033[4m'
-
-def print_header(text):
-    """Print formatted header"""
-    print(f"\n{Colors.HEADER}{Colors.BOLD}{'='*80}{Colors.ENDC}")
-    print(f"{Colors.HEADER}{Colors.BOLD}{text.center(80)}{Colors.ENDC}")
-    print(f"{Colors.HEADER}{Colors.BOLD}{'='*80}{Colors.ENDC}\n")
-
-def print_subheader(text):
-    """Print formatted subheader"""
-    print(f"\n{Colors.CYAN}{Colors.BOLD}{text}{Colors.ENDC}")
-    print(f"{Colors.CYAN}{'-'*60}{Colors.ENDC}")
-
-def print_success(text):
-    """Print success message"""
-    print(f"{Colors.GREEN}✓ {text}{Colors.ENDC}")
-
-def print_error(text):
-    """Print error message"""
-    print(f"{Colors.FAIL}✗ {text}{Colors.ENDC}")
-
-def print_warning(text):
-    """Print warning message"""
-    print(f"{Colors.WARNING}⚠ {text}{Colors.ENDC}")
-
-def print_info(text):
-    """Print info message"""
-    print(f"{Colors.BLUE}ℹ {text}{Colors.ENDC}")
-
 class WhiteBoxTesting:
     """White Box Testing - Code Quality and Internal Structure Analysis"""
     
@@ -199,7 +183,7 @@ class BlackBoxTesting:
     def run(self):
         print_header("BLACK BOX TESTING - Functional Behavior Analysis")
         
-        test_modules = ["extract_embeddings", "training", "mark_attendance", "event_scheduler"]
+        test_modules = ["extract_embeddings", "training", "mark_attendance", "event_scheduler", "face_pipeline", "frame_pipeline", "face_tracker", "identity_cache", "gallery_matcher", "ann_index", "identity_registry", "model_loader", "tflite_backend", "compiled_model", "liveness_filter", "decision_engine", "kiosk_mode", "camera_service", "motion_gate", "recognition_window", "recognition_engine", "database", "attendance_recorder", "migrate", "report_viewer"]
         
         results = {
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -251,6 +235,86 @@ class BlackBoxTesting:
             json.dump(results, f, indent=2)
         print_success("Results saved to: test_results_blackbox.json")
 
+class Sqlite_Connection:
+    """
+    A pymysql-like connection on an SQLite file in WAL mode. Without autocommit the
+    first statement opens a transaction and its reads keep the snapshot they first
+    saw until commit() or rollback(), like InnoDB's REPEATABLE READ.
+    """
+    def __init__(self, path, autocommit=False, **settings):
+        import sqlite3
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("pragma journal_mode=wal")
+        self.autocommit = autocommit
+    def cursor(self):
+        return Sqlite_Cursor(self)
+    def begin(self):
+        if not self.autocommit and not self.db.in_transaction:
+            self.db.execute("begin")
+    def commit(self):
+        if self.db.in_transaction:
+            self.db.execute("commit")
+    def rollback(self):
+        if self.db.in_transaction:
+            self.db.execute("rollback")
+    def ping(self, reconnect=False):
+        pass
+    def close(self):
+        self.db.close()
+
+class Sqlite_Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+    def execute(self, sql, args=None):
+        self.conn.begin()
+        args = () if args is None else args if isinstance(args, (tuple, list)) else (args,)
+        cursor = self.conn.db.execute(sql.replace("%s", "?"), args)
+        self.rows = cursor.fetchall()
+        return cursor.rowcount
+    def executemany(self, sql, rows):
+        self.conn.begin()
+        return self.conn.db.executemany(sql.replace("%s", "?"), rows).rowcount
+    def fetchall(self):
+        return self.rows
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+class Stub_Treeview:
+    # the parts of a Treeview the report screen uses, showing 20 rows at a time
+    def __init__(self):
+        self.shown = []
+        self.first = 0
+        self.count = 0
+    def __getitem__(self, option):
+        return ("ID", "Name", "Date", "Time", "Status")
+    def config(self, **options):
+        pass
+    def heading(self, column, command=None):
+        pass
+    def bind(self, sequence, callback, add=None):
+        pass
+    def insert(self, parent, index, values):
+        self.count += 1
+        self.shown.insert(len(self.shown) if index == 'end' else index, (self.count, values))
+        return self.count
+    def delete(self, *items):
+        self.shown = [item for item in self.shown if item[0] not in items]
+    def yview(self):
+        return (self.first / len(self.shown), min(1.0, (self.first + 20) / len(self.shown)))
+    def yview_moveto(self, fraction):
+        self.first = int(round(fraction * len(self.shown)))
+    def after(self, ms, callback):
+        return "after"
+    def after_cancel(self, job):
+        pass
+    def after_idle(self, callback):
+        return "idle"
+
+class Stub_Scrollbar:
+    def set(self, first, last):
+        pass
+
 class FunctionalTesting(unittest.TestCase):
     """Functional Testing - Unit Tests for Core Functions"""
     
@@ -309,6 +373,1341 @@ class FunctionalTesting(unittest.TestCase):
         except Exception as e:
             self.fail(f"Failed to import Extract_Embeddings: {e}")
 
+    def test_batch_recognizer_matches_single_face_path(self):
+        """Test batched inference gives the same per-face results as one face at a time"""
+        print_info("Testing batched face inference...")
+        import numpy as np
+        from face_pipeline import Batch_Recognizer, Svm_Classifier, liveness_label
+        from extract_embeddings import Extract_Embeddings
+
+        class StubModel:
+            def __init__(self, weights):
+                self.weights = weights
+                self.calls = 0
+            def predict(self, batch):
+                self.calls += 1
+                return np.asarray(batch).reshape(len(batch), -1) @ self.weights
+
+        class StubRecognizer:
+            def predict_proba(self, embeddings):
+                scores = np.exp(embeddings[:, :3] - embeddings[:, :3].max(axis=1, keepdims=True))
+                return scores / scores.sum(axis=1, keepdims=True)
+
+        class StubLabel:
+            classes_ = np.array(["1", "2", "3"])
+
+        rng = np.random.RandomState(0)
+        faces = [rng.randint(0, 255, size=(160, 160, 3)).astype("uint8") for _ in range(5)]
+        embedding_model = StubModel(rng.rand(160 * 160 * 3, 128).astype("float32") / 1000)
+        liveness_model = StubModel(rng.rand(160 * 160 * 3, 1).astype("float32") / 76800)
+        recognizer = StubRecognizer()
+        embedding_obj = Extract_Embeddings(model_path=None)
+        batch_recognizer = Batch_Recognizer(embedding_model, Svm_Classifier(recognizer, StubLabel), liveness_model=liveness_model)
+
+        results = batch_recognizer.predict(faces)
+        self.assertEqual(embedding_model.calls, 1)
+        self.assertEqual(liveness_model.calls, 1)
+        self.assertEqual(batch_recognizer.predict([]), [])
+
+        for face, (label_name, id, proba, p) in zip(faces, results):
+            score = liveness_model.predict(np.expand_dims(face.astype("float") / 255.0, axis=0))[0]
+            self.assertEqual(label_name, liveness_label(score))
+            sample = np.expand_dims(embedding_obj.normalize_pixels(imagearrays=face), axis=0)
+            preds = recognizer.predict_proba(embedding_model.predict(sample).reshape(1, -1))[0]
+            self.assertEqual(id, StubLabel.classes_[np.argmax(preds)])
+            self.assertAlmostEqual(proba, preds[np.argmax(preds)], places=4)
+        print_success("Batched face inference test passed")
+
+    def test_preprocess_buffers_do_not_allocate_per_frame(self):
+        """Test steady state preprocessing reuses its buffers instead of allocating per frame"""
+        print_info("Testing allocation-free preprocessing...")
+        import tracemalloc
+        import numpy as np
+        from face_pipeline import Batch_Recognizer, Svm_Classifier, crop_faces
+        from extract_embeddings import Extract_Embeddings
+
+        class StubModel:
+            # returns a preallocated output so only the preprocessing is measured
+            def __init__(self, output):
+                self.output = output
+                self.last_batch = None
+            def predict(self, batch):
+                self.last_batch = batch
+                return self.output[:len(batch)]
+
+        class StubRecognizer:
+            def __init__(self):
+                self.proba = np.tile([[0.1, 0.7, 0.2]], (8, 1))
+            def predict_proba(self, embeddings):
+                return self.proba[:len(embeddings)]
+
+        class StubLabel:
+            classes_ = np.array(["1", "2", "3"])
+
+        rng = np.random.RandomState(0)
+        frame = rng.randint(0, 255, size=(480, 640, 3)).astype("uint8")
+        faces = [(40, 40, 120, 120), (250, 60, 150, 150), (450, 200, 100, 100)]
+        embedding_model = StubModel(np.zeros((8, 128), dtype="float32"))
+        liveness_model = StubModel(np.zeros((8, 1), dtype="float32"))
+        batch_recognizer = Batch_Recognizer(embedding_model, Svm_Classifier(StubRecognizer(), StubLabel), liveness_model=liveness_model)
+
+        batch_recognizer.predict_faces(frame, faces)
+        embedding_obj = Extract_Embeddings(model_path=None)
+        for face, batch_face, scaled_face in zip(crop_faces(frame, faces), embedding_model.last_batch, liveness_model.last_batch):
+            np.testing.assert_allclose(batch_face, embedding_obj.normalize_pixels(imagearrays=face), atol=1e-4)
+            np.testing.assert_allclose(scaled_face, face.astype("float") / 255.0, atol=1e-6)
+
+        # a single float32 face tensor is 300 KB, steady state frames must stay well below that
+        tracemalloc.start()
+        for _ in range(20):
+            batch_recognizer.predict_faces(frame, faces)
+        (current, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print_info(f"Peak traced allocation over 20 frames: {peak} bytes")
+        self.assertLess(peak, 32 * 1024)
+        print_success("Allocation-free preprocessing test passed")
+
+    def test_frame_pipeline_drops_stale_frames(self):
+        """Test the threaded pipeline keeps only the newest frames and reports stage stats"""
+        print_info("Testing threaded frame pipeline...")
+        from frame_pipeline import Frame_Pipeline, Latest_Queue
+
+        latest = Latest_Queue(maxsize=1)
+        for i in range(5):
+            latest.put(i)
+        self.assertEqual(latest.get(timeout=1), 4)
+        self.assertEqual(latest.dropped, 4)
+
+        frame_ids = iter(range(1000000))
+        def read_frame():
+            time.sleep(0.001)
+            return next(frame_ids)
+        def detect(frame):
+            return (frame, [])
+        def infer(frame, faces):
+            time.sleep(0.02)
+            return (frame, faces, [])
+
+        pipeline = Frame_Pipeline(read_frame, detect, infer).start()
+        seen = []
+        while len(seen) < 5:
+            result = pipeline.get_result(timeout=1)
+            self.assertIsNotNone(result)
+            seen.append(result[0])
+        pipeline.stop()
+        self.assertIsNone(pipeline.error)
+        self.assertEqual(seen, sorted(seen))
+        stats = pipeline.stats()
+        for stage in ("capture", "detect", "infer", "display"):
+            self.assertIn(stage, stats)
+        self.assertGreater(stats["capture"]["dropped"] + stats["detect"]["dropped"], 0)
+        self.assertGreater(stats["capture"]["fps"], stats["infer"]["fps"])
+        print_success("Threaded frame pipeline test passed")
+
+    def test_face_tracker_follows_between_detections(self):
+        """Test the tracker skips cascade runs and keeps boxes and ids on a moving face"""
+        print_info("Testing face tracker...")
+        import cv2
+        import numpy as np
+        from face_tracker import Face_Tracker
+
+        rng = np.random.RandomState(1)
+        background = rng.randint(0, 60, size=(480, 640)).astype("uint8")
+        # smooth texture so the face survives being shrunk to the tracking template
+        face = cv2.GaussianBlur(rng.randint(0, 255, size=(120, 120)).astype("uint8"), (15, 15), 0)
+        face = cv2.normalize(face, None, 0, 255, cv2.NORM_MINMAX)
+
+        class StubCascade:
+            def __init__(self):
+                self.box = None
+            def detectMultiScale(self, gray, scale_factor, min_neighbors):
+                # detection runs on a shrunk frame, report the box at that resolution
+                scale = gray.shape[1] / 640.0
+                return [tuple(int(v * scale) for v in self.box)]
+
+        cascade = StubCascade()
+        tracker = Face_Tracker(cascade, detect_every=5)
+        track_ids = set()
+        for i in range(30):
+            x, y = 100 + 3 * i, 80 + 2 * i
+            gray = background.copy()
+            gray[y:y+120, x:x+120] = face
+            cascade.box = (x, y, 120, 120)
+            tracks = tracker.update(gray)
+            self.assertEqual(len(tracks), 1)
+            (track_id, (tx, ty, tw, th)) = tracks[0]
+            track_ids.add(track_id)
+            self.assertLessEqual(abs(tx - x), 4)
+            self.assertLessEqual(abs(ty - y), 4)
+        self.assertEqual(len(track_ids), 1)
+        self.assertAlmostEqual(tracker.detection_rate(), 0.2)
+        print_success("Face tracker test passed")
+
+    def test_identity_cache_skips_recognized_tracks(self):
+        """Test recognized tracks are reused until they go stale or move"""
+        print_info("Testing identity cache...")
+        from identity_cache import Identity_Cache
+
+        calls = []
+        def recognize(boxes):
+            calls.append(len(boxes))
+            return [("real", "7", 0.9 if box[0] < 300 else 0.2, 0) for box in boxes]
+
+        cache = Identity_Cache(refresh_every=60, accept=lambda result: result[2] >= 0.6)
+        tracks = [(1, (100, 100, 80, 80)), (2, (400, 100, 80, 80))]
+        for _ in range(10):
+            results = cache.resolve(tracks, recognize)
+        self.assertEqual(results[0], ("real", "7", 0.9, 0))
+        # track 1 is recognized once, track 2 stays unknown and is retried every frame
+        self.assertEqual(calls, [2] + [1] * 9)
+        self.assertEqual(cache.fresh_tracks, {2})
+
+        # a big jump of the box forces a refresh
+        cache.resolve([(1, (200, 100, 80, 80))], recognize)
+        self.assertEqual(calls[-1], 1)
+        self.assertNotIn(2, cache.entries)
+
+        cache.refresh_every = 0
+        cache.resolve([(1, (200, 100, 80, 80))], recognize)
+        self.assertEqual(len(calls), 12)
+        print_success("Identity cache test passed")
+
+    def test_gallery_matcher_top_k_and_unknown(self):
+        """Test gallery matching returns the nearest identities and flags unknown faces"""
+        print_info("Testing gallery matcher...")
+        import pickle
+        import numpy as np
+        from gallery_matcher import Gallery_Matcher
+
+        rng = np.random.RandomState(2)
+        centers = rng.randn(20, 128)
+        face_ids = [str(i) for i in np.repeat(np.arange(20), 5)]
+        embeddings = (centers[np.repeat(np.arange(20), 5)] + 0.2 * rng.randn(100, 128)).tolist()
+        test_file = "test_gallery_embeddings.pickle"
+        with open(test_file, "wb") as f:
+            pickle.dump({"face_ids": face_ids, "embeddings": embeddings}, f)
+
+        matcher = Gallery_Matcher(threshold=0.7).load(test_file)
+        os.remove(test_file)
+        queries = centers[[3, 11]] + 0.2 * rng.randn(2, 128)
+        ids, scores = matcher.search(queries, k=3)
+        self.assertEqual(ids.shape, (2, 3))
+        self.assertEqual(list(ids[:, 0]), ["3", "11"])
+        self.assertTrue(np.all(np.diff(scores, axis=1) <= 0))
+
+        stranger = rng.randn(1, 128)
+        ids, scores = matcher.search(stranger, k=1)
+        self.assertIsNone(ids[0, 0])
+
+        # a new staff member is matched straight away, without retraining
+        matcher.add("42", stranger + 0.05 * rng.randn(3, 128))
+        ids, scores = matcher.search(stranger, k=1)
+        self.assertEqual(ids[0, 0], "42")
+        (id, score, p) = matcher.identify(stranger)[0]
+        self.assertEqual((id, matcher.classes_[p]), ("42", "42"))
+
+        # MATCHER = 'gallery' goes through the ANN index once the gallery is too large for an exact lookup
+        import shutil
+        import tempfile
+        from ann_index import ANN_Index
+        from recognition_engine import load_classifier
+        root_dir = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(root_dir, "models"))
+            with open(os.path.join(root_dir, "models", "embeddings.pickle"), "wb") as f:
+                pickle.dump({"face_ids": face_ids, "embeddings": embeddings}, f)
+            self.assertIsInstance(load_classifier("gallery", root_dir, Gallery_Matcher()), Gallery_Matcher)
+            index = load_classifier("gallery", root_dir, Gallery_Matcher(), ann_above=50)
+            self.assertIsInstance(index, ANN_Index)
+            self.assertEqual(index.identify(centers[[3]])[0][0], "3")
+        finally:
+            shutil.rmtree(root_dir)
+        print_success("Gallery matcher test passed")
+
+    def test_ann_index_matches_exact_search(self):
+        """Test the IVF / IVF-PQ index finds the same person as exact search and survives a save"""
+        print_info("Testing approximate nearest-neighbour index...")
+        import numpy as np
+        from ann_index import ANN_Index
+        from gallery_matcher import Gallery_Matcher
+
+        rng = np.random.RandomState(3)
+        centers = rng.randn(50, 128)
+        labels = np.repeat(np.arange(50), 10)
+        embeddings = centers[labels] + 0.3 * rng.randn(500, 128)
+        queries = centers[[1, 20, 49]] + 0.3 * rng.randn(3, 128)
+        exact = Gallery_Matcher(threshold=0.0)
+        exact.set_gallery(labels, embeddings)
+        exact_ids, exact_scores = exact.search(queries, k=1)
+
+        index = ANN_Index(nlist=8, nprobe=8, threshold=0.0).build(labels, embeddings)
+        ids, scores = index.search(queries, k=1)
+        self.assertEqual(list(ids[:, 0]), list(exact_ids[:, 0]))
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+        pq_index = ANN_Index(nlist=8, nprobe=2, pq_subvectors=16, threshold=0.0).build(labels, embeddings)
+        ids, scores = pq_index.search(queries, k=1)
+        self.assertEqual(list(ids[:, 0]), ["1", "20", "49"])
+
+        test_file = "test_ann_index.pickle"
+        pq_index.save(test_file)
+        loaded = ANN_Index(nprobe=2, threshold=0.0).load(test_file)
+        os.remove(test_file)
+        self.assertEqual(list(loaded.search(queries, k=1)[0][:, 0]), ["1", "20", "49"])
+        (id, score, p) = loaded.identify(queries[:1])[0]
+        self.assertEqual(loaded.classes_[p], "1")
+        print_success("Approximate nearest-neighbour index test passed")
+
+    def test_identity_registry_lookups_and_refresh(self):
+        """Test id/name lookups and that dataset/ is only rescanned when it changes"""
+        print_info("Testing identity registry...")
+        import shutil
+        import tempfile
+        import numpy as np
+        from identity_registry import Identity_Registry
+
+        dataset_dir = tempfile.mkdtemp()
+        try:
+            for folder in ["Asha_1", "Bikash_2", "Chandra_3"]:
+                os.mkdir(os.path.join(dataset_dir, folder))
+            table_version = [1]
+            registry = Identity_Registry(dataset_dir, version_check=lambda: table_version[0])
+            registry.refresh()
+            self.assertEqual(registry.name("2"), "Bikash")
+            self.assertEqual(registry.id("Chandra"), "3")
+            self.assertEqual(registry.folder(1), "Asha_1")
+            self.assertIsNone(registry.name("9"))
+            names = registry.label_names(np.array(["1", "3"]))
+            self.assertEqual(list(names), ["Asha", "Chandra"])
+
+            registry.refresh()
+            registry.refresh()
+            self.assertEqual(registry.loads, 1)
+
+            os.rename(os.path.join(dataset_dir, "Asha_1"), os.path.join(dataset_dir, "Asmita_1"))
+            os.utime(dataset_dir, ns=(0, os.stat(dataset_dir).st_mtime_ns + 1000000))
+            registry.refresh()
+            self.assertEqual(registry.loads, 2)
+            self.assertEqual(registry.name("1"), "Asmita")
+
+            table_version[0] = 2
+            registry.refresh()
+            self.assertEqual(registry.loads, 3)
+        finally:
+            shutil.rmtree(dataset_dir)
+        print_success("Identity registry test passed")
+
+    def test_model_loader_loads_in_background(self):
+        """Test models load lazily on a background thread and are warmed up once"""
+        print_info("Testing lazy model loading...")
+        import subprocess
+        import threading
+        from model_loader import Model_Loader
+
+        # importing the model code must not pull in TensorFlow
+        output = subprocess.check_output([sys.executable, "-c",
+            "import sys, extract_embeddings, model_loader; print('tensorflow' in sys.modules)"])
+        self.assertEqual(output.decode().strip(), "False")
+
+        release = threading.Event()
+        warmed = []
+        def load_embedding():
+            release.wait(5)
+            return "embedding"
+        def load_broken():
+            raise IOError("missing weights")
+        loader = Model_Loader()
+        loader.register("embedding", load_embedding, warmup=warmed.append)
+        loader.register("liveness", load_broken)
+        self.assertFalse(loader.ready("embedding"))
+
+        loader.start()
+        self.assertFalse(loader.ready("embedding"))
+        release.set()
+        self.assertEqual(loader.get("embedding"), "embedding")
+        self.assertEqual(warmed, ["embedding"])
+        self.assertIn("warmup_s", loader.timings["embedding"])
+        self.assertRaises(IOError, loader.get, "liveness")
+        self.assertFalse(loader.ready())
+        print_success("Lazy model loading test passed")
+
+    def test_tflite_backend_matches_keras(self):
+        """Test the TFLite conversions stay close to the Keras model for every quantization"""
+        print_info("Testing TFLite export and runtime...")
+        import shutil
+        import tempfile
+        import numpy as np
+        import tensorflow as tf
+        from model_loader import warm_up
+        from tflite_backend import QUANTIZATIONS, TFLite_Model, convert, standardize_face
+
+        inputs = tf.keras.Input((160, 160, 3))
+        x = tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu")(inputs)
+        x = tf.keras.layers.GlobalAveragePooling2D()(x)
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(128)(x))
+
+        rng = np.random.RandomState(0)
+        faces = [standardize_face(rng.randint(0, 255, size=(160, 160, 3)).astype("uint8")) for _ in range(8)]
+        batch = np.stack(faces[:3])
+        reference = model.predict(batch, verbose=0)
+        directory = tempfile.mkdtemp()
+        try:
+            for quantization in QUANTIZATIONS:
+                path = os.path.join(directory, quantization + ".tflite")
+                with open(path, "wb") as f:
+                    f.write(convert(model, quantization, calibration_faces=faces))
+                tflite_model = TFLite_Model(path)
+                self.assertEqual(tflite_model.input_shape, (None, 160, 160, 3))
+                warm_up(tflite_model)
+                embeddings = tflite_model.predict(batch)
+                self.assertEqual(embeddings.shape, reference.shape)
+                cosine = (embeddings * reference).sum(axis=1) / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+                self.assertGreater(cosine.min(), 0.99)
+            self.assertRaises(ValueError, convert, model, "int8")
+        finally:
+            shutil.rmtree(directory)
+        print_success("TFLite backend test passed")
+
+    def test_compiled_model_matches_predict(self):
+        """Test the traced inference path matches Keras predict and is traced only once"""
+        print_info("Testing compiled inference path...")
+        import numpy as np
+        import tensorflow as tf
+        from compiled_model import Compiled_Model
+        from model_loader import warm_up
+
+        inputs = tf.keras.Input((160, 160, 3))
+        x = tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu")(inputs)
+        x = tf.keras.layers.GlobalAveragePooling2D()(x)
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(128)(x))
+        compiled = Compiled_Model(model)
+        warm_up(compiled)
+
+        rng = np.random.RandomState(0)
+        for batch_size in [1, 3, 7]:
+            batch = rng.randn(batch_size, 160, 160, 3).astype("float32")
+            output = compiled.predict(batch)
+            self.assertIsInstance(output, np.ndarray)
+            np.testing.assert_allclose(output, model.predict(batch, verbose=0), rtol=1e-4, atol=1e-5)
+        self.assertEqual(compiled.function.experimental_get_tracing_count(), 1)
+        print_success("Compiled inference path test passed")
+
+    def test_fused_model_matches_separate_models(self):
+        """Test the fused liveness + embedding call gives the same results as the two models"""
+        print_info("Testing fused liveness and embedding model...")
+        import numpy as np
+        import tensorflow as tf
+        from compiled_model import Compiled_Model, Fused_Model
+        from face_pipeline import Batch_Recognizer
+        from gallery_matcher import Gallery_Matcher
+
+        def small_model(outputs, activation=None):
+            inputs = tf.keras.Input((160, 160, 3))
+            x = tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu")(inputs)
+            x = tf.keras.layers.GlobalAveragePooling2D()(x)
+            return tf.keras.Model(inputs, tf.keras.layers.Dense(outputs, activation=activation)(x))
+        embedding_model = small_model(128)
+        liveness_model = small_model(1, activation="sigmoid")
+
+        rng = np.random.RandomState(0)
+        frame = rng.randint(0, 255, size=(480, 640, 3)).astype("uint8")
+        faces = [(40, 40, 120, 120), (250, 60, 150, 150)]
+        matcher = Gallery_Matcher(threshold=0.0)
+        matcher.set_gallery(["1", "2", "3"], rng.randn(3, 128))
+
+        separate = Batch_Recognizer(Compiled_Model(embedding_model), matcher, liveness_model=Compiled_Model(liveness_model))
+        fused_model = Fused_Model(embedding_model, liveness_model)
+        fused = Batch_Recognizer(embedding_model, matcher, liveness_model=liveness_model, fused_model=fused_model)
+        expected = separate.predict_faces(frame, faces)
+        results = fused.predict_faces(frame, faces)
+        self.assertEqual([r[0] for r in results], [r[0] for r in expected])
+        self.assertEqual([r[1] for r in results], [r[1] for r in expected])
+        np.testing.assert_allclose([r[2] for r in results], [r[2] for r in expected], atol=1e-4)
+
+        n = fused.buffers.load_crops(frame, faces)
+        (scores, embeddings) = fused_model.predict(fused.buffers.crops[:n])
+        np.testing.assert_allclose(scores, liveness_model.predict(fused.buffers.liveness_batch(n), verbose=0), atol=1e-5)
+        np.testing.assert_allclose(embeddings, embedding_model.predict(fused.buffers.standardized_batch(n), verbose=0), rtol=1e-3, atol=1e-4)
+        print_success("Fused liveness and embedding model test passed")
+
+    def test_liveness_prefilter_escalates_only_ambiguous_faces(self):
+        """Test the cheap liveness checks settle obvious faces and escalate the rest"""
+        print_info("Testing liveness pre-filter cascade...")
+        import cv2
+        import numpy as np
+        from face_pipeline import Batch_Recognizer
+        from gallery_matcher import Gallery_Matcher
+        from liveness_filter import Liveness_Prefilter
+
+        rng = np.random.RandomState(0)
+        base = cv2.GaussianBlur(rng.randint(0, 255, size=(160, 160, 3)).astype("uint8"), (0, 0), 2)
+        textured = np.clip(base.astype(int) + rng.randint(-20, 20, size=base.shape), 0, 255).astype("uint8")
+        (yy, xx) = np.mgrid[:160, :160]
+        screen = np.clip(base + 40 * (np.sin(xx * 2.6) * np.sin(yy * 2.6))[:, :, None], 0, 255).astype("uint8")
+        glare = base.copy()
+        glare[40:100, 40:100] = 255
+
+        prefilter = Liveness_Prefilter()
+        self.assertEqual(prefilter.classify(screen), "spoof")
+        self.assertEqual(prefilter.classify(glare), "spoof")
+        self.assertEqual(prefilter.classify(textured), "real")
+        self.assertIsNone(prefilter.classify(base))
+        self.assertAlmostEqual(prefilter.escalation_rate(), 0.25)
+        self.assertIsNone(Liveness_Prefilter({"texture_real": None}).classify(textured))
+
+        class StubModel:
+            def __init__(self, outputs):
+                self.outputs = outputs
+                self.faces = 0
+            def predict(self, batch):
+                self.faces += len(batch)
+                return np.full((len(batch), self.outputs), 0.1, dtype="float32")
+        liveness_model = StubModel(1)
+        matcher = Gallery_Matcher(threshold=0.0)
+        matcher.set_gallery(["1"], rng.randn(1, 128))
+        recognizer = Batch_Recognizer(StubModel(128), matcher, liveness_model=liveness_model, prefilter=Liveness_Prefilter())
+        results = recognizer.predict([screen, base, textured, glare])
+        self.assertEqual([r[0] for r in results], ["spoof", "real", "real", "spoof"])
+        self.assertEqual(liveness_model.faces, 1)
+        print_success("Liveness pre-filter cascade test passed")
+
+    def test_decision_engine_exits_early(self):
+        """Test the streaming decision stops at the margin, catches spoofs and times out"""
+        print_info("Testing early-exit decision engine...")
+        from decision_engine import Decision_Engine
+
+        engine = Decision_Engine(margin=5.0, min_votes=3, timeout=60)
+        for proba in [0.95, 0.93]:
+            engine.add("7", proba, "real")
+            engine.add(None, 0.3, "real")
+        self.assertIsNone(engine.decision())
+        self.assertIsNone(engine.decision_latency())
+        engine.add("7", 0.94, "real")
+        self.assertEqual(engine.decision(), ("7", "real"))
+        self.assertGreaterEqual(engine.decision_latency(), 0.0)
+        self.assertEqual(engine.votes(), 3)
+
+        # a competing identity keeps the margin from being reached
+        engine = Decision_Engine(margin=5.0, min_votes=3, timeout=60)
+        for id in ["7", "8", "7", "8", "7"]:
+            engine.add(id, 0.9)
+        self.assertIsNone(engine.decision())
+
+        engine = Decision_Engine(liveness_margin=2, timeout=60)
+        engine.add("7", 0.95, "spoof")
+        engine.add("7", 0.95, "spoof")
+        self.assertEqual(engine.decision(), ("7", "spoof"))
+
+        engine = Decision_Engine(timeout=0)
+        self.assertEqual(engine.decision(), (None, "real"))
+
+        # the timeout takes the leader only with min_votes and a lead, otherwise nobody is recognized
+        engine = Decision_Engine(margin=5.0, min_votes=3, timeout=60)
+        for id in ["7", "7", "7", "8"]:
+            engine.add(id, 0.9, "real")
+        engine.started_at -= 60
+        self.assertEqual(engine.decision(), ("7", "real"))
+        engine = Decision_Engine(margin=5.0, min_votes=3, timeout=60)
+        engine.add("7", 0.99, "real")
+        engine.add("7", 0.99, "real")
+        engine.started_at -= 60
+        self.assertEqual(engine.decision(), (None, "real"))
+        engine = Decision_Engine(margin=5.0, min_votes=3, timeout=60)
+        for id in ["7", "8", "7", "8", "7", "8"]:
+            engine.add(id, 0.9, "real")
+        engine.started_at -= 60
+        self.assertEqual(engine.decision(), (None, "real"))
+        print_success("Early-exit decision engine test passed")
+
+    def test_kiosk_session_decides_each_track(self):
+        """Test kiosk mode decides and marks every tracked person independently"""
+        print_info("Testing continuous kiosk mode...")
+        from decision_engine import Decision_Engine
+        from kiosk_mode import Kiosk_Session
+
+        marked = []
+        def on_decision(id, liveness):
+            if id is None:
+                return ("Not recognized", False)
+            if id in marked:
+                return ("Already marked", False)
+            marked.append(id)
+            return ("Marked", True)
+        kiosk = Kiosk_Session(on_decision, 0.6, new_engine=lambda: Decision_Engine(margin=5.0, min_votes=3, timeout=60), forget_after=60)
+        tracks = [(1, (10, 10, 80, 80)), (2, (200, 10, 80, 80))]
+        results = [("real", "7", 0.95, 0), ("real", "8", 0.95, 1)]
+        for _ in range(2):
+            self.assertEqual(kiosk.update(tracks, results, [True, True]), [])
+        # cached results are not votes
+        self.assertEqual(kiosk.update(tracks, results, [False, False]), [])
+        self.assertEqual(kiosk.update(tracks, results, [True, True]), [1, 2])
+        self.assertEqual(marked, ["7", "8"])
+        self.assertTrue(kiosk.is_decided(1))
+        self.assertEqual(kiosk.labels[2], "Marked")
+
+        # decided tracks are not recognized again, a new track of the same person is not marked twice
+        tracks.append((3, (400, 10, 80, 80)))
+        for _ in range(3):
+            kiosk.update(tracks, [None, None, ("real", "7", 0.95, 0)], [False, False, True])
+        self.assertEqual(kiosk.labels[3], "Already marked")
+        self.assertEqual(kiosk.stats()["marked"], 2)
+        self.assertEqual(kiosk.stats()["decisions"], 3)
+
+        # a track still short of min_votes at the timeout is not marked as its leader
+        tracks.append((4, (600, 10, 80, 80)))
+        for _ in range(2):
+            kiosk.update(tracks, [None, None, None, ("real", "9", 0.99, 2)], [False, False, False, True])
+        kiosk.engines[4].started_at -= 60
+        self.assertEqual(kiosk.update(tracks, [None, None, None, ("real", "9", 0.99, 2)], [False, False, False, False]), [4])
+        self.assertEqual(kiosk.labels[4], "Not recognized")
+        self.assertNotIn("9", marked)
+        self.assertEqual(kiosk.stats()["marked"], 2)
+
+        kiosk.forget_after = 0
+        kiosk.update([], [], [])
+        self.assertEqual(kiosk.labels, {})
+        self.assertGreater(kiosk.throughput(), 0)
+        print_success("Continuous kiosk mode test passed")
+
+    def test_camera_service_opens_device_once(self):
+        """Test the shared camera is configured once and hands out only new frames"""
+        print_info("Testing persistent camera service...")
+        import threading
+        import cv2
+        import numpy as np
+        from camera_service import Camera_Service
+
+        class StubCapture:
+            # stands in for a 100 fps USB camera
+            def __init__(self, device):
+                self.settings = {}
+                self.frames = 0
+                self.decoded = 0
+            def set(self, prop, value):
+                self.settings[prop] = value
+                return True
+            def grab(self):
+                time.sleep(0.01)
+                self.frames += 1
+                return True
+            def read(self):
+                self.grab()
+                self.decoded += 1
+                return (True, np.full((4, 4, 3), self.frames % 256, dtype="uint8"))
+            def release(self):
+                pass
+
+        captures = []
+        def open_capture(device):
+            captures.append(StubCapture(device))
+            return captures[-1]
+        camera = Camera_Service(0, width=1280, height=720, fps=30, fourcc="MJPG", idle_after=0.2, open_capture=open_capture)
+        try:
+            seen = []
+            for session in range(3):
+                for _ in range(5):
+                    (ret, frame) = camera.read()
+                    self.assertTrue(ret)
+                    seen.append(int(frame[0, 0, 0]))
+            self.assertEqual(camera.opens, 1)
+            self.assertEqual(len(set(seen)), len(seen))
+            settings = captures[0].settings
+            self.assertEqual(settings[cv2.CAP_PROP_FRAME_WIDTH], 1280)
+            self.assertEqual(settings[cv2.CAP_PROP_FPS], 30)
+            self.assertEqual(settings[cv2.CAP_PROP_FOURCC], cv2.VideoWriter_fourcc(*"MJPG"))
+
+            # two screens reading at once each follow the stream, they do not split the frames between them
+            readers = [camera.reader(), camera.reader()]
+            read = [[], []]
+            def follow(i):
+                for _ in range(5):
+                    (ret, frame) = readers[i].read()
+                    read[i].append(int(frame[0, 0, 0]))
+            threads = [threading.Thread(target=follow, args=(i,)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+            for frames in read:
+                self.assertEqual(len(frames), 5)
+                self.assertEqual(frames, sorted(set(frames)))
+            self.assertTrue(set(read[0]) & set(read[1]))
+
+            # without readers the frames are grabbed but not decoded
+            time.sleep(0.3)
+            decoded = captures[0].decoded
+            time.sleep(0.2)
+            self.assertEqual(captures[0].decoded, decoded)
+            self.assertGreater(captures[0].frames, decoded)
+        finally:
+            camera.close()
+        print_success("Persistent camera service test passed")
+
+    def test_motion_gate_skips_still_scene(self):
+        """Test the motion gate passes moving frames only and the governor slows down when idle"""
+        print_info("Testing motion gate and frame-rate governor...")
+        import numpy as np
+        from motion_gate import Motion_Gate, Frame_Rate_Governor
+
+        rng = np.random.RandomState(0)
+        room = rng.randint(60, 200, size=(480, 640, 3)).astype("uint8")
+        def still():
+            # the same room with sensor noise
+            return np.clip(room.astype("int16") + rng.randint(-4, 5, size=room.shape), 0, 255).astype("uint8")
+        gate = Motion_Gate(hold=0.5)
+        now = 100.0
+        gate.update(still(), now=now)
+        passed = [gate.update(still(), now=now + 1 + i * 0.1) for i in range(10)]
+        self.assertEqual(passed, [False] * 10)
+
+        person = still()
+        person[100:400, 250:400] = 20
+        self.assertTrue(gate.update(person, now=now + 3))
+        # still passing within the hold time after the motion, not after it
+        self.assertTrue(gate.update(person, now=now + 3.2))
+        self.assertFalse(gate.update(person, now=now + 3.6))
+
+        governor = Frame_Rate_Governor(idle_fps=10, idle_after=0.2)
+        governor.wait()
+        start = time.time()
+        for _ in range(3):
+            governor.wait()
+        self.assertLess(time.time() - start, 0.05)
+        time.sleep(0.2)
+        start = time.time()
+        for _ in range(3):
+            governor.wait()
+        self.assertGreaterEqual(time.time() - start, 0.18)
+        governor.activity()
+        start = time.time()
+        governor.wait()
+        self.assertLess(time.time() - start, 0.05)
+        print_success("Motion gate test passed")
+
+    def test_recognition_worker_shows_newest_frame(self):
+        """Test the recognition worker only hands the newest frame to the window and keeps its error"""
+        print_info("Testing non-blocking recognition worker...")
+        from recognition_window import Latest_Frame, Recognition_Worker, Event_Loop_Monitor
+
+        latest = Latest_Frame()
+        def work(stop_event):
+            for i in range(100):
+                latest.put(i)
+            stop_event.wait(5)
+            raise IOError("Could not read frame from camera")
+        worker = Recognition_Worker(work)
+        worker.start()
+        time.sleep(0.1)
+        # everything published before a refresh collapses into the newest frame
+        self.assertEqual(latest.take(), 99)
+        self.assertIsNone(latest.take())
+        self.assertEqual(latest.skipped(), 99)
+        worker.cancel()
+        worker.join(timeout=2)
+        self.assertFalse(worker.is_alive())
+        self.assertIsInstance(worker.error, IOError)
+
+        class StubWidget:
+            # runs after() callbacks when the test calls run_pending()
+            def __init__(self):
+                self.pending = []
+            def after(self, ms, callback):
+                self.pending.append(callback)
+                return len(self.pending)
+            def after_cancel(self, job):
+                self.pending = []
+            def run_pending(self):
+                (pending, self.pending) = (self.pending, [])
+                for callback in pending:
+                    callback()
+        widget = StubWidget()
+        monitor = Event_Loop_Monitor(widget, interval_ms=10).start()
+        time.sleep(0.06)
+        widget.run_pending()
+        monitor.stop()
+        stats = monitor.stats()
+        self.assertEqual(stats['samples'], 1)
+        self.assertGreaterEqual(stats['max_ms'], 40)
+        print_success("Recognition worker test passed")
+
+    def test_recognition_engine_runs_headless(self):
+        """Test the recognition engine decides from frames alone and loads liveness only when enabled"""
+        print_info("Testing headless recognition engine...")
+        import subprocess
+        import numpy as np
+        from model_loader import Model_Loader
+        from recognition_engine import Recognition_Engine
+
+        output = subprocess.check_output([sys.executable, "-c",
+            "import sys, recognition_engine; print('tensorflow' in sys.modules)"])
+        self.assertEqual(output.decode().strip(), "False")
+
+        class StubModel:
+            def __init__(self, width):
+                self.width = width
+                self.calls = 0
+            def predict(self, batch):
+                self.calls += 1
+                return np.full((len(batch), self.width), 0.1, dtype="float32")
+
+        class StubClassifier:
+            threshold = 0.6
+            classes_ = np.array(["7"])
+            def identify(self, embeddings):
+                return [("7", 0.99, 0)] * len(embeddings)
+
+        class StubCascade:
+            def detectMultiScale(self, gray, scale_factor, min_neighbors):
+                scale = gray.shape[1] / 640.0
+                return [tuple(int(v * scale) for v in (200, 120, 160, 160))]
+
+        loaded = []
+        def register(name, width):
+            def load():
+                loaded.append(name)
+                return StubModel(width)
+            return load
+        loader = Model_Loader()
+        loader.register("embedding", register("embedding", 128), warmup=None)
+        loader.register("liveness", register("liveness", 1), warmup=None, preload=False)
+        engine = Recognition_Engine(loader, StubCascade(), backend="tflite", liveness=False, motion_gate=False,
+                                    refresh_every=0.0, decision_margin=5.0, decision_min_votes=3)
+        engine.start_session(StubClassifier(), ["Staff 7"])
+
+        rng = np.random.RandomState(0)
+        frame = rng.randint(0, 255, size=(480, 640, 3)).astype("uint8")
+        frames = 0
+        while engine.decision() is None and frames < 20:
+            (out, tracks, results, fresh) = engine.process(frame.copy())
+            frames += 1
+        self.assertEqual(engine.decision(), ("7", "real"))
+        self.assertLess(frames, 20)
+        self.assertIsNone(results[0][0])
+        self.assertEqual(loaded, ["embedding"])
+
+        # switching the stage on loads the liveness model and labels the faces
+        engine.set_liveness(True)
+        engine.start_session(StubClassifier(), ["Staff 7"])
+        (out, tracks, results, fresh) = engine.process(frame.copy())
+        self.assertEqual(loaded, ["embedding", "liveness"])
+        self.assertEqual(results[0][0], "real")
+        self.assertEqual(engine.annotate((out, tracks, results, fresh)).shape, frame.shape)
+
+        # a second session is refused while the first pipeline runs, its threads would be left behind
+        engine.start(lambda: frame.copy())
+        self.assertTrue(engine.in_session())
+        with self.assertRaises(RuntimeError):
+            engine.start(lambda: frame.copy())
+        with self.assertRaises(RuntimeError):
+            engine.start_session(StubClassifier(), ["Staff 7"])
+        engine.stop()
+        self.assertFalse(engine.in_session())
+        engine.start_session(StubClassifier(), ["Staff 7"])
+        engine.start(lambda: frame.copy())
+        engine.stop()
+        print_success("Headless recognition engine test passed")
+
+    def test_connection_pool_reuses_connections(self):
+        """Test the database pool shares a few connections between threads and replaces broken ones"""
+        print_info("Testing database connection pool...")
+        import threading
+        import pymysql
+        import database
+
+        class StubCursor:
+            def __init__(self, conn):
+                self.conn = conn
+                self.rows = []
+            def execute(self, sql, args=None):
+                time.sleep(0.005)
+                self.conn.executed.append((sql, args))
+                self.rows = [(sql, args)]
+                return 1
+            def executemany(self, sql, rows):
+                self.conn.executed.extend((sql, row) for row in rows)
+                return len(rows)
+            def fetchall(self):
+                return self.rows
+            def fetchone(self):
+                return self.rows[0]
+
+        class StubConnection:
+            def __init__(self):
+                self.executed = []
+                self.commits = 0
+                self.closed = False
+            def cursor(self):
+                return StubCursor(self)
+            def commit(self):
+                self.commits += 1
+            def rollback(self):
+                pass
+            def ping(self, reconnect=False):
+                pass
+            def close(self):
+                self.closed = True
+
+        connections = []
+        def connect():
+            connections.append(StubConnection())
+            return connections[-1]
+        pool = database.Connection_Pool(size=2, connect=connect)
+        (shared, database.pool) = (database.pool, pool)
+        try:
+            def worker(n):
+                for i in range(5):
+                    self.assertEqual(database.fetchone("select fname from attendance where eid=%s", n * 10 + i),
+                                     ("select fname from attendance where eid=%s", n * 10 + i))
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            metrics = pool.metrics()
+            self.assertEqual(len(connections), 2)
+            self.assertEqual(metrics["checkouts"], 40)
+            self.assertEqual(metrics["active"], 0)
+            self.assertGreater(metrics["max_wait_ms"], 0)
+
+            self.assertEqual(database.executemany("insert into report(id) VALUES (%s)", [(1,), (2,)]), 2)
+            self.assertEqual(sum(conn.commits for conn in connections), 1)
+
+            # a connection that failed at the MySQL level is dropped and replaced
+            with self.assertRaises(pymysql.err.OperationalError):
+                with pool.connection() as conn:
+                    raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+            self.assertTrue(conn.closed)
+            self.assertEqual(pool.metrics()["open"], 1)
+            database.execute("delete from report where id = %s", 1)
+            self.assertEqual(len(connections), 2)
+            self.assertEqual(pool.metrics()["active"], 0)
+        finally:
+            database.pool = shared
+        self.assertEqual(database.like_pattern("50%_a"), "%50\\%\\_a%")
+        print_success("Database connection pool test passed")
+
+    def test_pooled_reads_see_other_connections(self):
+        """Test a pooled connection sees rows committed by another connection after its first read"""
+        print_info("Testing pooled reads against other writers...")
+        import tempfile
+        import database
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "recognition.db")
+            writer = Sqlite_Connection(path, autocommit=True)
+            writer.cursor().execute("create table report (id INT, name TEXT, date TEXT, time TEXT, status TEXT)")
+            pool = database.Connection_Pool(size=1, connect=lambda: Sqlite_Connection(path, **pool.settings))
+            (shared, database.pool) = (database.pool, pool)
+            try:
+                self.assertEqual(database.fetchall("select id from report"), [])
+                # another kiosk marks someone on its own connection
+                writer.cursor().execute("insert into report values (%s,%s,%s,%s,%s)", (7, "Asha", "2024-05-02", "09:00:00", "Present"))
+                self.assertEqual(database.fetchall("select id from report"), [(7,)])
+                self.assertEqual(pool.metrics()["open"], 1)
+            finally:
+                database.pool = shared
+                pool.close()
+
+            # without autocommit the released connection keeps its first snapshot, which is what the setting prevents
+            pool = database.Connection_Pool(size=1, connect=lambda: Sqlite_Connection(path, **pool.settings), autocommit=False)
+            self.assertEqual(pool.settings["autocommit"], False)
+            with pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("select id from report")
+            writer.cursor().execute("insert into report values (%s,%s,%s,%s,%s)", (8, "Ravi", "2024-05-02", "09:01:00", "Present"))
+            with pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("select id from report")
+                self.assertEqual(cur.fetchall(), [(7,)])
+            pool.close()
+            writer.close()
+        print_success("Pooled reads test passed")
+
+    def test_attendance_recorder_writes_behind(self):
+        """Test today's marks are answered from memory and written in batches, also after an outage"""
+        print_info("Testing write-behind attendance recorder...")
+        from datetime import datetime
+        import pymysql
+        import database
+        from attendance_recorder import Attendance_Recorder
+
+        class ReportTable:
+            # report with its unique (id, date) key, INSERT IGNORE skips rows already there
+            def __init__(self):
+                self.rows = {("7", "2024-05-02"): ("7", "Asha", "Present")}
+                self.down = False
+                self.queries = []
+                self.batches = []
+            def cursor(self):
+                return self
+            def execute(self, sql, args=None):
+                self.queries.append(sql)
+                if sql.startswith("select status"):
+                    (id, date) = args
+                    self.result = [self.rows[(str(id), date)][2:]] if (str(id), date) in self.rows else []
+                else:
+                    self.result = [(id,) for (id, date) in self.rows if date == args]
+            def fetchall(self):
+                return self.result
+            def fetchone(self):
+                return self.result[0] if self.result else None
+            def executemany(self, sql, rows):
+                if self.down:
+                    raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+                assert sql.startswith("insert ignore into report")
+                self.batches.append(len(rows))
+                inserted = 0
+                for (id, name, date, time_of_day, status) in rows:
+                    if (str(id), date) not in self.rows:
+                        self.rows[(str(id), date)] = (str(id), name, status)
+                        inserted += 1
+                return inserted
+            def commit(self):
+                pass
+            def rollback(self):
+                pass
+            def close(self):
+                pass
+
+        table = ReportTable()
+        clock = [datetime(2024, 5, 2, 9, 0, 0)]
+        pool = database.Connection_Pool(size=1, connect=lambda: table)
+        (shared, database.pool) = (database.pool, pool)
+        recorder = Attendance_Recorder(batch_size=3, retry_after=0.05, now=lambda: clock[0])
+        try:
+            recorder.start()
+            self.assertTrue(recorder.is_marked(7))
+            self.assertFalse(recorder.record(7, "Asha"))
+            queries = len(table.queries)
+            # nothing reaches MySQL while deciding, even with the server down
+            table.down = True
+            self.assertTrue(all(recorder.record(id, "Person {}".format(id)) for id in range(1, 6)))
+            self.assertFalse(recorder.record(3, "Person 3"))
+            self.assertEqual(len(table.queries), queries)
+            time.sleep(0.2)
+            self.assertGreater(recorder.stats()["retries"], 0)
+            self.assertEqual(recorder.stats()["pending"], 5)
+            table.down = False
+            self.assertTrue(recorder.flush(timeout=5.0))
+            self.assertEqual(sorted(table.batches), [2, 3])
+            self.assertEqual(len(table.rows), 6)
+
+            # a mark written by another machine is ignored, not duplicated
+            table.rows[("8", "2024-05-02")] = ("8", "Ravi", "Present")
+            self.assertTrue(recorder.record(8, "Ravi"))
+            self.assertTrue(recorder.flush(timeout=5.0))
+            self.assertEqual(recorder.stats()["ignored"], 1)
+            self.assertEqual(len(table.rows), 7)
+            self.assertEqual(recorder.stats()["dropped"], 0)
+
+            # the scheduler's absentees count as marked, a Present already taken is not turned into an Absent
+            self.assertTrue(recorder.record(10, "Lena"))
+            self.assertEqual(recorder.mark_absent([8, 10, 11], "2024-05-02"), [11])
+            self.assertFalse(recorder.record(11, "Omar"))
+            # an Absent written first (another machine's scheduler) drops the Present, it is not counted as written
+            table.rows[("12", "2024-05-02")] = ("12", "Noor", "Absent")
+            self.assertTrue(recorder.record(12, "Noor"))
+            self.assertTrue(recorder.flush(timeout=5.0))
+            self.assertEqual(recorder.stats()["dropped"], 1)
+            self.assertEqual(recorder.dropped[0][:2], (12, "Noor"))
+            self.assertEqual(table.rows[("12", "2024-05-02")][2], "Absent")
+
+            # the next day starts empty and is seeded again from report
+            clock[0] = datetime(2024, 5, 3, 8, 0, 0)
+            table.rows[("9", "2024-05-03")] = ("9", "Mei", "Present")
+            self.assertFalse(recorder.is_marked(7))
+            self.assertTrue(recorder.record(7, "Asha"))
+            self.assertTrue(recorder.flush(timeout=5.0))
+            self.assertTrue(recorder.is_marked(9))
+            self.assertFalse(recorder.record(9, "Mei"))
+            self.assertIn(("7", "2024-05-03"), table.rows)
+        finally:
+            recorder.close(timeout=1.0)
+            database.pool = shared
+        print_success("Write-behind attendance recorder test passed")
+
+    def test_migrations_bring_report_schema_up_to_date(self):
+        """Test the versioned migrations type, key and index report once, whatever schema they start from"""
+        print_info("Testing schema migrations...")
+        import database
+        import migrate
+
+        class Schema:
+            # answers the information_schema queries of migrate.py and applies its DDL to a table description
+            def __init__(self, columns, indexes, ambiguous=()):
+                self.columns = columns
+                self.indexes = indexes
+                # (id, date, time) rows with a 12-hour time and nothing to correct it from
+                self.ambiguous = list(ambiguous)
+                self.versions = set()
+                self.executed = []
+            def cursor(self):
+                return self
+            def execute(self, sql, args=None):
+                self.executed.append(sql)
+                if "information_schema.columns" in sql:
+                    self.result = [(self.columns[args[1]],)] if args[1] in self.columns else []
+                elif "information_schema.statistics" in sql:
+                    self.result = [(name, column, 0 if unique else 1)
+                                   for (name, (columns, unique)) in sorted(self.indexes.items()) for column in columns]
+                elif "substring_index(time" in sql:
+                    self.result = [(len(self.ambiguous),)] if sql.startswith("select count") else self.ambiguous[:5]
+                elif sql.startswith("alter table report modify"):
+                    (column, data_type) = sql.split()[-2:]
+                    self.columns[column] = data_type.lower()
+                elif sql.startswith("alter table report_migrating add unique key"):
+                    self.indexes["report_id_date"] = (("id", "date"), True)
+                elif sql.startswith("create index"):
+                    self.indexes[sql.split()[2]] = (tuple(sql.split("(")[1].rstrip(")").split(",")), False)
+                elif sql.startswith("insert into schema_migrations"):
+                    self.versions.add(args[0])
+                elif sql.startswith("select version"):
+                    self.result = [(version,) for version in self.versions]
+            def fetchone(self):
+                return self.result[0] if self.result else None
+            def fetchall(self):
+                return self.result
+            def commit(self):
+                pass
+            def rollback(self):
+                pass
+            def close(self):
+                pass
+
+        # a database from an older release: string columns, no keys
+        legacy = Schema({"id": "int", "name": "varchar", "date": "varchar", "time": "varchar"}, {},
+                        ambiguous=[(7, "2024-05-02", "02:30:00"), (8, "2024-05-02", "11:10:00")])
+        pool = database.Connection_Pool(size=1, connect=lambda: legacy)
+        # 12-hour times without AM/PM stop the migration before anything is altered
+        with self.assertRaises(migrate.Ambiguous_Times) as raised:
+            migrate.upgrade(pool=pool, log=lambda message: None)
+        self.assertIn("2 marks", str(raised.exception))
+        self.assertIn("(7, '2024-05-02', '02:30:00')", str(raised.exception))
+        self.assertFalse([sql for sql in legacy.executed if sql.startswith("alter")])
+        self.assertEqual(len(migrate.pending(pool)), 4)
+        logged = []
+        self.assertEqual(migrate.upgrade(pool=pool, log=logged.append, accept_12_hour_times=True), [1, 2, 3, 4])
+        self.assertIn("[INFO] keeping 2 12-hour times as written", logged)
+        self.assertEqual((legacy.columns["date"], legacy.columns["time"]), ("date", "time"))
+        self.assertIn("insert ignore into report_migrating select * from report order by date,time", legacy.executed)
+        self.assertEqual(legacy.indexes["report_id_date"], (("id", "date"), True))
+        self.assertEqual(legacy.indexes["report_date_time_id"], (("date", "time", "id"), False))
+        self.assertEqual(migrate.pending(pool), [])
+        self.assertEqual(migrate.upgrade(pool=pool, log=lambda message: None), [])
+
+        # the README schema is typed and keyed already, only the date index is missing
+        current = Schema({"id": "int", "name": "varchar", "date": "date", "time": "time", "recorded_at": "timestamp"},
+                         {"PRIMARY": (("id", "date"), True)})
+        pool = database.Connection_Pool(size=1, connect=lambda: current)
+        self.assertEqual(migrate.upgrade(pool=pool, log=lambda message: None), [1, 2, 3, 4])
+        changes = [sql for sql in current.executed if not sql.startswith(("select", "create table if not exists", "insert into schema"))]
+        self.assertEqual(changes, ["create index report_date_time_id on report (date,time,id)",
+                                   "create index report_name_date_id on report (name,date,id)"])
+        print_success("Schema migrations test passed")
+
+    def test_report_viewer_pages_by_key(self):
+        """Test the report screen reads report in keyset pages and keeps only a window of rows"""
+        print_info("Testing paginated report viewer...")
+        import sqlite3
+        from datetime import date, timedelta
+        from report_viewer import Report_Pager, Virtual_Table
+
+        db = sqlite3.connect(":memory:")
+        db.execute("create table report (id INT, name TEXT, date TEXT, time TEXT, status TEXT, PRIMARY KEY (id, date))")
+        rows = [(id, "Staff {:02d}".format(id % 40), (date(2024, 1, 1) + timedelta(days=day)).isoformat(),
+                 "{:02d}:{:02d}:00".format(8 + (id * 7 + day) % 4, (id * 13 + day) % 60), "Present")
+                for day in range(25) for id in range(1, 81)]
+        db.executemany("insert into report values (?,?,?,?,?)", rows)
+        queries = []
+        def fetch(sql, args):
+            queries.append(sql)
+            return db.execute(sql.replace("%s", "?"), args).fetchall()
+
+        headings = ("ID", "Date", "Name", "Time", "Status")
+        pager = Report_Pager(headings, page_size=64, fetch=fetch)
+        for (heading, key) in [("Date", (2, 3, 0)), ("ID", (0, 2)), ("Name", (1, 2, 0))]:
+            for descending in (False, True):
+                pager.sort(heading, descending)
+                expected = sorted(rows, key=lambda row: tuple(row[i] for i in key), reverse=descending)
+                # forward to the end page by page, then back again from the last row
+                seen = []
+                page = pager.page()
+                while page:
+                    seen.extend(page)
+                    page = pager.page(pager.row_key(page[-1]))
+                self.assertEqual([(r[0], r[2], r[1], r[3], r[4]) for r in expected], seen)
+                back = pager.page(pager.row_key(seen[-1]), forward=False)
+                self.assertEqual(back, seen[-65:-1])
+        self.assertTrue(all("limit %s" in sql and "offset" not in sql for sql in queries))
+        pager.search("name", "Staff 07")
+        pager.sort("Date", True)
+        self.assertEqual(len(pager.page()), 50)
+        pager.search(None, "")
+
+        class Tree:
+            # the parts of a Treeview the table uses, showing 20 rows at a time
+            def __init__(self):
+                self.shown = []
+                self.first = 0
+                self.count = 0
+            def __getitem__(self, option):
+                return headings
+            def config(self, **options):
+                pass
+            def heading(self, column, command=None):
+                pass
+            def insert(self, parent, index, values):
+                self.count += 1
+                self.shown.insert(len(self.shown) if index == 'end' else index, (self.count, values))
+                return self.count
+            def delete(self, *items):
+                self.shown = [item for item in self.shown if item[0] not in items]
+            def yview(self):
+                return (self.first / len(self.shown), min(1.0, (self.first + 20) / len(self.shown)))
+            def yview_moveto(self, fraction):
+                self.first = int(round(fraction * len(self.shown)))
+            def after_idle(self, callback):
+                return "idle"
+
+        class Scrollbar:
+            def set(self, first, last):
+                pass
+
+        tree = Tree()
+        table = Virtual_Table(tree, Scrollbar(), pager, window_rows=200)
+        queries.clear()
+        self.assertEqual(table.reload(), 64)
+        self.assertEqual(len(queries), 1)
+        # scroll to the bottom of all 2000 rows, the widget never holds more than the window
+        while table.more_after:
+            tree.first = len(tree.shown) - 20
+            table.check()
+            self.assertLessEqual(len(tree.shown), 200)
+            self.assertEqual(len(tree.shown), len(table.rows))
+        oldest = min(rows, key=lambda row: (row[2], row[3], row[0]))
+        self.assertEqual(table.rows[-1], (oldest[0], oldest[2], oldest[1], oldest[3], oldest[4]))
+        # and back up to the newest row
+        while table.more_before:
+            tree.first = 0
+            table.check()
+            self.assertLessEqual(len(tree.shown), 200)
+        self.assertEqual(table.rows[0], pager.page()[0])
+        db.close()
+        print_success("Paginated report viewer test passed")
+
+    def test_report_live_refresh_adds_only_new_marks(self):
+        """Test the open report screen picks up today's new marks without re-reading the table"""
+        print_info("Testing live refresh of the report screen...")
+        import sqlite3
+        import threading
+        from report_viewer import Report_Pager, Virtual_Table, Live_Refresh
+
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        db.execute("create table report (id INT, name TEXT, date TEXT, time TEXT, status TEXT, PRIMARY KEY (id, date))")
+        db.executemany("insert into report values (?,?,?,?,?)",
+                       [(id, "Staff {}".format(id), "2024-05-0{}".format(day), "{:02d}:{:02d}:00".format(8 + id // 60, id % 60), "Present")
+                        for day in (1, 2) for id in range(1, 121)])
+        lock = threading.Lock()
+        fetched = []
+        def fetch(sql, args):
+            with lock:
+                rows = db.execute(sql.replace("%s", "?"), args).fetchall()
+            fetched.append((sql, args, len(rows)))
+            return rows
+
+        def mark(id, at):
+            with lock:
+                db.execute("insert into report values (?,?,?,?,?)", (id, "Staff {}".format(id), "2024-05-02", at, "Present"))
+
+        tree = Stub_Treeview()
+        table = Virtual_Table(tree, Stub_Scrollbar(), Report_Pager(tree["columns"], page_size=50, fetch=fetch), window_rows=150)
+        table.reload()
+        live = Live_Refresh(table, interval_ms=60000, lag=120, today=lambda: "2024-05-02")
+        def poll():
+            # one read on the worker, then the tick that puts its rows into the table
+            live.last_poll = 0.0
+            live.tick()
+            live.worker.join()
+            live.tick()
+        # the newest mark shown is 10:00, the first poll only reads the two minutes before it
+        poll()
+        self.assertEqual(fetched[-1][1], ("2024-05-02", "09:58:00"))
+        self.assertEqual(fetched[-1][2], 3)
+        self.assertEqual(len(table.rows), 50)
+
+        mark(121, "10:05:00")
+        mark(122, "10:06:00")
+        poll()
+        self.assertEqual([row[0] for row in table.rows[:3]], [122, 121, 120])
+        self.assertEqual(fetched[-1][1], ("2024-05-02", "09:58:00"))
+        # a mark written late lands in its place, below newer ones, and nothing is shown twice
+        mark(123, "10:05:30")
+        poll()
+        self.assertEqual([row[0] for row in table.rows[:4]], [122, 123, 121, 120])
+        self.assertEqual(fetched[-1][1], ("2024-05-02", "10:04:00"))
+        self.assertEqual(fetched[-1][2], 3)
+        self.assertEqual(len(table.rows), 53)
+        self.assertEqual(live.added, 3)
+        self.assertEqual([values for (item, values) in tree.shown], [row for row in table.rows])
+
+        # scrolled down, the view keeps showing the same rows
+        tree.first = 10
+        shown = tree.shown[10]
+        mark(124, "10:07:00")
+        poll()
+        self.assertEqual(tree.shown[tree.first], shown)
+        self.assertEqual(table.rows[0][0], 124)
+
+        # sorted by ID the refresh pauses, nothing is read
+        table.sort("ID")
+        polls = live.polls
+        live.last_poll = 0.0
+        live.tick()
+        self.assertEqual(live.polls, polls)
+        db.close()
+        print_success("Report live refresh test passed")
+
+    def test_report_live_refresh_sees_other_kiosks(self):
+        """Test the open report screen shows a mark another kiosk wrote on its own connection"""
+        print_info("Testing live refresh against another writer...")
+        import tempfile
+        import database
+        from report_viewer import Report_Pager, Virtual_Table, Live_Refresh
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "recognition.db")
+            kiosk = Sqlite_Connection(path, autocommit=True)
+            kiosk.cursor().execute("create table report (id INT, name TEXT, date TEXT, time TEXT, status TEXT, PRIMARY KEY (id, date))")
+            kiosk.cursor().executemany("insert into report values (%s,%s,%s,%s,%s)",
+                                       [(id, "Staff {}".format(id), "2024-05-02", "09:{:02d}:00".format(id), "Present") for id in range(1, 6)])
+            # one pooled connection, the screen and the refresh share it like they would on a quiet day
+            pool = database.Connection_Pool(size=1, connect=lambda: Sqlite_Connection(path, **pool.settings))
+            (shared, database.pool) = (database.pool, pool)
+            try:
+                tree = Stub_Treeview()
+                table = Virtual_Table(tree, Stub_Scrollbar(), Report_Pager(tree["columns"]))
+                self.assertEqual(table.reload(), 5)
+                live = Live_Refresh(table, interval_ms=60000, today=lambda: "2024-05-02")
+                def poll():
+                    live.last_poll = 0.0
+                    live.tick()
+                    live.worker.join()
+                    live.tick()
+                poll()
+                self.assertEqual(len(table.rows), 5)
+
+                kiosk.cursor().execute("insert into report values (%s,%s,%s,%s,%s)", (6, "Staff 6", "2024-05-02", "09:10:00", "Present"))
+                poll()
+                self.assertEqual(table.rows[0][0], 6)
+                self.assertEqual(live.added, 1)
+                self.assertEqual(tree.shown[0][1][0], 6)
+                self.assertEqual(pool.metrics()["open"], 1)
+            finally:
+                database.pool = shared
+                pool.close()
+                kiosk.close()
+        print_success("Live refresh against another writer test passed")
+
 class NonFunctionalTesting:
     """Non-Functional Testing - Performance, Security, Usability"""
     
@@ -0,0 +1,129 @@
+"""
+TFLite export and runtime for FaceNet and the liveness model.
+The Keras models are converted once, optionally quantized to float16 or int8.
+int8 is calibrated on the face crops in dataset/. Inputs and outputs stay
+float32, so the preprocessing in face_pipeline.py is the same for every
+backend. At runtime TFLite_Model stands in for the Keras model: predict()
+takes and returns the same NumPy batches.
+
+    python tflite_backend.py --quantization int8
+"""
+import os
+import glob
+import argparse
+import numpy as np
+import cv2
+
+QUANTIZATIONS = ['none','float16','int8']
+FACENET_PATH = 'models/facenet_keras.h5'
+LIVENESS_JSON_PATH = 'antispoofing_models/finalyearproject_antispoofing_model_mobilenet.json'
+LIVENESS_WEIGHTS_PATH = 'antispoofing_models/finalyearproject_antispoofing_model_74-0.986316.h5'
+
+
+def tflite_path(name,quantization):
+    # models/facenet_int8.tflite, antispoofing_models/liveness_float16.tflite, ...
+    folder = 'models' if name == 'facenet' else 'antispoofing_models'
+    return os.path.join(folder,'{}_{}.tflite'.format(name,quantization))
+
+
+def load_interpreter(model_path,num_threads=None):
+    # the small tflite_runtime / ai_edge_litert packages are enough on the kiosks, full TensorFlow works too
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path,num_threads=num_threads)
+
+
+def standardize_face(face):
+    face = face.astype('float32')
+    return (face - face.mean()) / face.std()
+
+
+def scale_face(face):
+    return face.astype('float32') / 255.0
+
+
+def dataset_faces(dataset_dir='dataset',limit=200,seed=0):
+    # enrolled crops are already saved as 160x160 faces, a random sample is used for calibration
+    paths = sorted(glob.glob(os.path.join(dataset_dir,'*','*.jpg')))
+    if len(paths) > limit:
+        paths = [paths[i] for i in np.random.RandomState(seed).choice(len(paths),limit,replace=False)]
+    faces = [cv2.imread(path) for path in paths]
+    return [cv2.resize(face,(160,160)) for face in faces if face is not None]
+
+
+def convert(model,quantization='none',calibration_faces=None):
+    """
+    Converts a Keras model to a TFLite flatbuffer (bytes). calibration_faces
+    are preprocessed model inputs, only needed for int8.
+    """
+    import tensorflow as tf
+    if quantization not in QUANTIZATIONS:
+        raise ValueError("quantization must be one of {}".format(QUANTIZATIONS))
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if calibration_faces is None or len(calibration_faces) == 0:
+            raise ValueError("int8 quantization needs calibration faces")
+        def representative_dataset():
+            for face in calibration_faces:
+                yield [np.expand_dims(face,axis=0).astype('float32')]
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+    return converter.convert()
+
+
+def export_models(quantization='none',dataset_dir='dataset',liveness=True):
+    from model_loader import load_keras_model, load_json_model
+    faces = dataset_faces(dataset_dir) if quantization == 'int8' else None
+    models = [('facenet',lambda: load_keras_model(FACENET_PATH),standardize_face)]
+    if liveness:
+        models.append(('liveness',lambda: load_json_model(LIVENESS_JSON_PATH,LIVENESS_WEIGHTS_PATH),scale_face))
+    paths = []
+    for (name,load,preprocess) in models:
+        calibration_faces = [preprocess(face) for face in faces] if faces is not None else None
+        path = tflite_path(name,quantization)
+        f = open(path,"wb")
+        f.write(convert(load(),quantization,calibration_faces))
+        f.close()
+        print("[INFO] {} saved to {}".format(name,path))
+        paths.append(path)
+    return paths
+
+
+class TFLite_Model:
+    def __init__(self,model_path,num_threads=None):
+        self.model_path = model_path
+        self.interpreter = load_interpreter(model_path,num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        # same form as Keras input_shape, the batch dimension is None
+        self.input_shape = tuple(int(dim) if dim > 0 else None for dim in self.interpreter.get_input_details()[0]['shape_signature'])
+        self.batch_size = None
+
+    def predict(self,batch):
+        batch = np.asarray(batch,dtype='float32')
+        if len(batch) != self.batch_size:
+            # tensors are only reallocated when the number of faces changes
+            self.interpreter.resize_tensor_input(self.input_index,batch.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+        self.interpreter.set_tensor(self.input_index,batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert FaceNet and the liveness model to TFLite")
+    parser.add_argument("--quantization",choices=QUANTIZATIONS,default='none')
+    parser.add_argument("--dataset",default='dataset',help="face crops used to calibrate int8")
+    parser.add_argument("--no-liveness",action='store_true',help="only convert FaceNet")
+    args = parser.parse_args()
+    export_models(args.quantization,args.dataset,liveness = not args.no_liveness)